@@ -0,0 +1,256 @@
+"""
+分时交易规则的向量化回测
+用与 analyze_trading_signals 完全相同的指标与规则（minute.add_indicators / signal_codes）
+回放本地存储的1分钟K线，统计每条规则的命中率、多周期远期收益，
+并在A股 T+1 与交易费用约束下计算买入信号的逐笔收益。
+成交与收益全部用数组运算完成，不逐笔循环
+
+约定：
+- 信号在触发K线的收盘价成交
+- 每个买入信号独立开仓，在之后第一个可卖出交易日（T+1）出现的首个卖出信号处平仓，
+  之后再无卖出信号则按最后一根K线收盘价计算浮动收益（exit_reason 为 '持有中'）
+- 卖出信号只统计远期收益（A股不能做空）
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import minute
+    from .snapshot_store import SnapshotStore
+except ImportError:  # 直接以脚本方式运行
+    import minute
+    from snapshot_store import SnapshotStore
+
+# A股交易费用（按成交金额比例）
+DEFAULT_FEES = {
+    'commission': 0.00025,  # 佣金，买卖双向
+    'stamp_duty': 0.0005,   # 印花税，仅卖出
+    'transfer': 0.00001,    # 过户费，买卖双向
+    'slippage': 0.0,        # 滑点，买卖双向
+}
+
+DEFAULT_HORIZONS = (5, 15, 30, 60)  # 远期收益的K线根数
+
+BUY_CODES = (1, 2)  # SIGNAL_RULES 中的买入规则编码
+
+
+def backtest_symbol(symbol, bars, horizons=DEFAULT_HORIZONS, fees=None):
+    """
+    回测单只股票，bars 为按时间排序的1分钟K线（需含 day、close、volume）
+    返回 (信号事件表, 买入逐笔成交表)
+    """
+    df = minute.add_indicators(bars.reset_index(drop=True).copy())
+    close = df['close'].to_numpy(dtype=float)
+    codes = minute.signal_codes(
+        close,
+        df['volume'].to_numpy(dtype=float),
+        df['ma10'].to_numpy(dtype=float),
+        df['ma30'].to_numpy(dtype=float),
+        df['volume_ma10'].to_numpy(dtype=float),
+        df['HIST'].to_numpy(dtype=float),
+        df['momentum'].to_numpy(dtype=float),
+        df['volume_change'].to_numpy(dtype=float),
+    )
+    times = pd.to_datetime(df['day']).to_numpy()
+    return evaluate_codes(symbol, codes, close, times, horizons, fees)
+
+
+def evaluate_codes(symbol, codes, close, times, horizons=DEFAULT_HORIZONS, fees=None):
+    """由规则编码序列计算信号事件表与买入逐笔成交表"""
+    fees = dict(DEFAULT_FEES, **(fees or {}))
+    idx = np.flatnonzero(codes)
+    rules = np.array(minute.SIGNAL_RULES, dtype=object)
+
+    # ---- 信号事件与远期收益 ----
+    sig_codes = codes[idx]
+    events = pd.DataFrame({
+        'symbol': symbol,
+        'time': times[idx],
+        'code': sig_codes,
+        'signal': rules[sig_codes - 1, 0],
+        'reason': rules[sig_codes - 1, 1],
+        'price': close[idx],
+    })
+    for h in horizons:
+        events[f'ret_{h}'] = forward_returns(close, idx, h)
+
+    # ---- T+1 逐笔成交 ----
+    buy_idx, exit_idx, has_exit = t1_exits(codes, idx, times)
+    entry_price = close[buy_idx]
+    exit_price = close[exit_idx]
+    exit_reason = np.where(has_exit, rules[codes[exit_idx] - 1, 1], '持有中')
+
+    trades = pd.DataFrame({
+        'symbol': symbol,
+        'reason': rules[codes[buy_idx] - 1, 1],
+        'entry_time': times[buy_idx],
+        'entry_price': entry_price,
+        'exit_time': times[exit_idx],
+        'exit_price': exit_price,
+        'exit_reason': exit_reason,
+        'holding_bars': exit_idx - buy_idx,
+        'gross_return': exit_price / entry_price - 1,
+        'net_return': net_returns(entry_price, exit_price, fees),
+    })
+    return events, trades
+
+
+def forward_returns(close, idx, horizon):
+    """信号位置 idx 之后第 horizon 根K线的收益，超出数据范围为 NaN"""
+    ahead = idx + horizon
+    valid = ahead < len(close)
+    fwd = np.full(len(idx), np.nan)
+    fwd[valid] = close[ahead[valid]] / close[idx[valid]] - 1
+    return fwd
+
+
+def t1_exits(codes, idx, times):
+    """
+    为每个买入信号找平仓位置：下一个交易日起的首个卖出信号，没有则为最后一根K线
+    返回 (买入位置, 平仓位置, 是否由卖出信号平仓)
+    """
+    n = len(codes)
+    sig_codes = codes[idx]
+    is_buy = np.isin(sig_codes, BUY_CODES)
+    buy_idx = idx[is_buy]
+    sell_idx = idx[~is_buy]
+
+    # 每根K线所属交易日的下一个交易日的第一根K线位置
+    day_ids, day_first = _day_starts(times)
+    next_day_first = np.append(day_first[1:], n)[day_ids]
+
+    earliest_exit = next_day_first[buy_idx]
+    if len(sell_idx):
+        pos = np.searchsorted(sell_idx, earliest_exit)
+        has_exit = pos < len(sell_idx)
+        exit_idx = np.where(has_exit, sell_idx[np.minimum(pos, len(sell_idx) - 1)], n - 1)
+    else:
+        has_exit = np.zeros(len(buy_idx), dtype=bool)
+        exit_idx = np.full(len(buy_idx), n - 1)
+    return buy_idx, exit_idx, has_exit
+
+
+def net_returns(entry_price, exit_price, fees=None):
+    """扣除买卖双边费用后的收益率"""
+    fees = dict(DEFAULT_FEES, **(fees or {}))
+    buy_cost = fees['commission'] + fees['transfer'] + fees['slippage']
+    sell_cost = fees['commission'] + fees['transfer'] + fees['slippage'] + fees['stamp_duty']
+    return exit_price * (1 - sell_cost) / (entry_price * (1 + buy_cost)) - 1
+
+
+def _day_starts(times):
+    """返回 (每根K线的交易日编号, 每个交易日第一根K线的位置)"""
+    days = times.astype('datetime64[D]')
+    new_day = np.ones(len(days), dtype=bool)
+    new_day[1:] = days[1:] != days[:-1]
+    day_first = np.flatnonzero(new_day)
+    day_ids = np.cumsum(new_day) - 1
+    return day_ids, day_first
+
+
+def summarize(events, trades, horizons=DEFAULT_HORIZONS):
+    """按规则汇总：信号数、各周期命中率与平均远期收益、买入规则的逐笔胜率与收益"""
+    if events.empty:
+        return pd.DataFrame()
+
+    ev = events.copy()
+    # 买入信号远期上涨为命中，卖出信号远期下跌为命中
+    direction = np.where(np.isin(ev['code'], BUY_CODES), 1.0, -1.0)
+    agg = {'count': ('price', 'size')}
+    for h in horizons:
+        col = f'ret_{h}'
+        ev[f'hit_{h}'] = np.where(ev[col].isna(), np.nan, (ev[col] * direction > 0).astype(float))
+        agg[f'hit_rate_{h}'] = (f'hit_{h}', 'mean')
+        agg[f'avg_ret_{h}'] = (col, 'mean')
+    summary = ev.groupby(['signal', 'reason']).agg(**agg)
+
+    if not trades.empty:
+        closed = trades[trades['exit_reason'] != '持有中']
+        trade_stats = trades.groupby('reason').agg(
+            trades=('net_return', 'size'),
+            open_trades=('exit_reason', lambda s: int((s == '持有中').sum())),
+            avg_net_return=('net_return', 'mean'),
+            total_net_return=('net_return', 'sum'),
+            avg_holding_bars=('holding_bars', 'mean'),
+        )
+        trade_stats['win_rate'] = (closed['net_return'] > 0).groupby(closed['reason']).mean()
+        summary = summary.join(trade_stats, on='reason')
+
+    return summary.reset_index()
+
+
+def backtest_frames(frames, horizons=DEFAULT_HORIZONS, fees=None):
+    """回测内存中的 {股票代码: 1分钟K线}，返回 {'events', 'trades', 'summary'}"""
+    events, trades = [], []
+    for symbol, bars in frames.items():
+        if bars is None or len(bars) == 0:
+            continue
+        ev, tr = backtest_symbol(symbol, bars, horizons, fees)
+        events.append(ev)
+        trades.append(tr)
+    return _combine(events, trades, horizons)
+
+
+def _backtest_stored(root, fmt, symbols, start, end, horizons, fees):
+    """子进程：从快照存储读取一组股票并回测"""
+    store = SnapshotStore(root, fmt=fmt)
+    events, trades = [], []
+    for symbol in symbols:
+        bars = store.bars(symbol, start=start, end=end)
+        if bars.empty:
+            continue
+        ev, tr = backtest_symbol(symbol, bars, horizons, fees)
+        events.append(ev)
+        trades.append(tr)
+    return events, trades
+
+
+def backtest_store(store, symbols=None, start=None, end=None, horizons=DEFAULT_HORIZONS,
+                   fees=None, workers=None, chunk_size=50):
+    """
+    回测快照存储中的1分钟K线
+    symbols 缺省为区间内所有保存过分钟线的股票；workers > 1 时按股票分块多进程执行，
+    子进程各自从磁盘读取数据，不在进程间传递K线
+    """
+    if symbols is None:
+        symbols = set()
+        for date in store.dates('minute'):
+            if (start is None or date >= pd.Timestamp(start).strftime('%Y%m%d')) and \
+                    (end is None or date <= pd.Timestamp(end).strftime('%Y%m%d')):
+                symbols.update(store.bar_symbols(date))
+        symbols = sorted(symbols)
+
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    events, trades = [], []
+    workers = workers or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_backtest_stored, store.root, store.fmt, chunk, start, end, horizons, fees)
+                       for chunk in chunks]
+            for future in futures:
+                ev, tr = future.result()
+                events.extend(ev)
+                trades.extend(tr)
+    else:
+        for chunk in chunks:
+            ev, tr = _backtest_stored(store.root, store.fmt, chunk, start, end, horizons, fees)
+            events.extend(ev)
+            trades.extend(tr)
+    return _combine(events, trades, horizons)
+
+
+def _combine(events, trades, horizons):
+    events = pd.concat(events, ignore_index=True) if events else pd.DataFrame()
+    trades = pd.concat(trades, ignore_index=True) if trades else pd.DataFrame()
+    return {'events': events, 'trades': trades, 'summary': summarize(events, trades, horizons)}
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = SnapshotStore(sys.argv[1] if len(sys.argv) > 1 else os.environ.get('STOCK_DATA_DIR', 'market_data'))
+    result = backtest_store(store, workers=os.cpu_count())
+    print(result['summary'].to_string(index=False))
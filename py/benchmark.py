@@ -0,0 +1,496 @@
+"""
+性能基准脚本
+- 用合成分时数据对比列式信号引擎与原逐行循环实现的耗时，并校验两者信号完全一致
+- 基准套件：生成与 akshare 返回结构相同的合成1分钟K线、全市场快照、行业板块与指数日线，
+  在单只股票、300只自选股、5000只全市场、多日历史等规模下测量各分析函数的
+  吞吐量、延迟分位数与峰值内存，结果连同 git 提交号保存为 JSON，便于跨提交对比
+
+用法:
+    python py/benchmark.py [K线数量] [重复次数]           # 列式引擎与逐行实现对比
+    python py/benchmark.py check                         # 只做一致性校验，不一致时以非零状态退出
+    python py/benchmark.py suite [--quick] [--out 目录]  # 运行基准套件并保存结果
+    python py/benchmark.py compare 旧结果.json 新结果.json  # 对比两次结果
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import market_scan, minute, scanner
+    from .data_provider import DataProvider
+    from .screener import screen
+    from .sector_members import SectorMembership
+    from .trade_sentiment import MarketSentiment
+except ImportError:  # 直接以脚本方式运行
+    import market_scan
+    import minute
+    import scanner
+    from data_provider import DataProvider
+    from screener import screen
+    from sector_members import SectorMembership
+    from trade_sentiment import MarketSentiment
+
+
+def make_minute_bars(n=240, seed=0, start_price=100.0, volatility=0.002, spike_rate=0.0):
+    """
+    生成与 ak.stock_zh_a_minute 相同结构的合成1分钟K线（数值为字符串）
+    spike_rate > 0 时按该概率插入单根K线的脉冲式急涨
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    if spike_rate > 0:
+        spikes = rng.random(n) < spike_rate
+        close[spikes] *= 1 + rng.uniform(0.03, 0.12, spikes.sum())
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(10, 0.6, n).round(-2)
+    day = pd.date_range('2024-01-02 09:31', periods=n, freq='min')
+    return pd.DataFrame({
+        'day': day.strftime('%Y-%m-%d %H:%M:%S'),
+        'open': open_.round(2).astype(str),
+        'high': high.round(2).astype(str),
+        'low': low.round(2).astype(str),
+        'close': close.round(2).astype(str),
+        'volume': volume.astype(int).astype(str),
+    })
+
+
+def legacy_signals(df):
+    """原 analyze_trading_signals 的逐行循环实现，仅作为正确性与性能的参照"""
+    df['close'] = pd.to_numeric(df['close'], errors='coerce')
+    df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
+    df['ma10'] = df['close'].rolling(window=10).mean()
+    df['ma30'] = df['close'].rolling(window=30).mean()
+    df['volume_ma10'] = df['volume'].rolling(window=10).mean()
+    exp12 = df['close'].ewm(span=12, adjust=False).mean()
+    exp26 = df['close'].ewm(span=26, adjust=False).mean()
+    df['MACD'] = exp12 - exp26
+    df['SIGNAL'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    df['HIST'] = df['MACD'] - df['SIGNAL']
+    df['momentum'] = df['close'].diff(periods=5)
+    df['volume_change'] = df['volume'].pct_change()
+
+    signals = []
+    for i in range(30, len(df)):
+        current_price = df['close'].iloc[i]
+        current_volume = df['volume'].iloc[i]
+        timestamp = df.index[i]
+        ma10_trend = df['ma10'].iloc[i] - df['ma10'].iloc[i-1]
+        macd_hist = df['HIST'].iloc[i]
+        momentum = df['momentum'].iloc[i]
+        volume_change = df['volume_change'].iloc[i]
+
+        if (ma10_trend > 0 and
+                df['ma10'].iloc[i] > df['ma30'].iloc[i] and
+                df['ma10'].iloc[i-1] <= df['ma30'].iloc[i-1] and
+                macd_hist > 0 and
+                current_volume > df['volume_ma10'].iloc[i] * 1.2):
+            signals.append({'time': timestamp, 'price': current_price, 'signal': '买入',
+                            'reason': '趋势突破买点', 'strength': '强'})
+        elif (ma10_trend > 0 and
+              df['ma10'].iloc[i] > df['ma30'].iloc[i] and
+              current_price < df['ma10'].iloc[i] and
+              momentum > 0 and
+              volume_change > 0):
+            signals.append({'time': timestamp, 'price': current_price, 'signal': '买入',
+                            'reason': '回调企稳买点', 'strength': '中'})
+        elif (ma10_trend < 0 and
+              df['ma10'].iloc[i] < df['ma30'].iloc[i] and
+              df['ma10'].iloc[i-1] >= df['ma30'].iloc[i-1] and
+              macd_hist < 0):
+            signals.append({'time': timestamp, 'price': current_price, 'signal': '卖出',
+                            'reason': '趋势转折卖点', 'strength': '强'})
+        elif (ma10_trend > 0 and
+              momentum < 0 and
+              current_volume < df['volume_ma10'].iloc[i] * 0.8 and
+              current_price > df['ma10'].iloc[i] * 1.03):
+            signals.append({'time': timestamp, 'price': current_price, 'signal': '卖出',
+                            'reason': '强势获利卖点', 'strength': '中'})
+
+    signals_df = pd.DataFrame(signals)
+    if not signals_df.empty:
+        signals_df['price_change'] = signals_df['price'].pct_change()
+        signals_df = signals_df.round(6)
+    return signals_df
+
+
+def vectorized_signals(df):
+    """列式实现：一次性计算指标后以布尔掩码识别信号"""
+    return minute.detect_signals(minute.add_indicators(df))
+
+
+def check_signal_equivalence(seeds=range(20), n=600):
+    """在多组随机数据上校验列式实现与逐行实现输出完全一致（脉冲样本覆盖获利了结规则）"""
+    for seed in seeds:
+        bars = make_minute_bars(n, seed=seed, spike_rate=0.0 if seed % 2 else 0.08)
+        expected = legacy_signals(bars.copy())
+        actual = vectorized_signals(bars.copy())
+        pd.testing.assert_frame_equal(actual, expected)
+    return True
+
+
+def _best_time(func, bars, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        df = bars.copy()
+        t0 = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_signals(n=240, repeat=5):
+    """对比单只股票 n 根K线下两种实现的最佳耗时（秒）"""
+    bars = make_minute_bars(n)
+    legacy = _best_time(legacy_signals, bars, repeat)
+    vectorized = _best_time(vectorized_signals, bars, repeat)
+    return {'bars': n, 'legacy': legacy, 'vectorized': vectorized, 'speedup': legacy / vectorized}
+
+
+# ---------- 合成行情数据（与 akshare 返回结构一致） ----------
+
+def session_times(days=1, start='2024-01-02'):
+    """A股交易时段内的1分钟K线时间戳（每天 09:31-11:30、13:01-15:00 共240根）"""
+    stamps = []
+    for day in pd.bdate_range(start, periods=days):
+        stamps.append(pd.date_range(day + pd.Timedelta('09:31:00'), periods=120, freq='min'))
+        stamps.append(pd.date_range(day + pd.Timedelta('13:01:00'), periods=120, freq='min'))
+    return stamps[0].append(stamps[1:]) if stamps else pd.DatetimeIndex([])
+
+
+def make_session_bars(days=1, seed=0, start='2024-01-02', **kwargs):
+    """按真实交易时段生成多日1分钟K线"""
+    bars = make_minute_bars(240 * days, seed=seed, **kwargs)
+    bars['day'] = session_times(days, start).strftime('%Y-%m-%d %H:%M:%S')
+    return bars
+
+
+def make_symbols(n):
+    """合成股票代码，沪深各半"""
+    return [f"sh{600000 + i:06d}" if i % 2 == 0 else f"sz{i:06d}" for i in range(n)]
+
+
+def make_spot(n=5000, seed=0):
+    """与 ak.stock_zh_a_spot 结构相同的全市场实时行情"""
+    rng = np.random.default_rng(seed)
+    prev_close = rng.lognormal(2.5, 0.8, n).round(2)
+    change_pct = np.clip(rng.normal(0.2, 2.2, n), -10, 10).round(2)
+    price = (prev_close * (1 + change_pct / 100)).round(2)
+    open_ = (prev_close * (1 + rng.normal(0, 0.01, n))).round(2)
+    volume = rng.lognormal(15, 1.2, n).round(-2)
+    codes = make_symbols(n)
+    return pd.DataFrame({
+        '代码': codes,
+        '名称': [f"股票{i:04d}" for i in range(n)],
+        '最新价': price,
+        '涨跌额': (price - prev_close).round(2),
+        '涨跌幅': change_pct,
+        '买入': (price - 0.01).round(2),
+        '卖出': (price + 0.01).round(2),
+        '昨收': prev_close,
+        '今开': open_,
+        '最高': (np.maximum(price, open_) * (1 + np.abs(rng.normal(0, 0.01, n)))).round(2),
+        '最低': (np.minimum(price, open_) * (1 - np.abs(rng.normal(0, 0.01, n)))).round(2),
+        '成交量': volume,
+        '成交额': (volume * price).round(2),
+        '时间戳': '15:00:00',
+    })
+
+
+def make_sectors(n=90, seed=0):
+    """与 ak.stock_board_industry_name_em 结构相同的行业板块行情"""
+    rng = np.random.default_rng(seed)
+    change_pct = rng.normal(0.2, 1.5, n).round(2)
+    price = rng.uniform(500, 20000, n).round(2)
+    up = rng.integers(0, 120, n)
+    return pd.DataFrame({
+        '排名': np.arange(1, n + 1),
+        '板块名称': [f"行业{i:02d}" for i in range(n)],
+        '板块代码': [f"BK{1000 + i}" for i in range(n)],
+        '最新价': price,
+        '涨跌额': (price * change_pct / 100).round(2),
+        '涨跌幅': change_pct,
+        '总市值': rng.lognormal(25, 1, n).round(0),
+        '换手率': rng.uniform(0.3, 5, n).round(2),
+        '上涨家数': up,
+        '下跌家数': rng.integers(0, 120, n),
+        '领涨股票': [f"股票{i:04d}" for i in rng.integers(0, 5000, n)],
+        '领涨股票-涨跌幅': rng.uniform(0, 10, n).round(2),
+    })
+
+
+def make_index_daily(days=250, seed=0, start_price=3000.0):
+    """与 ak.stock_zh_index_daily_em 结构相同的指数日线"""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    open_ = np.concatenate(([start_price], close[:-1])) * (1 + rng.normal(0, 0.002, days))
+    volume = rng.lognormal(19, 0.2, days).round(0)
+    return pd.DataFrame({
+        'date': pd.bdate_range('2023-01-03', periods=days).strftime('%Y-%m-%d'),
+        'open': open_.round(2),
+        'close': close.round(2),
+        'high': (np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.004, days)))).round(2),
+        'low': (np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.004, days)))).round(2),
+        'volume': volume,
+        'amount': (volume * close).round(0),
+    })
+
+
+class SyntheticProvider(DataProvider):
+    """
+    合成数据源：不访问网络，数据由股票代码确定性生成
+    days 为每次返回的分时K线天数
+    """
+    name = 'synthetic'
+
+    def __init__(self, days=1, market_size=5000, sector_count=90, seed=0):
+        self.days = days
+        self.seed = seed
+        self._spot = make_spot(market_size, seed)
+        self._sectors = make_sectors(sector_count, seed)
+        self._index = {}
+        self._bars = {}
+
+    def stock_zh_a_minute(self, symbol, period='1', adjust=''):
+        bars = self._bars.get(symbol)
+        if bars is None:
+            seed = zlib.crc32(symbol.encode()) + self.seed
+            bars = self._bars[symbol] = make_session_bars(self.days, seed=seed, spike_rate=0.02)
+        return bars.copy()
+
+    def stock_zh_a_spot(self):
+        return self._spot.copy()
+
+    def stock_board_industry_name_em(self):
+        return self._sectors.copy()
+
+    def stock_zh_index_daily_em(self, symbol, start_date=None, end_date=None):
+        df = self._index.get(symbol)
+        if df is None:
+            df = self._index[symbol] = make_index_daily(seed=zlib.crc32(symbol.encode()) + self.seed)
+        dates = pd.to_datetime(df['date'])
+        if start_date:
+            df = df[dates >= pd.Timestamp(start_date)]
+        if end_date:
+            df = df[pd.to_datetime(df['date']) <= pd.Timestamp(end_date)]
+        return df.reset_index(drop=True)
+
+    def stock_board_industry_cons_em(self, symbol):
+        # 第 j 只股票属于第 j % 板块数 个板块
+        boards = self._sectors['板块名称'].tolist()
+        if symbol not in boards:
+            return pd.DataFrame(columns=['代码', '名称'])
+        members = self._spot.iloc[boards.index(symbol)::len(boards)]
+        return pd.DataFrame({'代码': members['代码'].str[-6:].values, '名称': members['名称'].values})
+
+
+# ---------- 基准套件 ----------
+
+def measure(func, repeat=5, items=1, warmup=1):
+    """
+    多次运行 func，返回延迟分位数（毫秒）、吞吐量（items/秒）与峰值内存（MB）
+    峰值内存单独用 tracemalloc 再运行一次测得，不影响计时；只统计本进程的 Python 内存分配
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times = np.array(times)
+    return {
+        'repeat': repeat,
+        'items': items,
+        'mean_ms': float(times.mean() * 1000),
+        'p50_ms': float(np.percentile(times, 50) * 1000),
+        'p90_ms': float(np.percentile(times, 90) * 1000),
+        'p99_ms': float(np.percentile(times, 99) * 1000),
+        'min_ms': float(times.min() * 1000),
+        'max_ms': float(times.max() * 1000),
+        'throughput': float(items / np.median(times)),
+        'peak_mb': peak / 1024 / 1024,
+    }
+
+
+def suite_cases(quick=False):
+    """
+    基准用例：名称 -> (函数, 每次运行处理的条数, 是否为耗时用例)
+    耗时用例（全市场、自选股批量）减少重复次数；quick 时缩小规模用于冒烟测试
+    """
+    watchlist_size = 30 if quick else 300
+    market_size = 500 if quick else 5000
+    history_days = 5 if quick else 20
+
+    one_day = SyntheticProvider(days=1, market_size=market_size)
+    multi_day = SyntheticProvider(days=history_days, market_size=market_size)
+    watchlist = make_symbols(watchlist_size)
+    market = make_symbols(market_size)
+    market_frames = {code: one_day.stock_zh_a_minute(code) for code in market}
+
+    analyzer = MarketSentiment(one_day)
+    market_data = analyzer.get_market_overview()
+    sector_data = analyzer.get_sector_analysis()
+    membership = SectorMembership(one_day).load()
+
+    return {
+        'analyze_trading_signals_1': (
+            lambda: minute.analyze_trading_signals('sh600000', provider=one_day), 1, False),
+        'predict_price_points_1': (
+            lambda: minute.predict_price_points('sh600000', provider=one_day), 1, False),
+        f'analyze_trading_signals_{history_days}d': (
+            lambda: minute.analyze_trading_signals('sh600000', provider=multi_day), 1, False),
+        f'predict_price_points_{history_days}d': (
+            lambda: minute.predict_price_points('sh600000', provider=multi_day), 1, False),
+        f'scan_symbols_{watchlist_size}': (
+            lambda: scanner.scan_symbols(watchlist, workers=8, provider=one_day), watchlist_size, True),
+        f'scan_market_{market_size}': (
+            lambda: market_scan.scan_market(market_frames, workers=os.cpu_count()), market_size, True),
+        f'get_market_overview_{market_size}': (
+            lambda: analyzer.get_market_overview(), market_size, False),
+        'get_sector_analysis': (
+            lambda: analyzer.get_sector_analysis(), 1, False),
+        f'sector_stats_{market_size}': (
+            lambda: membership.sector_stats(analyzer.market_frame), market_size, False),
+        f'screen_{market_size}': (
+            lambda: screen(analyzer.market_frame, membership, top=50), market_size, False),
+        'get_market_sentiment': (
+            lambda: analyzer.get_market_sentiment(), 1, False),
+        'calculate_sentiment_score': (
+            lambda: analyzer.calculate_sentiment_score(market_data, sector_data), 1, False),
+    }
+
+
+def git_commit():
+    """当前 git 提交号，工作区有未提交修改时加 -dirty 后缀"""
+    try:
+        root = os.path.dirname(os.path.abspath(__file__))
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except Exception:
+        return 'unknown'
+
+
+def run_suite(quick=False, repeat=None, only=None):
+    """运行基准套件，返回 {'meta': 环境信息, 'results': {用例: 指标}}"""
+    repeat = repeat or (3 if quick else 10)
+    results = {}
+    for name, (func, items, heavy) in suite_cases(quick).items():
+        if only and not any(key in name for key in only):
+            continue
+        # 用例内部的调试输出不计入结果
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            if heavy:
+                stats = measure(func, repeat=min(repeat, 3), items=items, warmup=0)
+            else:
+                stats = measure(func, repeat=repeat, items=items)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        results[name] = stats
+        print(f"{name:<36} p50 {stats['p50_ms']:9.2f} ms  p90 {stats['p90_ms']:9.2f} ms  "
+              f"{stats['throughput']:10.1f}/s  峰值 {stats['peak_mb']:7.1f} MB")
+    meta = {
+        'commit': git_commit(),
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'quick': quick,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def save_results(report, out_dir='benchmarks'):
+    """保存为 out_dir/<时间>_<提交号>.json，返回文件路径"""
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(out_dir, f"{stamp}_{report['meta']['commit']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare_results(old_path, new_path):
+    """对比两次结果的 p50 延迟与峰值内存，返回 DataFrame（ratio < 1 表示变快）"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    rows = []
+    for name in new['results']:
+        if name not in old['results']:
+            continue
+        a, b = old['results'][name], new['results'][name]
+        rows.append({
+            'case': name,
+            'old_p50_ms': a['p50_ms'],
+            'new_p50_ms': b['p50_ms'],
+            'ratio': b['p50_ms'] / a['p50_ms'] if a['p50_ms'] else np.nan,
+            'old_peak_mb': a['peak_mb'],
+            'new_peak_mb': b['peak_mb'],
+        })
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    return pd.DataFrame(rows)
+
+
+def _suite_main(args):
+    quick = '--quick' in args
+    out_dir = args[args.index('--out') + 1] if '--out' in args else 'benchmarks'
+    report = run_suite(quick=quick)
+    print(f"结果已保存至: {save_results(report, out_dir)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'suite':
+        _suite_main(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] in ('check', '--check'):
+        try:
+            check_signal_equivalence()
+        except AssertionError as e:
+            print(f"信号一致性校验失败: {e}")
+            sys.exit(1)
+        print("信号一致性校验通过")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        print(compare_results(sys.argv[2], sys.argv[3]).to_string(index=False))
+        sys.exit(0)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 240
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    check_signal_equivalence()
+    print("信号一致性校验通过")
+
+    result = bench_signals(n, repeat)
+    print(f"K线数量: {result['bars']}")
+    print(f"逐行循环: {result['legacy'] * 1000:.2f} ms")
+    print(f"列式引擎: {result['vectorized'] * 1000:.2f} ms")
+    print(f"加速比: {result['speedup']:.1f}x")
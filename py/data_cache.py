@@ -0,0 +1,177 @@
+"""
+akshare 数据缓存层
+内存 LRU + 可选磁盘层，按数据源设置有效期，并统计命中情况。
+缓存键带有交易时段标识（见 market_calendar.session_key），
+时段切换后旧数据自动失效，周末/节假日的数据也不会被当作实时行情返回
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    from . import market_calendar
+    from .instrumentation import metrics
+except ImportError:  # 直接以脚本方式运行
+    import market_calendar
+    from instrumentation import metrics
+
+# 各数据源的缓存有效期（秒）；'close' 表示缓存到下一次收盘
+DEFAULT_TTLS = {
+    'spot': 30,          # 全市场实时行情 ak.stock_zh_a_spot
+    'minute': 60,        # 分时数据 ak.stock_zh_a_minute
+    'sector': 300,       # 行业板块 ak.stock_board_industry_name_em
+    'index_daily': 'close',  # 指数日线 ak.stock_zh_index_daily_em
+    'board_cons': 'close',   # 行业板块成分股 ak.stock_board_industry_cons_em（每日更新）
+}
+
+
+class DataCache:
+    def __init__(self, max_entries=256, disk_dir=None, ttls=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._entries = OrderedDict()  # key -> (过期时间戳, 数据)
+        self._lock = threading.Lock()
+        self._stats = {}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def enable_disk(self, disk_dir):
+        """开启磁盘缓存层，跨进程复用（例如多次运行的脚本）"""
+        os.makedirs(disk_dir, exist_ok=True)
+        self.disk_dir = disk_dir
+
+    def make_key(self, source, args=(), kwargs=None, now=None):
+        items = tuple(sorted((kwargs or {}).items()))
+        return (source, tuple(args), items, market_calendar.session_key(now))
+
+    def expires_at(self, source, now=None):
+        """计算新数据的过期时间戳"""
+        now = now or time.time()
+        now_dt = datetime.fromtimestamp(now)
+        ttl = self.ttls.get(source, 60)
+        if ttl == 'close':
+            return market_calendar.next_close(now_dt).timestamp()
+        # 不跨越时段切换；休市期间行情不变，一直有效到下一个时段
+        boundary = market_calendar.next_session_change(now_dt).timestamp()
+        if market_calendar.is_trading_time(now_dt):
+            return min(now + ttl, boundary)
+        return boundary
+
+    def get(self, key, source=None):
+        """查询缓存，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._count(source or key[0], 'hits')
+                    return entry[1]
+                del self._entries[key]
+
+        entry = self._read_disk(key)
+        if entry is not None and entry[0] > now:
+            with self._lock:
+                self._store(key, entry)
+                self._count(source or key[0], 'disk_hits')
+            return entry[1]
+
+        with self._lock:
+            self._count(source or key[0], 'misses')
+        return None
+
+    def set(self, key, value, expires_at):
+        entry = (expires_at, value)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def fetch(self, source, func, *args, **kwargs):
+        """带缓存地调用数据接口，DataFrame 结果以副本返回，调用方修改不会污染缓存"""
+        key = self.make_key(source, args, kwargs)
+        value = self.get(key, source)
+        if value is None:
+            value = func(*args, **kwargs)
+            if value is None:
+                return None
+            self.set(key, value, self.expires_at(source))
+        return value.copy() if hasattr(value, 'copy') else value
+
+    def stats(self):
+        """各数据源的命中统计"""
+        with self._lock:
+            result = {}
+            for source, counts in self._stats.items():
+                total = counts['hits'] + counts['disk_hits'] + counts['misses']
+                result[source] = dict(counts, hit_rate=round((total - counts['misses']) / total, 4) if total else 0.0)
+            return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _count(self, source, field):
+        counts = self._stats.setdefault(source, {'hits': 0, 'disk_hits': 0, 'misses': 0})
+        counts[field] += 1
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{key[0]}_{digest}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"读取磁盘缓存失败: {e}")
+            return None
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)  # 原子替换，避免其他进程读到半个文件
+        except Exception as e:
+            print(f"写入磁盘缓存失败: {e}")
+
+
+# 进程内共享的默认缓存；设置环境变量 STOCK_CACHE_DIR 可开启磁盘层
+cache = DataCache(disk_dir=os.environ.get('STOCK_CACHE_DIR'))
+
+
+def _cache_metrics():
+    """把默认缓存的命中统计导出到埋点（stock_cache_requests_total）"""
+    rows = []
+    for source, counts in cache.stats().items():
+        for result in ('hits', 'disk_hits', 'misses'):
+            rows.append(('cache_requests', 'counter', {'source': source, 'result': result}, counts[result]))
+    return rows
+
+
+metrics.register_collector(_cache_metrics)
+
+
+def cached(source, func, *args, **kwargs):
+    """使用默认缓存调用数据接口"""
+    return cache.fetch(source, func, *args, **kwargs)
@@ -0,0 +1,288 @@
+"""
+数据源接口
+分析代码通过数据源获取行情，不直接调用 akshare。方法名与参数与 akshare 对应接口保持一致：
+- AkshareProvider：实时数据源，调用 akshare（带缓存，并记录到快照存储）
+- ReplayProvider：回放数据源，从本地 SnapshotStore 按模拟时钟提供历史快照与K线，
+  用于离线压测和基准测试
+- StoreFirstProvider：本地优先，快照存储中已有足够新的数据时直接返回，否则再请求上游数据源
+"""
+import time
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    from . import market_calendar
+    from .data_cache import DEFAULT_TTLS, cached
+    from .instrumentation import metrics
+    from .snapshot_store import record
+except ImportError:  # 直接以脚本方式运行
+    import market_calendar
+    from data_cache import DEFAULT_TTLS, cached
+    from instrumentation import metrics
+    from snapshot_store import record
+
+
+class DataProvider:
+    """数据源基类"""
+    name = 'base'
+
+    def stock_zh_a_minute(self, symbol, period='1', adjust=''):
+        """个股分时K线"""
+        raise NotImplementedError
+
+    def stock_zh_a_spot(self):
+        """全市场实时行情"""
+        raise NotImplementedError
+
+    def stock_board_industry_name_em(self):
+        """行业板块行情"""
+        raise NotImplementedError
+
+    def stock_zh_index_daily_em(self, symbol, start_date=None, end_date=None):
+        """指数日线；start_date/end_date 为 YYYYMMDD，缺省为全部历史"""
+        raise NotImplementedError
+
+    def stock_board_industry_cons_em(self, symbol):
+        """行业板块成分股，symbol 为板块名称"""
+        raise NotImplementedError
+
+
+class AkshareProvider(DataProvider):
+    """实时数据源：首次使用时才导入 akshare"""
+    name = 'akshare'
+
+    def __init__(self):
+        self._ak = None
+
+    @property
+    def ak(self):
+        if self._ak is None:
+            import akshare
+            self._ak = akshare
+        return self._ak
+
+    def stock_zh_a_minute(self, symbol, period='1', adjust=''):
+        return self._cached('minute', self._fetch_minute, symbol, period, adjust)
+
+    def stock_zh_a_spot(self):
+        return self._cached('spot', self._fetch_spot)
+
+    def stock_board_industry_name_em(self):
+        return self._cached('sector', self._fetch_sectors)
+
+    def stock_zh_index_daily_em(self, symbol, start_date=None, end_date=None):
+        return self._cached('index_daily', self._fetch_index_daily, symbol, start_date, end_date)
+
+    def stock_board_industry_cons_em(self, symbol):
+        return self._cached('board_cons', self._fetch_board_cons, symbol)
+
+    def _cached(self, source, func, *args):
+        # 缓存键与有效期按交易时段计算：即将联网时才加载交易日历（已保存且未过期时不联网）
+        market_calendar.ensure_trade_calendar()
+        return cached(source, func, *args)
+
+    # 以下为实际的网络请求，新获取的数据追加到本地快照存储
+    def _call(self, source, func, **kwargs):
+        """发起一次网络请求，记录请求次数、耗时与返回行数"""
+        metrics.count('network_calls', source=source)
+        with metrics.stage('network', source=source):
+            df = func(**kwargs)
+        metrics.count('network_rows', len(df) if df is not None else 0, source=source)
+        return df
+
+    def _fetch_minute(self, symbol, period, adjust):
+        df = self._call('minute', self.ak.stock_zh_a_minute, symbol=symbol, period=period, adjust=adjust)
+        if period == '1':
+            record('minute', df, symbol=symbol)
+        return df
+
+    def _fetch_spot(self):
+        df = self._call('spot', self.ak.stock_zh_a_spot)
+        record('spot', df)
+        return df
+
+    def _fetch_sectors(self):
+        df = self._call('sector', self.ak.stock_board_industry_name_em)
+        record('sector', df)
+        return df
+
+    def _fetch_index_daily(self, symbol, start_date=None, end_date=None):
+        kwargs = {'symbol': symbol}
+        if start_date or end_date:
+            kwargs.update(start_date=start_date or '19900101', end_date=end_date or '20500101')
+        df = self._call('index_daily', self.ak.stock_zh_index_daily_em, **kwargs)
+        if not (start_date or end_date):
+            # 部分区间由 sentiment_history.IndexHistory 合并后保存，这里只记录完整历史
+            record('index_daily', df, symbol=symbol)
+        return df
+
+    def _fetch_board_cons(self, symbol):
+        # 成分股整表由 sector_members.SectorMembership 汇总后保存，这里不逐个板块记录
+        return self._call('board_cons', self.ak.stock_board_industry_cons_em, symbol=symbol)
+
+
+class ReplayProvider(DataProvider):
+    """
+    回放数据源
+    模拟时钟从 start 开始，按 speed 倍速推进（speed=0 时时钟静止，用 seek/advance 手动推进），
+    每次请求返回模拟时刻之前最近的快照与K线
+    """
+    name = 'replay'
+
+    def __init__(self, store, start=None, speed=1.0, lookback_days=5):
+        self.store = store
+        self.speed = speed
+        self.lookback_days = lookback_days  # 分时K线向前回看的自然日数
+        self._start = pd.Timestamp(start).to_pydatetime() if start is not None else self._first_time()
+        self._t0 = time.monotonic()
+
+    def now(self):
+        """当前模拟时刻"""
+        elapsed = (time.monotonic() - self._t0) * self.speed
+        return self._start + pd.Timedelta(seconds=elapsed)
+
+    def seek(self, t):
+        """把模拟时钟拨到 t"""
+        self._start = pd.Timestamp(t).to_pydatetime()
+        self._t0 = time.monotonic()
+
+    def advance(self, seconds):
+        """把模拟时钟向前推进若干秒"""
+        self.seek(self.now() + pd.Timedelta(seconds=seconds))
+
+    def stock_zh_a_minute(self, symbol, period='1', adjust=''):
+        now = self.now()
+        start = pd.Timestamp(now).normalize() - pd.Timedelta(days=self.lookback_days)
+        return self.store.bars(symbol, start=start, end=now)
+
+    def stock_zh_a_spot(self):
+        df = self.store.spot_at(self.now())
+        return df if df is not None else pd.DataFrame()
+
+    def stock_board_industry_name_em(self):
+        df = self.store.sectors_at(self.now())
+        return df if df is not None else pd.DataFrame()
+
+    def stock_zh_index_daily_em(self, symbol, start_date=None, end_date=None):
+        df = self.store.read_table(f"index_daily_{symbol}")
+        if df is None:
+            return pd.DataFrame()
+        # 只返回模拟时刻当天及之前的日线
+        dates = pd.to_datetime(df['date'])
+        keep = dates <= pd.Timestamp(self.now())
+        if start_date:
+            keep &= dates >= pd.Timestamp(start_date)
+        if end_date:
+            keep &= dates <= pd.Timestamp(end_date)
+        return df[keep].reset_index(drop=True)
+
+    def stock_board_industry_cons_em(self, symbol):
+        # 回放使用 SectorMembership 保存的成分股整表
+        df = self.store.read_table('industry_membership')
+        if df is None:
+            return pd.DataFrame(columns=['代码', '名称'])
+        return df.loc[df['板块名称'] == symbol, ['代码', '名称']].reset_index(drop=True)
+
+    def _first_time(self):
+        dates = self.store.dates('spot')
+        times = self.store.snapshot_times('spot', dates[0]) if dates else []
+        return times[0] if times else datetime.now()
+
+
+class StoreFirstProvider(DataProvider):
+    """
+    本地优先数据源：快照存储中已有足够新的数据时直接读取（不导入 akshare、不发起网络请求），
+    否则交给上游数据源（缺省为进程内默认数据源，新数据照常记录到存储）。
+    “足够新”与缓存有效期一致：盘中不早于当前时刻减去 DEFAULT_TTLS 的秒数，
+    休市期间不早于最近一次时段结束时刻减去同样的秒数
+    """
+    name = 'store_first'
+
+    def __init__(self, store, upstream=None, ttls=None, lookback_days=5):
+        self.store = store
+        self.upstream = upstream or get_default_provider()
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.lookback_days = lookback_days  # 分时K线向前回看的自然日数
+
+    def now(self):
+        return datetime.now()
+
+    def stock_zh_a_minute(self, symbol, period='1', adjust=''):
+        if period == '1' and not adjust:
+            now = self.now()
+            start = pd.Timestamp(now).normalize() - pd.Timedelta(days=self.lookback_days)
+            bars = self.store.bars(symbol, start=start, end=now)
+            if not bars.empty and self._fresh(bars['day'].iloc[-1], 'minute', now):
+                return self._served('minute', bars)
+        return self._delegate('minute', self.upstream.stock_zh_a_minute, symbol, period, adjust)
+
+    def stock_zh_a_spot(self):
+        df = self._latest_snapshot('spot', 'spot')
+        if df is not None:
+            return self._served('spot', df)
+        return self._delegate('spot', self.upstream.stock_zh_a_spot)
+
+    def stock_board_industry_name_em(self):
+        df = self._latest_snapshot('sector', 'sector')
+        if df is not None:
+            return self._served('sector', df)
+        return self._delegate('sector', self.upstream.stock_board_industry_name_em)
+
+    def stock_zh_index_daily_em(self, symbol, start_date=None, end_date=None):
+        df = self.store.read_table(f"index_daily_{symbol}")
+        now = self.now()
+        if df is not None and not df.empty and not market_calendar.is_trading_time(now):
+            dates = pd.to_datetime(df['date'])
+            # 日线只在收盘后才算完整：已包含当前行情所属交易日时直接使用
+            if dates.iloc[-1].date() >= market_calendar.market_date(now):
+                keep = pd.Series(True, index=df.index)
+                if start_date:
+                    keep &= dates >= pd.Timestamp(start_date)
+                if end_date:
+                    keep &= dates <= pd.Timestamp(end_date)
+                return self._served('index_daily', df[keep].reset_index(drop=True))
+        return self._delegate('index_daily', self.upstream.stock_zh_index_daily_em, symbol,
+                              start_date=start_date, end_date=end_date)
+
+    def stock_board_industry_cons_em(self, symbol):
+        # 成分股整表由 SectorMembership 按交易日保存与复用，这里直接交给上游
+        return self.upstream.stock_board_industry_cons_em(symbol)
+
+    def _latest_snapshot(self, kind, source):
+        now = self.now()
+        times = self.store.snapshot_times(kind, market_calendar.market_date(now))
+        if not times or not self._fresh(times[-1], source, now):
+            return None
+        return self.store.spot_at(times[-1]) if kind == 'spot' else self.store.sectors_at(times[-1])
+
+    def _fresh(self, t, source, now):
+        t = pd.Timestamp(t).to_pydatetime()
+        ttl = self.ttls.get(source, 60)
+        ttl = 0 if ttl == 'close' else ttl
+        return market_calendar.last_session_end(now) - pd.Timedelta(seconds=ttl) <= t <= now
+
+    def _served(self, source, df):
+        metrics.count('store_first_requests', source=source, result='store')
+        return df
+
+    def _delegate(self, source, func, *args, **kwargs):
+        metrics.count('store_first_requests', source=source, result='upstream')
+        return func(*args, **kwargs)
+
+
+_default_provider = None
+
+
+def get_default_provider():
+    """进程内默认数据源，未设置时为 AkshareProvider"""
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = AkshareProvider()
+    return _default_provider
+
+
+def set_default_provider(provider):
+    """切换进程内默认数据源，例如整体切换到回放数据进行压测"""
+    global _default_provider
+    _default_provider = provider
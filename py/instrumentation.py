@@ -0,0 +1,291 @@
+"""
+运行时埋点
+各分析阶段的耗时、网络请求次数、缓存命中与处理行数统一记录到进程内的 metrics，
+可输出为 JSON lines（逐条事件）或 Prometheus 文本格式（汇总），并提供 cProfile / tracemalloc 剖析钩子
+
+    from instrumentation import metrics
+    with metrics.stage('sentiment.sector_clean'):
+        ...
+    metrics.count('rows_processed', len(df), stage='sentiment.sector_clean')
+    print(metrics.to_prometheus())
+
+环境变量：
+    STOCK_METRICS=0          关闭埋点
+    STOCK_METRICS_LOG=路径   每个阶段结束时追加一行 JSON 事件
+"""
+import cProfile
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+PREFIX = 'stock'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for k, v in labels:
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{v}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Metrics:
+    def __init__(self, enabled=True, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._stages = {}    # (阶段, 标签) -> [次数, 总耗时, 最小, 最大, 最近一次]
+        self._counters = {}  # (名称, 标签) -> 累计值
+        self._gauges = {}    # (名称, 标签) -> 当前值
+        self._collectors = []
+
+    # ---------- 记录 ----------
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """记录一个阶段的耗时；阶段内抛出异常时额外计入 stage_errors"""
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.observe(name, elapsed, **labels)
+            if failed:
+                self.count('stage_errors', stage=name, **labels)
+
+    def timed(self, name=None, **labels):
+        """装饰器版本的 stage，缺省以函数名作为阶段名；也可用于 async 函数"""
+        def decorator(func):
+            stage_name = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.stage(stage_name, **labels):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds, **labels):
+        """直接记录一次阶段耗时（秒）"""
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            entry = self._stages.get(key)
+            if entry is None:
+                self._stages[key] = [1, seconds, seconds, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = min(entry[2], seconds)
+                entry[3] = max(entry[3], seconds)
+                entry[4] = seconds
+        self._log({'type': 'stage', 'name': name, 'seconds': round(seconds, 6), **labels})
+
+    def count(self, name, value=1, **labels):
+        """累加计数器，如网络请求次数、处理行数"""
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        """记录当前值，如最新的情绪分项得分"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def event(self, name, **fields):
+        """只写入 JSON lines 的一次性事件（不参与汇总）"""
+        if self.enabled:
+            self._log({'type': 'event', 'name': name, **fields})
+
+    def register_collector(self, func):
+        """
+        注册外部指标来源，func() 返回 [(名称, 类型, 标签dict, 值), ...]，
+        在导出时调用（例如数据缓存的命中统计），避免重复计数
+        """
+        self._collectors.append(func)
+
+    # ---------- 导出 ----------
+
+    def snapshot(self):
+        """当前全部指标，结构适合直接 json.dumps"""
+        with self._lock:
+            stages = [
+                {'stage': name, **dict(labels), 'count': c, 'total_seconds': total,
+                 'avg_seconds': total / c, 'min_seconds': lo, 'max_seconds': hi, 'last_seconds': last}
+                for (name, labels), (c, total, lo, hi, last) in self._stages.items()
+            ]
+            counters = [{'name': name, **dict(labels), 'value': v} for (name, labels), v in self._counters.items()]
+            gauges = [{'name': name, **dict(labels), 'value': v} for (name, labels), v in self._gauges.items()]
+        for name, kind, labels, value in self._collected():
+            (counters if kind == 'counter' else gauges).append({'name': name, **labels, 'value': value})
+        return {'stages': stages, 'counters': counters, 'gauges': gauges}
+
+    def to_prometheus(self):
+        """Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+
+        if stages:
+            metric = f'{PREFIX}_stage_seconds'
+            lines.append(f'# HELP {metric} 分析阶段耗时')
+            lines.append(f'# TYPE {metric} summary')
+            for (name, labels), (c, total, lo, hi, last) in stages:
+                lbl = _format_labels((('stage', name),) + labels)
+                lines.append(f'{metric}_count{lbl} {c}')
+                lines.append(f'{metric}_sum{lbl} {total:.6f}')
+            for suffix, idx in (('max', 3), ('last', 4)):
+                lines.append(f'# TYPE {metric}_{suffix} gauge')
+                for (name, labels), entry in stages:
+                    lines.append(f'{metric}_{suffix}{_format_labels((("stage", name),) + labels)} {entry[idx]:.6f}')
+
+        collected = self._collected()
+        extra_counters = [((name, tuple(sorted(l.items()))), v) for name, kind, l, v in collected if kind == 'counter']
+        extra_gauges = [((name, tuple(sorted(l.items()))), v) for name, kind, l, v in collected if kind != 'counter']
+        lines.extend(_prometheus_block(counters + extra_counters, 'counter', '_total'))
+        lines.extend(_prometheus_block(gauges + extra_gauges, 'gauge', ''))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    # ---------- 剖析 ----------
+
+    @contextmanager
+    def profile(self, name='profile', output=None, sort='cumulative', limit=30, memory=False):
+        """
+        用 cProfile 剖析代码块；output 为 .prof 文件路径（可用 snakeviz 等查看），
+        缺省打印耗时前 limit 项。memory=True 时同时用 tracemalloc 记录峰值内存到 gauge
+        """
+        profiler = cProfile.Profile()
+        started_trace = memory and not tracemalloc.is_tracing()
+        if started_trace:
+            tracemalloc.start()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            if memory:
+                _, peak = tracemalloc.get_traced_memory()
+                self.gauge('peak_memory_bytes', peak, stage=name)
+                if started_trace:
+                    tracemalloc.stop()
+            if output:
+                profiler.dump_stats(output)
+            else:
+                buf = io.StringIO()
+                pstats.Stats(profiler, stream=buf).sort_stats(sort).print_stats(limit)
+                print(buf.getvalue())
+
+    # ---------- 内部实现 ----------
+
+    def _collected(self):
+        result = []
+        for func in self._collectors:
+            try:
+                result.extend(func())
+            except Exception as e:
+                print(f"读取外部指标失败: {e}")
+        return result
+
+    def _log(self, record):
+        if not self.log_path:
+            return
+        record = dict(ts=datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'), **record)
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        try:
+            with self._lock:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except Exception as e:
+            print(f"写入埋点日志失败: {e}")
+
+
+def _prometheus_block(items, kind, suffix):
+    lines = []
+    by_name = {}
+    for (name, labels), value in items:
+        by_name.setdefault(name, []).append((labels, value))
+    for name in sorted(by_name):
+        metric = f'{PREFIX}_{name}{suffix}'
+        lines.append(f'# TYPE {metric} {kind}')
+        for labels, value in by_name[name]:
+            lines.append(f'{metric}{_format_labels(labels)} {value}')
+    return lines
+
+
+def serve_metrics(port=9108, host='127.0.0.1', registry=None):
+    """在后台线程启动 /metrics（Prometheus 文本）与 /metrics.json 端点，返回 HTTPServer"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                data = registry.to_prometheus().encode('utf-8')
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path == '/metrics.json':
+                data = json.dumps(registry.snapshot(), ensure_ascii=False, default=str).encode('utf-8')
+                content_type = 'application/json; charset=utf-8'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+# 进程内共享的默认指标
+metrics = Metrics(
+    enabled=os.environ.get('STOCK_METRICS', '1') != '0',
+    log_path=os.environ.get('STOCK_METRICS_LOG'),
+)
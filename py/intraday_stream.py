@@ -0,0 +1,271 @@
+"""
+分时指标流式计算
+每到一根新的1分钟K线只做 O(1) 的增量更新，结果与 minute.add_indicators / detect_signals 的批量计算一致
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .minute import SIGNAL_RULES, signal_codes
+except ImportError:  # 直接以脚本方式运行
+    from minute import SIGNAL_RULES, signal_codes
+
+
+class _RollingMean:
+    """
+    固定窗口滑动均值，逐步复现 pandas rolling().mean() 的补偿求和方式
+    （加入/移出各自独立补偿，先移出旧值再加入新值），保证均线相等等边界比较与批量计算结果一致；
+    NaN 留在窗口中但不计入 nobs，窗口内全部为有效值时才有结果，NaN 移出窗口后均值随之恢复
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.nobs = 0  # 窗口中的有效值个数
+        self.sum = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.neg_count = 0
+        self.same_count = 0  # 连续相同值的个数（跳过 NaN）
+        self.prev_value = np.nan
+
+    def _add(self, x):
+        if x != x:
+            return
+        self.nobs += 1
+        y = x - self.compensation_add
+        t = self.sum + y
+        self.compensation_add = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, x) < 0:
+            self.neg_count += 1
+        if x == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = x
+
+    def _remove(self, x):
+        if x != x:
+            return
+        self.nobs -= 1
+        y = -x - self.compensation_remove
+        t = self.sum + y
+        self.compensation_remove = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, x) < 0:
+            self.neg_count -= 1
+
+    def push(self, x):
+        if len(self.values) == self.size:
+            self._remove(self.values.popleft())
+        self.values.append(x)
+        self._add(x)
+
+    def get(self):
+        n = self.nobs
+        if n < self.size:
+            return np.nan
+        if self.same_count >= n:
+            return self.prev_value
+        result = self.sum / n
+        if self.neg_count == 0 and result < 0:
+            return 0.0
+        if self.neg_count == n and result > 0:
+            return 0.0
+        return result
+
+
+class _RollingStd:
+    """固定窗口滑动样本标准差（Welford 增量更新）；NaN 不计入，窗口内全部为有效值时才有结果"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.nobs = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # 离差平方和
+
+    def push(self, x):
+        if len(self.values) == self.size:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                if self.nobs:
+                    delta = old - self.mean
+                    self.mean -= delta / self.nobs
+                    self.m2 -= delta * (old - self.mean)
+                else:
+                    self.mean = 0.0
+                    self.m2 = 0.0
+        self.values.append(x)
+        if x == x:
+            self.nobs += 1
+            delta = x - self.mean
+            self.mean += delta / self.nobs
+            self.m2 += delta * (x - self.mean)
+
+    def get(self):
+        if self.nobs < self.size or self.size < 2:
+            return np.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.size - 1))
+
+
+class _Ema:
+    """
+    与 Series.ewm(span=..., adjust=False).mean() 相同的递推EMA（同样的运算顺序）
+    遇到 NaN 时沿用上一个值，旧值权重照常衰减（ignore_na=False 的语义）
+    """
+
+    def __init__(self, span):
+        self.com = (span - 1) / 2.0
+        alpha = 1.0 / (1.0 + self.com)
+        self.old_weight_factor = 1.0 - alpha
+        self.new_weight = alpha
+        self.old_weight = 1.0
+        self.value = np.nan
+
+    def push(self, x):
+        if self.value == self.value:
+            self.old_weight *= self.old_weight_factor
+            if x == x:
+                if self.value != x:
+                    new_weight = 1.0 - self.old_weight if self.com == 1 else self.new_weight
+                    self.value = ((self.old_weight * self.value + new_weight * x)
+                                  / (self.old_weight + new_weight))
+                self.old_weight = 1.0
+        elif x == x:
+            self.value = x
+        return self.value
+
+
+class IntradayStream:
+    """
+    单只股票的分时指标流
+    逐根（或小批量）接收K线，增量维护 ma10/ma30/std20/volume_ma10、MACD 与动量，
+    并在新K线触发交易规则时立即返回信号
+    """
+
+    def __init__(self, stock_code=None):
+        self.stock_code = stock_code
+        self.count = 0
+
+        self._ma10 = _RollingMean(10)
+        self._ma30 = _RollingMean(30)
+        self._std20 = _RollingStd(20)
+        self._volume_ma10 = _RollingMean(10)
+        self._ema12 = _Ema(12)
+        self._ema26 = _Ema(26)
+        self._signal = _Ema(9)
+        self._closes = deque(maxlen=6)  # 动量需要5根之前的收盘价
+
+        self.prev = None    # 上一根K线的指标
+        self.latest = None  # 最新一根K线的指标
+        self.signals = []
+
+    def update(self, close, volume, time=None):
+        """
+        接收一根新K线，返回本根触发的信号（dict），未触发时返回 None
+        time 缺省为K线序号，与批量计算中 DataFrame 的默认索引一致
+        """
+        close = float(close)
+        volume = float(volume)
+        if time is None:
+            time = self.count
+
+        self._ma10.push(close)
+        self._ma30.push(close)
+        self._std20.push(close)
+        self._volume_ma10.push(volume)
+
+        macd = self._ema12.push(close) - self._ema26.push(close)
+        signal = self._signal.push(macd)
+
+        self._closes.append(close)
+        momentum = close - self._closes[0] if len(self._closes) == 6 else np.nan
+        prev_volume = self.latest['volume'] if self.latest is not None else np.nan
+
+        self.prev = self.latest
+        self.latest = {
+            'time': time,
+            'close': close,
+            'volume': volume,
+            'ma10': self._ma10.get(),
+            'ma30': self._ma30.get(),
+            'std20': self._std20.get(),
+            'volume_ma10': self._volume_ma10.get(),
+            'MACD': macd,
+            'SIGNAL': signal,
+            'HIST': macd - signal,
+            'momentum': momentum,
+            'volume_change': _pct_change(volume, prev_volume),
+        }
+        self.count += 1
+
+        # 与批量实现一致：从第31根K线开始评估
+        if self.count <= 30:
+            return None
+        return self._check_signal()
+
+    def update_many(self, closes, volumes, times=None):
+        """批量接收K线，返回期间触发的全部信号"""
+        if times is None:
+            times = [None] * len(closes)
+        emitted = []
+        for close, volume, time in zip(closes, volumes, times):
+            sig = self.update(close, volume, time)
+            if sig is not None:
+                emitted.append(sig)
+        return emitted
+
+    def update_frame(self, df):
+        """接收 ak.stock_zh_a_minute 结构的分时数据，以 DataFrame 索引作为信号时间"""
+        closes = pd.to_numeric(df['close'], errors='coerce').to_numpy(dtype=float)
+        volumes = pd.to_numeric(df['volume'], errors='coerce').to_numpy(dtype=float)
+        return self.update_many(closes, volumes, df.index)
+
+    def _check_signal(self):
+        prev, cur = self.prev, self.latest
+        pair = lambda key: np.array([prev[key], cur[key]], dtype=float)
+        code = signal_codes(
+            pair('close'), pair('volume'), pair('ma10'), pair('ma30'),
+            pair('volume_ma10'), pair('HIST'), pair('momentum'), pair('volume_change'),
+            start=1,
+        )[-1]
+        if code == 0:
+            return None
+
+        signal, reason, strength = SIGNAL_RULES[code - 1]
+        last_price = self.signals[-1]['_raw_price'] if self.signals else None
+        price_change = cur['close'] / last_price - 1 if last_price else np.nan
+        record = {
+            'time': cur['time'],
+            'price': round(cur['close'], 6),
+            'signal': signal,
+            'reason': reason,
+            'strength': strength,
+            'price_change': round(price_change, 6),
+            '_raw_price': cur['close'],
+        }
+        self.signals.append(record)
+        return {k: v for k, v in record.items() if k != '_raw_price'}
+
+    def signals_frame(self):
+        """到目前为止的全部信号，结构与 detect_signals 的返回值相同"""
+        if not self.signals:
+            return pd.DataFrame()
+        return pd.DataFrame(self.signals).drop(columns='_raw_price')
+
+
+def _pct_change(current, previous):
+    """与 Series.pct_change 相同的除零语义"""
+    if math.isnan(previous) or math.isnan(current):
+        return np.nan
+    if previous == 0:
+        if current == 0:
+            return np.nan
+        return math.copysign(math.inf, current)
+    return current / previous - 1
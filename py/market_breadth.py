@@ -0,0 +1,129 @@
+"""
+盘中市场宽度时间序列
+由连续的全市场快照（ak.stock_zh_a_spot）增量维护涨跌家数、涨跌比、成交额与创新高/新低家数。
+每份快照只与上一份比较：涨跌状态发生变化的股票才调整计数，逐股保存当日最高/最低价，
+不回头扫描历史快照。序列以 DataFrame 形式提供给情绪打分和绘图
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .market_frame import MarketFrame, SymbolIndex
+except ImportError:  # 直接以脚本方式运行
+    from market_frame import MarketFrame, SymbolIndex
+
+
+class BreadthTracker:
+    """
+    市场宽度跟踪器
+    index: 与其他 MarketFrame 共用的 SymbolIndex；交易日变化时自动重置逐股状态
+    """
+
+    def __init__(self, index=None):
+        self.index = index if index is not None else SymbolIndex()
+        self.rows = []
+        self._date = None
+        self._reset(0)
+
+    def _reset(self, size):
+        self._sign = np.zeros(size, dtype=np.int8)         # 每只股票当前的涨跌状态 1/0/-1
+        self._high = np.full(size, np.nan, dtype=np.float32)  # 当日已见最高价
+        self._low = np.full(size, np.nan, dtype=np.float32)
+        self._amount = np.zeros(size, dtype=np.float64)    # 上一份快照的累计成交额
+        self._up = 0
+        self._down = 0
+
+    def _grow(self, size):
+        extra = size - len(self._sign)
+        if extra <= 0:
+            return
+        self._sign = np.concatenate([self._sign, np.zeros(extra, dtype=np.int8)])
+        self._high = np.concatenate([self._high, np.full(extra, np.nan, dtype=np.float32)])
+        self._low = np.concatenate([self._low, np.full(extra, np.nan, dtype=np.float32)])
+        self._amount = np.concatenate([self._amount, np.zeros(extra)])
+
+    def update(self, snapshot, time=None):
+        """
+        接收一份快照（ak.stock_zh_a_spot 的 DataFrame 或 MarketFrame），返回本次新增的一行
+        time 缺省取快照自带的时间（store 读取的快照带 snapshot_time），否则为当前时间
+        """
+        frame = snapshot if isinstance(snapshot, MarketFrame) else MarketFrame.from_spot(snapshot, self.index)
+        time = pd.Timestamp(time or frame.time or datetime.now())
+        size = len(self.index)
+        if self._date != time.date():
+            self._date = time.date()
+            self._reset(size)
+        self._grow(size)
+
+        change = frame.aligned('change_pct', size)
+        present = np.zeros(size, dtype=bool)
+        present[:len(frame.present)] = frame.present
+        present &= ~np.isnan(change)
+
+        # ---- 涨跌家数：只调整状态发生变化的股票 ----
+        sign = np.zeros(size, dtype=np.int8)
+        sign[present] = np.sign(change[present]).astype(np.int8)
+        changed = np.flatnonzero(sign != self._sign)
+        old, new = self._sign[changed], sign[changed]
+        self._up += int(np.count_nonzero(new == 1)) - int(np.count_nonzero(old == 1))
+        self._down += int(np.count_nonzero(new == -1)) - int(np.count_nonzero(old == -1))
+        self._sign = sign
+
+        # ---- 创新高/新低：与此前已见的当日最高/最低价比较 ----
+        high = frame.aligned('high', size)
+        low = frame.aligned('low', size)
+        price = frame.aligned('price', size)
+        high = np.where(np.isnan(high), price, high)
+        low = np.where(np.isnan(low), price, low)
+        seen = ~np.isnan(self._high)
+        new_high = present & seen & (high > self._high)
+        new_low = present & seen & (low < self._low)
+        self._high = np.fmax(self._high, np.where(present, high, np.nan)).astype(np.float32)
+        self._low = np.fmin(self._low, np.where(present, low, np.nan)).astype(np.float32)
+
+        # ---- 成交额：快照中的成交额为当日累计，区间成交额为与上一份之差 ----
+        amount = np.where(present, frame.aligned('amount', size), self._amount)
+        interval = np.clip(amount - self._amount, 0, None)
+        self._amount = amount
+
+        valid = int(present.sum())
+        row = {
+            'time': time,
+            'count': valid,
+            'up': self._up,
+            'down': self._down,
+            'flat': valid - self._up - self._down,
+            'up_down_ratio': self._up / (self._down if self._down > 0 else 1),
+            'advance_ratio': self._up / (self._up + self._down) if self._up + self._down else np.nan,
+            'avg_change': float(change.sum(where=present, dtype=np.float64) / valid) if valid else np.nan,
+            'total_amount': float(amount.sum()) / 100000000,       # 亿元
+            'interval_amount': float(interval.sum()) / 100000000,  # 亿元
+            'new_highs': int(new_high.sum()),
+            'new_lows': int(new_low.sum()),
+        }
+        self.rows.append(row)
+        return row
+
+    def latest(self):
+        return self.rows[-1] if self.rows else None
+
+    def frame(self, date=None):
+        """全部（或某个交易日的）宽度序列，以快照时间为索引"""
+        if not self.rows:
+            return pd.DataFrame()
+        df = pd.DataFrame(self.rows).set_index('time')
+        if date is not None:
+            df = df[df.index.normalize() == pd.Timestamp(date).normalize()]
+        return df
+
+    @classmethod
+    def from_store(cls, store, date=None, index=None):
+        """用快照存储中某日（默认最近一日）的全部全市场快照重建宽度序列"""
+        tracker = cls(index)
+        for t in store.snapshot_times('spot', date):
+            df = store.spot_at(t)
+            if df is not None:
+                tracker.update(df, t)
+        return tracker
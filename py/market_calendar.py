@@ -0,0 +1,268 @@
+"""
+A股交易日历与交易时段
+交易日历（含节假日）保存在磁盘缓存目录（STOCK_CACHE_DIR）的 trade_calendar.txt 中：
+首次判断交易日时只读取已保存的日历，不联网；数据源确实要发起网络请求时（AkshareProvider）
+才通过 ensure_trade_calendar() 从新浪获取并保存，保存超过 CALENDAR_MAX_AGE 后重新获取。
+没有可用日历或获取失败时按周一至周五判断；
+set_trade_dates() 可直接指定交易日（传入 None 固定按工作日判断，不再读取或联网加载）
+"""
+import os
+import tempfile
+import threading
+from datetime import datetime, time, timedelta
+
+MORNING_OPEN = time(9, 30)
+MORNING_CLOSE = time(11, 30)
+AFTERNOON_OPEN = time(13, 0)
+AFTERNOON_CLOSE = time(15, 0)
+
+CALENDAR_FILE = 'trade_calendar.txt'
+CALENDAR_MAX_AGE = 7 * 24 * 3600  # 已保存日历的有效期（秒）
+
+_trade_dates = None  # 已加载的交易日集合，None 表示按工作日判断
+_trade_range = None  # 已加载日历覆盖的 (最早, 最晚) 日期，范围之外按工作日判断
+_calendar_ready = False  # 已加载、已尝试联网加载或已手动设置，之后不再自动加载
+_saved_checked = False   # 已读取过磁盘上保存的日历
+_calendar_lock = threading.Lock()
+_loading_thread = None  # 正在加载日历的线程
+
+
+def calendar_path():
+    """保存交易日历的文件，未设置 STOCK_CACHE_DIR 时为 None（只保存在进程内）"""
+    folder = os.environ.get('STOCK_CACHE_DIR')
+    return os.path.join(folder, CALENDAR_FILE) if folder else None
+
+
+def load_trade_calendar():
+    """
+    从 akshare 重新加载交易日历（含节假日）并保存到磁盘缓存，失败时沿用已保存的日历或按工作日判断
+    加载期间其他线程的交易日判断会等待加载结束，不会先按工作日计算缓存时段
+    """
+    with _calendar_lock:
+        return _load_locked(fetch=True, force=True)
+
+
+def ensure_trade_calendar(fetch=True):
+    """
+    尚未加载时加载一次交易日历：优先使用磁盘上未过期的日历，
+    fetch=True 时再联网获取（每个进程只尝试一次，失败后按工作日判断）；其他线程正在加载时等待其完成
+    """
+    if not _calendar_ready and _loading_thread != threading.get_ident():
+        with _calendar_lock:
+            if not _calendar_ready and (fetch or not _saved_checked):
+                _load_locked(fetch)
+    return _trade_dates is not None
+
+
+def _load_locked(fetch, force=False):
+    global _calendar_ready, _saved_checked, _loading_thread
+    _loading_thread = threading.get_ident()
+    try:
+        saved, fresh = _read_saved()
+        _saved_checked = True
+        if fresh and not force:
+            set_trade_dates(saved)
+            return True
+        if not fetch:
+            # 过期的日历先用着，数据源联网时再更新
+            if saved:
+                _set_dates(saved)
+            return saved is not None
+        try:
+            import akshare as ak
+            df = ak.tool_trade_date_hist_sina()
+            set_trade_dates(df['trade_date'])
+            _save(sorted(_trade_dates))
+            return True
+        except Exception as e:
+            if saved:
+                print(f"加载交易日历失败，沿用已保存的日历: {e}")
+                set_trade_dates(saved)
+            else:
+                print(f"加载交易日历失败，按工作日判断: {e}")
+            _calendar_ready = True
+            return False
+    finally:
+        _loading_thread = None
+
+
+def _read_saved():
+    """读取保存的日历，返回 (日期字符串列表或 None, 是否未过期)"""
+    path = calendar_path()
+    if not path:
+        return None, False
+    try:
+        with open(path, encoding='utf-8') as f:
+            dates = [line.strip() for line in f if line.strip()]
+        fresh = datetime.now().timestamp() - os.path.getmtime(path) < CALENDAR_MAX_AGE
+    except (OSError, ValueError):
+        return None, False
+    return (dates, fresh) if dates else (None, False)
+
+
+def _save(dates):
+    """原子地写入日历文件（先写同目录下的临时文件再替换）"""
+    path = calendar_path()
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=CALENDAR_FILE, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(d.strftime('%Y-%m-%d') for d in dates))
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"保存交易日历失败: {e}")
+
+
+def set_trade_dates(dates):
+    """设置交易日集合（可传入 date/datetime/字符串），传入 None 恢复按工作日判断"""
+    global _calendar_ready
+    _set_dates(dates)
+    _calendar_ready = True
+
+
+def _set_dates(dates):
+    global _trade_dates, _trade_range
+    if dates is None:
+        _trade_dates = None
+        _trade_range = None
+        return
+    parsed = set()
+    for d in dates:
+        if isinstance(d, datetime):
+            d = d.date()
+        elif isinstance(d, str):
+            d = datetime.strptime(d.replace('-', ''), '%Y%m%d').date()
+        parsed.add(d)
+    # 先设置集合再设置范围：并发读取时范围内的日期总能在集合中查到
+    _trade_dates = parsed
+    _trade_range = (min(parsed), max(parsed)) if parsed else None
+
+
+def is_trading_day(day):
+    # 首次使用时读取已保存的日历；其他线程正在加载时等待加载结束
+    if not _calendar_ready and (not _saved_checked or _loading_thread is not None):
+        ensure_trade_calendar(fetch=False)
+    if isinstance(day, datetime):
+        day = day.date()
+    if _trade_range is not None and _trade_range[0] <= day <= _trade_range[1]:
+        return day in _trade_dates
+    return day.weekday() < 5
+
+
+def previous_trading_day(day):
+    """day 之前（不含当天）最近的交易日"""
+    day = day.date() if isinstance(day, datetime) else day
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def next_trading_day(day):
+    """day 之后（不含当天）最近的交易日"""
+    day = day.date() if isinstance(day, datetime) else day
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def market_phase(now=None):
+    """
+    当前所处时段：
+    pre 开盘前 / am 上午盘 / break 午间休市 / pm 下午盘 / closed 收盘后或非交易日
+    """
+    now = now or datetime.now()
+    if not is_trading_day(now):
+        return 'closed'
+    t = now.time()
+    if t < MORNING_OPEN:
+        return 'pre'
+    if t < MORNING_CLOSE:
+        return 'am'
+    if t < AFTERNOON_OPEN:
+        return 'break'
+    if t < AFTERNOON_CLOSE:
+        return 'pm'
+    return 'closed'
+
+
+def is_trading_time(now=None):
+    return market_phase(now) in ('am', 'pm')
+
+
+def market_date(now=None):
+    """当前行情数据所属的交易日：开盘后为当天，开盘前或非交易日为上一个交易日"""
+    now = now or datetime.now()
+    if is_trading_day(now) and now.time() >= MORNING_OPEN:
+        return now.date()
+    return previous_trading_day(now)
+
+
+def session_key(now=None):
+    """
+    行情数据的时段标识，如 20240102-am、20240102-close
+    周末、节假日与开盘前都归入上一个交易日的 close，不会被当作实时数据
+    """
+    now = now or datetime.now()
+    phase = market_phase(now)
+    if phase in ('pre', 'closed'):
+        phase = 'close'
+    return f"{market_date(now):%Y%m%d}-{phase}"
+
+
+def next_session_change(now=None):
+    """下一个时段切换时刻（开盘、午休、午后开盘、收盘之一）"""
+    now = now or datetime.now()
+    day = now.date()
+    if is_trading_day(day):
+        for t in (MORNING_OPEN, MORNING_CLOSE, AFTERNOON_OPEN, AFTERNOON_CLOSE):
+            boundary = datetime.combine(day, t)
+            if boundary > now:
+                return boundary
+    return datetime.combine(next_trading_day(day), MORNING_OPEN)
+
+
+def next_close(now=None):
+    """下一次收盘时刻"""
+    now = now or datetime.now()
+    if is_trading_day(now):
+        close = datetime.combine(now.date(), AFTERNOON_CLOSE)
+        if close > now:
+            return close
+    return datetime.combine(next_trading_day(now), AFTERNOON_CLOSE)
+
+
+def last_session_end(now=None):
+    """最近一次交易时段结束的时刻（上午收盘或下午收盘）；盘中返回 now，即行情仍在更新"""
+    now = now or datetime.now()
+    if is_trading_time(now):
+        return now
+    if is_trading_day(now):
+        for t in (AFTERNOON_CLOSE, MORNING_CLOSE):
+            end = datetime.combine(now.date(), t)
+            if end <= now:
+                return end
+    return datetime.combine(previous_trading_day(now), AFTERNOON_CLOSE)
+
+
+def session_progress(now=None):
+    """
+    当日已交易时间占全天 240 分钟的比例（0~1）：开盘前为 0，午休按上午收盘计，收盘后及非交易日为 1
+    用于把盘中的累计成交量/成交额与全天的历史均值比较
+    """
+    now = now or datetime.now()
+    phase = market_phase(now)
+    if phase == 'pre':
+        return 0.0
+    if phase == 'closed':
+        return 1.0
+    if phase == 'am':
+        elapsed = (now - datetime.combine(now.date(), MORNING_OPEN)).total_seconds() / 60
+    elif phase == 'break':
+        elapsed = 120
+    else:
+        elapsed = 120 + (now - datetime.combine(now.date(), AFTERNOON_OPEN)).total_seconds() / 60
+    return min(max(elapsed / 240, 0.0), 1.0)
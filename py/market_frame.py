@@ -0,0 +1,182 @@
+"""
+紧凑的全市场行情表示
+ak.stock_zh_a_spot 返回的 DataFrame 为 object/float64 列加中文列名，单份约数 MB。
+MarketFrame 把一份快照保存为按固定股票下标对齐的 numpy 数组：
+价格类为 float32，成交量为 int64，成交额与涨跌幅为 float64（求和、求平均不丢精度），
+股票代码/名称只在所有快照共享的 SymbolIndex 中保存一份（导出时为 categorical），
+每份快照只保存名称编号，股票更名后旧快照仍显示当时的名称。
+单份 5000 只股票的快照约 260KB，一个进程内可以保留一天数百份快照。
+概况统计直接在数组上计算，不产生布尔筛选出的中间 DataFrame
+"""
+import numpy as np
+import pandas as pd
+
+# 中文列名 -> (字段名, dtype)
+SPOT_FIELDS = {
+    '最新价': ('price', np.float32),
+    '涨跌额': ('change', np.float32),
+    '涨跌幅': ('change_pct', np.float64),
+    '昨收': ('prev_close', np.float32),
+    '今开': ('open', np.float32),
+    '最高': ('high', np.float32),
+    '最低': ('low', np.float32),
+    '成交量': ('volume', np.int64),
+    '成交额': ('amount', np.float64),
+}
+
+REQUIRED_COLUMNS = ('代码', '涨跌幅', '成交额')
+
+
+class SymbolIndex:
+    """
+    股票代码 -> 固定下标，只追加不删除（新股票排在末尾），
+    多份快照共用同一个索引，同一只股票在每份快照中的下标相同；
+    names 为各股票的最新名称，出现过的全部名称另存于 name_pool，供快照按编号引用
+    """
+
+    def __init__(self, codes=None, names=None):
+        self._pos = {}
+        self.codes = []
+        self.names = []
+        self.name_pool = []
+        self._name_ids = {}
+        if codes is not None:
+            self.positions(codes, names)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def positions(self, codes, names=None):
+        """返回各代码的下标（int32 数组），未出现过的代码追加到末尾；names 会更新对应名称"""
+        pos = np.empty(len(codes), dtype=np.int32)
+        lookup = self._pos
+        if names is None:
+            names = [None] * len(codes)
+        for i, (code, name) in enumerate(zip(codes, names)):
+            p = lookup.get(code)
+            if p is None:
+                p = lookup[code] = len(self.codes)
+                self.codes.append(code)
+                self.names.append(name if name is not None else '')
+            elif name is not None and self.names[p] != name:
+                self.names[p] = name  # 更名（如戴帽摘帽）
+            pos[i] = p
+        return pos
+
+    def name_ids(self, names):
+        """名称在 name_pool 中的编号（int32 数组），未出现过的名称追加到末尾"""
+        ids = np.empty(len(names), dtype=np.int32)
+        lookup = self._name_ids
+        for i, name in enumerate(names):
+            k = lookup.get(name)
+            if k is None:
+                k = lookup[name] = len(self.name_pool)
+                self.name_pool.append(name)
+            ids[i] = k
+        return ids
+
+    def get(self, code):
+        return self._pos.get(code)
+
+
+class MarketFrame:
+    """一份全市场快照，所有数组长度等于创建时 SymbolIndex 的大小"""
+
+    def __init__(self, index, arrays, present, time=None, name_ids=None):
+        self.index = index
+        self.arrays = arrays    # 字段名 -> 按股票下标对齐的数组
+        self.present = present  # 本快照中出现的股票
+        self.time = time
+        self.name_ids = name_ids  # 本快照中的名称编号（index.name_pool），None 时使用最新名称
+
+    @classmethod
+    def from_spot(cls, df, index=None, time=None):
+        """由 ak.stock_zh_a_spot 结构的 DataFrame 构建；index 缺省时新建"""
+        for col in REQUIRED_COLUMNS:
+            if col not in df.columns:
+                raise ValueError(f"数据缺少必要列：{col}")
+        index = index if index is not None else SymbolIndex()
+        names = df['名称'].astype(str).tolist() if '名称' in df.columns else None
+        pos = index.positions(df['代码'].astype(str).tolist(), names)
+        n = len(index)
+
+        arrays = {}
+        for col, (field, dtype) in SPOT_FIELDS.items():
+            if col in df.columns:
+                values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+            else:
+                values = np.full(len(df), np.nan)
+            if np.issubdtype(dtype, np.integer):
+                out = np.zeros(n, dtype=dtype)
+                out[pos] = np.nan_to_num(values, nan=0.0)
+            else:
+                out = np.full(n, np.nan, dtype=dtype)
+                out[pos] = values
+            arrays[field] = out
+        present = np.zeros(n, dtype=bool)
+        present[pos] = True
+        if time is None:
+            time = df.attrs.get('snapshot_time')
+        name_ids = None
+        if names is not None:
+            name_ids = np.full(n, -1, dtype=np.int32)
+            name_ids[pos] = index.name_ids(names)
+        return cls(index, arrays, present, time, name_ids)
+
+    def __len__(self):
+        return int(self.present.sum())
+
+    def __getitem__(self, field):
+        return self.arrays[field]
+
+    @property
+    def nbytes(self):
+        extra = self.name_ids.nbytes if self.name_ids is not None else 0
+        return sum(a.nbytes for a in self.arrays.values()) + self.present.nbytes + extra
+
+    def names(self, pos):
+        """本快照中各下标股票的名称（快照之后的更名不影响）"""
+        if self.name_ids is None:
+            return np.asarray(self.index.names, dtype=object)[pos]
+        return np.asarray(self.index.name_pool, dtype=object)[self.name_ids[pos]]
+
+    def aligned(self, field, size=None):
+        """字段数组补齐到 size（索引在本快照之后增长时，新股票位置为 NaN/0）"""
+        values = self.arrays[field]
+        size = size or len(self.index)
+        if len(values) >= size:
+            return values
+        fill = 0 if np.issubdtype(values.dtype, np.integer) else np.nan
+        return np.concatenate([values, np.full(size - len(values), fill, dtype=values.dtype)])
+
+    def breadth(self):
+        """上涨、下跌家数（NaN 不计入，与 df[df['涨跌幅'] > 0] 语义一致）"""
+        change = self.arrays['change_pct']
+        return int(np.count_nonzero(change > 0)), int(np.count_nonzero(change < 0))
+
+    def overview(self):
+        """与 MarketSentiment.get_market_overview 相同结构的概况统计"""
+        up_count, down_count = self.breadth()
+        change = self.arrays['change_pct']
+        valid = self.present & ~np.isnan(change)
+        return {
+            'up_count': up_count,
+            'down_count': down_count,
+            'up_down_ratio': up_count / (down_count if down_count > 0 else 1),
+            'total_amount': float(np.nansum(self.arrays['amount'])) / 100000000,  # 转化为亿元
+            'avg_change': float(change.mean(where=valid, dtype=np.float64)) if valid.any() else np.nan,
+        }
+
+    def to_frame(self):
+        """还原为中文列名的 DataFrame（代码、名称为 categorical），仅含本快照出现的股票"""
+        pos = np.flatnonzero(self.present)
+        data = {
+            '代码': pd.Categorical.from_codes(pos, categories=self.index.codes[:len(self.present)]),
+            '名称': pd.Categorical(self.names(pos)),
+        }
+        for col, (field, _) in SPOT_FIELDS.items():
+            data[col] = self.arrays[field][pos]
+        df = pd.DataFrame(data)
+        if self.time is not None:
+            df.attrs['snapshot_time'] = self.time
+        return df
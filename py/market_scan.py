@@ -0,0 +1,194 @@
+"""
+全市场技术扫描的多进程计算阶段
+数据获取完成后，指标与信号计算是纯 CPU 的 pandas 运算，受 GIL 限制只能用满一个核。
+这里把全部股票的 close/volume/high/low 与K线时间打包进一块共享内存，按股票分块派发给进程池，
+子进程直接映射共享内存还原完整的分时表（不序列化 DataFrame），只回传体积很小的结果，
+结果（含支撑压力位与信号时间）与 scanner.scan_symbols 对同样数据的分析相同。
+进程池在多次调用之间复用（也可由调用方传入 executor），避免每次扫描都重新启动子进程并导入模块
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import minute
+    from .scanner import summarize_result
+except ImportError:  # 直接以脚本方式运行
+    import minute
+    from scanner import summarize_result
+
+
+PRICE_COLUMNS = ['close', 'volume', 'high', 'low']
+NO_TIME = np.iinfo(np.int64).min  # 没有 day 列时的时间占位
+
+
+def pack_frames(frames):
+    """
+    把 {股票代码: 分时数据} 打包进共享内存
+    布局为 [close | volume | high | low]（float64，全部股票首尾相接）后接 day（int64 纳秒），
+    缺少 high/low 的股票填 NaN（与只用收盘价的计算等价），缺少 day 的填 NO_TIME；
+    返回 (共享内存, 代码列表, 偏移数组)，调用方负责 close() 与 unlink()
+    """
+    symbols = []
+    columns = {col: [] for col in PRICE_COLUMNS}
+    days = []
+    for code, df in frames.items():
+        if df is None or df.empty:
+            continue
+        symbols.append(code)
+        for col in PRICE_COLUMNS:
+            values = (pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64) if col in df.columns
+                      else np.full(len(df), np.nan))
+            columns[col].append(values)
+        if 'day' in df.columns:
+            days.append(pd.to_datetime(df['day']).to_numpy(dtype='datetime64[ns]').view(np.int64))
+        else:
+            days.append(np.full(len(df), NO_TIME, dtype=np.int64))
+
+    offsets = np.zeros(len(symbols) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(d) for d in days])
+    total = int(offsets[-1])
+
+    shm = shared_memory.SharedMemory(create=True, size=max(total * (len(PRICE_COLUMNS) + 1) * 8, 1))
+    prices, times = _views(shm, total)
+    if total:
+        for i, col in enumerate(PRICE_COLUMNS):
+            prices[i] = np.concatenate(columns[col])
+        times[:] = np.concatenate(days)
+    del prices, times  # 释放对共享内存的引用，否则无法 close
+    return shm, symbols, offsets
+
+
+def _views(shm, total):
+    """共享内存上的 (价格/成交量 float64 矩阵, 时间 int64 数组) 视图"""
+    prices = np.ndarray((len(PRICE_COLUMNS), total), dtype=np.float64, buffer=shm.buf)
+    times = np.ndarray((total,), dtype=np.int64, buffer=shm.buf, offset=len(PRICE_COLUMNS) * total * 8)
+    return prices, times
+
+
+def _unpack_frame(prices, times, start, end):
+    """还原一只股票的分时表（只复制本股票的数据，之后的计算不再引用共享内存）"""
+    df = pd.DataFrame({col: prices[i, start:end].copy() for i, col in enumerate(PRICE_COLUMNS)})
+    day = times[start:end]
+    if len(day) and day[0] != NO_TIME:
+        # datetime64 转字符串与原 day 列格式相同（'%Y-%m-%d %H:%M:%S'），只在 signal_times 中转换
+        df.insert(0, 'day', day.astype('datetime64[ns]'))
+    return df
+
+
+def _analyze_chunk(shm_name, total, symbols, bounds):
+    """子进程：对一块股票计算指标、信号与点位预测，返回 [(代码, 汇总行, 信号表, 信号时间)]"""
+    # 子进程与主进程共用同一个资源追踪器，由主进程负责 unlink
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        prices, times = _views(shm, total)
+        results = []
+        for code, (start, end) in zip(symbols, bounds):
+            t0 = time.perf_counter()
+            df = minute.add_indicators(_unpack_frame(prices, times, start, end))
+            signals = minute.analyze_trading_signals(code, df=df)
+            result = {
+                'status': 'ok',
+                'signals': signals,
+                'signal_times': minute.signal_times(signals, df),
+                'predictions': minute.predict_price_points(code, df=df),
+            }
+            result['elapsed'] = time.perf_counter() - t0
+            results.append((code, summarize_result(result), signals, result['signal_times']))
+        del prices, times
+        return results
+    finally:
+        shm.close()
+
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers=None):
+    """进程内共享的进程池，进程数变化时重建；子进程在多次扫描之间保持已导入的模块"""
+    global _pool, _pool_workers
+    workers = workers or os.cpu_count() or 1
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=True)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """关闭共享进程池（下次扫描时重新创建）"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = None
+        _pool_workers = None
+
+
+def scan_market(frames, workers=None, chunk_size=64, executor=None):
+    """
+    多进程计算全市场的交易信号与点位预测
+    frames: {股票代码: ak.stock_zh_a_minute 结构的分时数据}
+    executor: 可选，调用方管理的进程池；缺省使用 get_pool(workers) 的共享进程池
+    返回 {'summary': 以股票代码为索引的汇总表, 'signals': 带 symbol 与 day（K线时间）列的全部信号}
+    """
+    executor = executor or get_pool(workers)
+    shm, symbols, offsets = pack_frames(frames)
+    total = int(offsets[-1])
+    bounds = list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+
+    rows = {}
+    signal_frames = []
+    try:
+        futures = [
+            executor.submit(_analyze_chunk, shm.name, total,
+                            symbols[i:i + chunk_size], bounds[i:i + chunk_size])
+            for i in range(0, len(symbols), chunk_size)
+        ]
+        for future in as_completed(futures):
+            for code, row, signals, times in future.result():
+                rows[code] = row
+                if signals is not None and not signals.empty:
+                    signal_frames.append(signals.assign(symbol=code, day=times))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # 未进入计算的空数据股票也保留在汇总中
+    for code, df in frames.items():
+        if code not in rows:
+            rows[code] = summarize_result({'status': 'empty'})
+
+    summary = pd.DataFrame.from_dict(rows, orient='index').reindex(list(frames)).drop(columns='attempts')
+    summary.index.name = 'symbol'
+    signals = pd.concat(signal_frames, ignore_index=True) if signal_frames else pd.DataFrame()
+    return {'summary': summary, 'signals': signals}
+
+
+if __name__ == "__main__":
+    import sys
+
+    try:
+        from .benchmark import make_minute_bars
+    except ImportError:
+        from benchmark import make_minute_bars
+
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    frames = {f"sz{i:06d}": make_minute_bars(240, seed=i) for i in range(n_symbols)}
+    for n_workers in sorted({1, os.cpu_count() or 1}):
+        # 第一次包含进程启动与模块导入，第二次复用进程池
+        for run in ('首次', '复用'):
+            t0 = time.perf_counter()
+            report = scan_market(frames, workers=n_workers)
+            print(f"{n_symbols} 只股票, {n_workers} 进程（{run}）: {time.perf_counter() - t0:.2f}s, "
+                  f"信号 {len(report['signals'])} 条")
+    shutdown_pool()
@@ -1,167 +1,239 @@
-import akshare as ak
+import numpy as np
 import pandas as pd
 
-def get_stock_intraday_data(stock_code):
-    """获取股票分时数据"""
+try:
+    from .data_provider import get_default_provider
+    from .instrumentation import metrics
+    from .price_levels import PriceLevels
+    from .resample import resample_bars
+except ImportError:  # 直接以脚本方式运行
+    from data_provider import get_default_provider
+    from instrumentation import metrics
+    from price_levels import PriceLevels
+    from resample import resample_bars
+
+@metrics.timed('minute.fetch')
+def get_stock_intraday_data(stock_code, provider=None):
+    """
+    获取股票分时数据
+    provider: 数据源，默认为实时 akshare 数据源（带缓存）
+    """
     try:
-        # 获取分时数据
-        stock_zh_a_minute = ak.stock_zh_a_minute(
-            symbol=stock_code, 
+        provider = provider or get_default_provider()
+        return provider.stock_zh_a_minute(
+            symbol=stock_code,
             period='1',  # 1分钟
             adjust=""
         )
-        return stock_zh_a_minute
     except Exception as e:
         print(f"获取分时数据失败: {e}")
         return None
 
-def analyze_trading_signals(stock_code):
+@metrics.timed('minute.indicators')
+def add_indicators(df):
+    """
+    在分时数据上一次性计算全部技术指标（原地添加列并返回 df）
+    signals 与价格预测共用同一份指标，避免重复计算
+    """
+    metrics.count('rows_processed', len(df), stage='minute.indicators')
+    # 转换数据类型
+    df['close'] = pd.to_numeric(df['close'], errors='coerce')
+    df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
+
+    # 均线与波动
+    df['ma10'] = df['close'].rolling(window=10).mean()  # 10分钟均线，若窗口大小的数据不足，返回值为NaN
+    df['ma30'] = df['close'].rolling(window=30).mean()  # 30分钟均线
+    df['std20'] = df['close'].rolling(window=20).std()  # 20周期标准差
+    df['volume_ma10'] = df['volume'].rolling(window=10).mean()
+
+    # 计算MACD
+    exp12 = df['close'].ewm(span=12, adjust=False).mean() # 12周期EMA（快速线）
+    exp26 = df['close'].ewm(span=26, adjust=False).mean() # 26周期EMA（慢速线）
+    df['MACD'] = exp12 - exp26 # 当 MACD 为正值时，短期趋势向上；负值则表示短期趋势向下。
+    df['SIGNAL'] = df['MACD'].ewm(span=9, adjust=False).mean() # 用于平滑 MACD 线的波动，减少假信号
+    df['HIST'] = df['MACD'] - df['SIGNAL']
+
+    # 计算动量指标
+    df['momentum'] = df['close'].diff(periods=5)
+    df['volume_change'] = df['volume'].pct_change()
+
+    # 计算趋势强度
+    price_change = df['close'].pct_change()
+    df['trend_strength'] = price_change.rolling(window=20).mean() / price_change.rolling(window=20).std()
+
+    return df
+
+def build_indicator_frame(stock_code, provider=None, period=1):
+    """
+    获取一次分时数据并计算全部技术指标，供 analyze_trading_signals 与 predict_price_points 共用
+    period: K线周期（分钟），大于1时由1分钟K线重采样，不另外请求其他周期的数据
+    """
+    df = get_stock_intraday_data(stock_code, provider)
+    if df is None or df.empty:
+        return None
+    if period != 1:
+        df = resample_bars(df, period)
+    return add_indicators(df)
+
+# 交易规则表：顺序即优先级（与原逐行 if/elif 判断顺序一致），信号编码 = 下标 + 1
+SIGNAL_RULES = (
+    ('买入', '趋势突破买点', '强'),
+    ('买入', '回调企稳买点', '中'),
+    ('卖出', '趋势转折卖点', '强'),
+    ('卖出', '强势获利卖点', '中'),
+)
+
+
+def signal_codes(close, volume, ma10, ma30, volume_ma10, hist, momentum, volume_change, start=30,
+                 volume_up=1.2, volume_down=0.8, deviation=1.03):
+    """
+    以列式布尔掩码一次性评估四条买卖规则
+    输入均为等长的 numpy 数组，返回每根K线命中的规则编码（0 表示无信号）
+    volume_up/volume_down: 放量/缩量相对均量的倍数；deviation: 获利了结要求的价格偏离均线倍数
+    """
+    n = len(close)
+    codes = np.zeros(n, dtype=np.int8)
+    if n <= start:
+        return codes
+
+    # 前一根K线的均线值，第一根没有前值，用NaN填充使比较结果为False
+    ma10_prev = np.concatenate(([np.nan], ma10[:-1]))
+    ma30_prev = np.concatenate(([np.nan], ma30[:-1]))
+    ma10_trend = ma10 - ma10_prev
+
+    trend_up = ma10_trend > 0
+    bull_aligned = ma10 > ma30
+
+    conditions = [
+        # 趋势突破买点：金叉 + MACD柱为正 + 放量确认
+        trend_up & bull_aligned & (ma10_prev <= ma30_prev) & (hist > 0)
+        & (volume > volume_ma10 * volume_up),
+        # 回调企稳买点：多头排列下回踩均线，动量转正且量能放大
+        trend_up & bull_aligned & (close < ma10) & (momentum > 0) & (volume_change > 0),
+        # 趋势转折卖点：死叉 + MACD柱为负
+        (ma10_trend < 0) & (ma10 < ma30) & (ma10_prev >= ma30_prev) & (hist < 0),
+        # 强势获利卖点：动量减弱、量能萎缩且价格明显偏离均线
+        trend_up & (momentum < 0) & (volume < volume_ma10 * volume_down) & (close > ma10 * deviation),
+    ]
+    # np.select 按顺序取第一个命中的条件，等价于 if/elif 的优先级
+    codes[start:] = np.select(
+        [cond[start:] for cond in conditions],
+        np.arange(1, len(conditions) + 1, dtype=np.int8),
+        default=0,
+    )
+    return codes
+
+
+@metrics.timed('minute.signals')
+def detect_signals(df):
+    """
+    基于指标表识别交易信号（列式实现）
+    df 为 add_indicators/build_indicator_frame 的结果，返回与 analyze_trading_signals 相同结构的信号表
+    """
+    # 从第31行开始评估（需要30分钟移动平均）
+    codes = signal_codes(
+        df['close'].to_numpy(dtype=float),
+        df['volume'].to_numpy(dtype=float),
+        df['ma10'].to_numpy(dtype=float),
+        df['ma30'].to_numpy(dtype=float),
+        df['volume_ma10'].to_numpy(dtype=float),
+        df['HIST'].to_numpy(dtype=float),
+        df['momentum'].to_numpy(dtype=float),
+        df['volume_change'].to_numpy(dtype=float),
+    )
+    hit = np.flatnonzero(codes)
+    if len(hit) == 0:
+        return pd.DataFrame()
+
+    rules = np.array(SIGNAL_RULES, dtype=object)[codes[hit] - 1]
+    signals_df = pd.DataFrame({
+        'time': df.index[hit],
+        'price': df['close'].to_numpy()[hit],
+        'signal': rules[:, 0],
+        'reason': rules[:, 1],
+        'strength': rules[:, 2],
+    })
+    signals_df['price_change'] = signals_df['price'].pct_change()
+    signals_df = signals_df.round(6)  # 四舍五入到6位小数
+
+    return signals_df
+
+
+def signal_times(signals, df):
+    """信号所在K线的时间（df 的 day 列，字符串），df 没有 day 列时返回信号表中的行号"""
+    if signals is None or signals.empty:
+        return []
+    if 'day' not in df.columns:
+        return signals['time'].tolist()
+    return df.loc[signals['time'], 'day'].astype(str).tolist()
+
+
+def analyze_trading_signals(stock_code, df=None, provider=None, period=1):
     """
     分析分时数据并给出交易信号
     基于趋势分析的交易信号识别系统
+    df: 可选，build_indicator_frame 预先算好的指标表，传入时不再重复获取数据
+    provider: 数据源，默认为实时 akshare 数据源
+    period: K线周期（1/5/15/30/60 分钟），传入 df 时以 df 为准
     """
     try:
-        # 获取分时数据
-        df = get_stock_intraday_data(stock_code)
+        if df is None:
+            df = build_indicator_frame(stock_code, provider, period)
         if df is None or df.empty:
             return None
 
-        # 转换数据类型
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
-
-        # 计算技术指标
-        df['ma10'] = df['close'].rolling(window=10).mean()  # 10分钟均线，若窗口大小的数据不足，返回值为NaN
-        df['ma30'] = df['close'].rolling(window=30).mean()  # 30分钟均线
-        df['volume_ma10'] = df['volume'].rolling(window=10).mean()
-
-        # 计算MACD
-        exp12 = df['close'].ewm(span=12, adjust=False).mean() # 12周期EMA（快速线）
-        exp26 = df['close'].ewm(span=26, adjust=False).mean() # 26周期EMA（慢速线）
-        df['MACD'] = exp12 - exp26 # 当 MACD 为正值时，短期趋势向上；负值则表示短期趋势向下。
-        df['SIGNAL'] = df['MACD'].ewm(span=9, adjust=False).mean() # 用于平滑 MACD 线的波动，减少假信号
-        df['HIST'] = df['MACD'] - df['SIGNAL']
-
-        # 计算动量指标
-        df['momentum'] = df['close'].diff(periods=5)
-        df['volume_change'] = df['volume'].pct_change()
-
-        # 初始化信号列表
-        signals = []
-
-        # 遍历数据（从第31行开始，因为需要30分钟移动平均）
-        for i in range(30, len(df)):
-            current_price = df['close'].iloc[i]
-            current_volume = df['volume'].iloc[i]
-            timestamp = df.index[i]
-
-            # 趋势判断
-            ma10_trend = df['ma10'].iloc[i] - df['ma10'].iloc[i-1]
-            ma30_trend = df['ma30'].iloc[i] - df['ma30'].iloc[i-1]
-            macd_hist = df['HIST'].iloc[i]
-            momentum = df['momentum'].iloc[i]
-            volume_change = df['volume_change'].iloc[i]
-
-            # 买点信号
-            if (ma10_trend > 0 and  # 短期趋势向上
-                df['ma10'].iloc[i] > df['ma30'].iloc[i] and  # 短期均线在长期均线上方
-                df['ma10'].iloc[i-1] <= df['ma30'].iloc[i-1] and  # 发生金叉
-                macd_hist > 0 and  # MACD柱状图为正
-                current_volume > df['volume_ma10'].iloc[i] * 1.2):  # 放量确认
-                signals.append({
-                    'time': timestamp,
-                    'price': current_price,
-                    'signal': '买入',
-                    'reason': '趋势突破买点',
-                    'strength': '强'
-                })
-
-            # 回调买点
-            elif (ma10_trend > 0 and  # 短期趋势仍向上
-                  df['ma10'].iloc[i] > df['ma30'].iloc[i] and  # 均线维持多头排列
-                  current_price < df['ma10'].iloc[i] and  # 价格回调到均线附近
-                  momentum > 0 and  # 动量转正
-                  volume_change > 0):  # 量能开始放大
-                signals.append({
-                    'time': timestamp,
-                    'price': current_price,
-                    'signal': '买入',
-                    'reason': '回调企稳买点',
-                    'strength': '中'
-                })
-
-            # 卖点信号
-            elif (ma10_trend < 0 and  # 短期趋势向下
-                  df['ma10'].iloc[i] < df['ma30'].iloc[i] and  # 短期均线在长期均线下方
-                  df['ma10'].iloc[i-1] >= df['ma30'].iloc[i-1] and  # 发生死叉
-                  macd_hist < 0):  # MACD柱状图为负
-                signals.append({
-                    'time': timestamp,
-                    'price': current_price,
-                    'signal': '卖出',
-                    'reason': '趋势转折卖点',
-                    'strength': '强'
-                })
-
-            # 获利了结卖点
-            elif (ma10_trend > 0 and  # 虽然趋势向上
-                  momentum < 0 and  # 但动量减弱
-                  current_volume < df['volume_ma10'].iloc[i] * 0.8 and  # 量能萎缩
-                  current_price > df['ma10'].iloc[i] * 1.03):  # 价格明显偏离均线
-                signals.append({
-                    'time': timestamp,
-                    'price': current_price,
-                    'signal': '卖出',
-                    'reason': '强势获利卖点',
-                    'strength': '中'
-                })
-
-        signals_df = pd.DataFrame(signals)
-        if not signals_df.empty:
-            signals_df['price_change'] = signals_df['price'].pct_change()
-            signals_df = signals_df.round(6)  # 四舍五入到3位小数
-
-        return signals_df
+        return detect_signals(df)
 
     except Exception as e:
         print(f"分析交易信号时出错: {e}")
         return None
 
+def _level_reasons(level, side, reason):
+    """根据价位来源补充预测原因，返回置信度加成"""
+    if level is None:
+        return 0.0
+    bonus = 0.0
+    if level['touches'] >= 2:
+        reason.append(f"多次触及的前期高低点{side}（{level['touches']}次）")
+        bonus += 0.05 * min(level['touches'], 3)
+    elif level['touches'] == 1:
+        pivot = '高低' if {'high', 'low'} <= set(level['kinds']) else ('高' if 'high' in level['kinds'] else '低')
+        reason.append(f"前期{pivot}点{side}")
+    if level['volume_share'] > 0:
+        reason.append(f"成交密集区{side}（占成交量{level['volume_share']:.0%}）")
+        bonus += 0.1
+    return bonus
+
 # 预测未来可能的买卖点位 价格预测模块
-def predict_price_points(stock_code):
+@metrics.timed('minute.predict')
+def predict_price_points(stock_code, df=None, provider=None, period=1, levels=None):
     """
     预测未来可能的买卖点位
+    df: 可选，build_indicator_frame 预先算好的指标表，传入时不再重复获取数据
+    provider: 数据源，默认为实时 akshare 数据源
+    period: K线周期（1/5/15/30/60 分钟），传入 df 时以 df 为准
+    levels: 可选，调用方增量维护的 price_levels.PriceLevels（与 df 同一只股票、同一周期），
+            缺省时由 df 批量构建
     """
     try:
-        df = get_stock_intraday_data(stock_code)
+        if df is None:
+            df = build_indicator_frame(stock_code, provider, period)
         if df is None or df.empty:
             return None
+        # 均线窗口按K线根数计算，换算为分钟用于说明
+        bar_minutes = df.attrs.get('period', 1)
+        ma_fast_label = f"{10 * bar_minutes}分钟均线"
+        ma_slow_label = f"{30 * bar_minutes}分钟均线"
 
-        # 数据预处理
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
-
-        # 计算基础指标
-        df['ma10'] = df['close'].rolling(window=10).mean()
-        df['ma30'] = df['close'].rolling(window=30).mean()
-        df['std20'] = df['close'].rolling(window=20).std()  # 20周期标准差
-
-        # MACD指标
-        exp12 = df['close'].ewm(span=12, adjust=False).mean()
-        exp26 = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp12 - exp26
-        df['SIGNAL'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['HIST'] = df['MACD'] - df['SIGNAL']
-
-        # 计算支撑压力位
+        # 计算支撑压力位：摆动高低点与成交密集区聚类后的价位，取距当前价最近的3个
         latest_price = df['close'].iloc[-1]
-        high_prices = df['close'].nlargest(5)  # 最近高点
-        low_prices = df['close'].nsmallest(5)  # 最近低点
+        if levels is None:
+            levels = PriceLevels.from_frame(df)
+        nearest = levels.nearest(latest_price, k=3)
+        level_info = {}  # 价位 -> 来源信息，用于给出预测原因
 
-        # 计算趋势强度
-        price_change = df['close'].pct_change()
-        trend_strength = price_change.rolling(window=20).mean() / price_change.rolling(window=20).std()
-        current_trend = trend_strength.iloc[-1]
+        # 趋势强度
+        current_trend = df['trend_strength'].iloc[-1]
 
         # 计算波动范围
         volatility = df['std20'].iloc[-1] / df['close'].iloc[-1]
@@ -177,25 +249,30 @@ def predict_price_points(stock_code):
         for ma in [df['ma10'].iloc[-1], df['ma30'].iloc[-1]]:
             if ma < latest_price:
                 support_levels.append(ma)
-        support_levels.extend(low_prices[low_prices < latest_price])
+        for level in nearest['supports']:
+            support_levels.append(level['price'])
+            level_info[level['price']] = level
 
         # 压力位预测（卖点）
         resistance_levels = []
         for ma in [df['ma10'].iloc[-1], df['ma30'].iloc[-1]]:
             if ma > latest_price:
                 resistance_levels.append(ma)
-        resistance_levels.extend(high_prices[high_prices > latest_price])
+        for level in nearest['resistances']:
+            resistance_levels.append(level['price'])
+            level_info[level['price']] = level
 
         # 生成买点预测
-        for support in sorted(set(support_levels))[:3]:  # 取最近的3个支撑位
+        for support in sorted(set(support_levels), reverse=True)[:3]:  # 取最近的3个支撑位
             confidence = min(0.9, max(0.3, 1 - abs(support - latest_price) / latest_price))
             reason = []
+            confidence += _level_reasons(level_info.get(support), '支撑', reason)
 
             if abs(support - df['ma10'].iloc[-1]) / latest_price < 0.01:
-                reason.append("接近10分钟均线支撑")
+                reason.append(f"接近{ma_fast_label}支撑")
                 confidence += 0.1
             if abs(support - df['ma30'].iloc[-1]) / latest_price < 0.01:
-                reason.append("接近30分钟均线支撑")
+                reason.append(f"接近{ma_slow_label}支撑")
                 confidence += 0.15
             if df['HIST'].iloc[-1] > 0:
                 reason.append("MACD指标趋势向好")
@@ -213,12 +290,13 @@ def predict_price_points(stock_code):
         for resistance in sorted(set(resistance_levels))[:3]:  # 取最近的3个压力位
             confidence = min(0.9, max(0.3, 1 - abs(resistance - latest_price) / latest_price))
             reason = []
+            confidence += _level_reasons(level_info.get(resistance), '压力', reason)
 
             if abs(resistance - df['ma10'].iloc[-1]) / latest_price < 0.01:
-                reason.append("接近10分钟均线压力")
+                reason.append(f"接近{ma_fast_label}压力")
                 confidence += 0.1
             if abs(resistance - df['ma30'].iloc[-1]) / latest_price < 0.01:
-                reason.append("接近30分钟均线压力")
+                reason.append(f"接近{ma_slow_label}压力")
                 confidence += 0.15
             if df['HIST'].iloc[-1] < 0:
                 reason.append("MACD指标趋势转弱")
@@ -241,17 +319,75 @@ def predict_price_points(stock_code):
         print(f"预测价格点位时出错: {e}")
         return None
     
-def check_Stock(test_stock):
+def analyze_timeframes(stock_code, periods=(1, 5, 15, 30, 60), df=None, provider=None):
+    """
+    多周期共振分析：只获取一次1分钟K线，重采样为各周期后分别计算指标与信号
+    df: 可选，原始1分钟K线（未计算指标），传入时不再获取数据
+    返回 {'periods': 每个周期一行的 DataFrame, 'score': -1~1, 'direction': 多头共振/空头共振/分歧, 'frames': 各周期指标表}
+    score 为各周期趋势方向（均线多头排列且MACD柱为正记 1，空头排列且MACD柱为负记 -1，其余为 0）的平均
+    """
+    try:
+        if df is None:
+            df = get_stock_intraday_data(stock_code, provider)
+        if df is None or df.empty:
+            return None
+
+        rows = []
+        frames = {}
+        for period in periods:
+            frame = add_indicators(resample_bars(df, period))
+            frames[period] = frame
+            last = frame.iloc[-1]
+            if last['ma10'] > last['ma30'] and last['HIST'] > 0:
+                trend = 1
+            elif last['ma10'] < last['ma30'] and last['HIST'] < 0:
+                trend = -1
+            else:
+                trend = 0
+
+            signals = detect_signals(frame)
+            latest = signals.iloc[-1] if not signals.empty else None
+            rows.append({
+                'period': period,
+                'bars': len(frame),
+                'close': last['close'],
+                'trend': trend,
+                'hist': last['HIST'],
+                'last_signal': latest['signal'] if latest is not None else None,
+                'last_reason': latest['reason'] if latest is not None else None,
+                'last_signal_time': frame['day'].iloc[int(latest['time'])] if latest is not None else None,
+            })
+
+        table = pd.DataFrame(rows).set_index('period')
+        score = float(table['trend'].mean())
+        if (table['trend'] == 1).all():
+            direction = '多头共振'
+        elif (table['trend'] == -1).all():
+            direction = '空头共振'
+        else:
+            direction = '分歧'
+        return {'periods': table, 'score': round(score, 2), 'direction': direction, 'frames': frames}
+
+    except Exception as e:
+        print(f"多周期分析时出错: {e}")
+        return None
+
+def check_Stock(test_stock, provider=None):
+    # 只获取一次数据并计算指标，两个分析共用
+    df = build_indicator_frame(test_stock, provider)
+    if df is None:
+        return
+
     # 测试交易信号
     print("=== 测试交易信号 ===")
-    signals = analyze_trading_signals(test_stock)
+    signals = analyze_trading_signals(test_stock, df=df)
     if signals is not None and not signals.empty:
         print("\n交易信号:")
         print(signals.tail())
 
     # 测试价格预测
     print("\n=== 测试价格预测 ===")
-    predictions = predict_price_points(test_stock)
+    predictions = predict_price_points(test_stock, df=df)
     if predictions:
         print(f"\n当前价格: {predictions['current_price']:.2f}")
         print("\n预测的买卖点:")
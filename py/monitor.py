@@ -0,0 +1,403 @@
+"""
+常驻行情监控服务
+按交易日历调度：交易时段内定时刷新市场情绪、扫描自选股分时信号，午休与收盘后休眠到下一个时段。
+进程常驻，数据缓存与每只股票的分时指标流（IntradayStream）一直保留在内存中，
+每轮只把新增的K线增量送入指标流，新信号与情绪得分推送到本地输出：
+- JsonlSink：追加写入 JSONL 文件
+- UnixSocketSink：Unix 域套接字，每个连接的客户端逐行收到 JSON
+- HttpSink：本地 HTTP 服务，GET /latest 返回最新得分，GET /events?since=N 返回序号 N 之后的事件，
+  GET /metrics 返回 Prometheus 格式的运行指标（见 instrumentation.py）
+
+用法：
+    python py/monitor.py sh600519 sz000001 --jsonl events.jsonl --http-port 8765
+"""
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+try:
+    from . import market_calendar
+    from .data_provider import get_default_provider
+    from .instrumentation import metrics
+    from .intraday_stream import IntradayStream
+    from .price_levels import PriceLevels
+    from .trade_sentiment import MarketSentiment
+except ImportError:  # 直接以脚本方式运行
+    import market_calendar
+    from data_provider import get_default_provider
+    from instrumentation import metrics
+    from intraday_stream import IntradayStream
+    from price_levels import PriceLevels
+    from trade_sentiment import MarketSentiment
+
+
+def _dumps(event):
+    return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class JsonlSink:
+    """把事件逐行追加到 JSONL 文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def publish(self, event):
+        line = _dumps(event) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def close(self):
+        pass
+
+
+class UnixSocketSink:
+    """
+    Unix 域套接字广播：监听 path，向所有已连接的客户端逐行发送事件
+    例如 `nc -U /tmp/stock_monitor.sock` 即可订阅
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._clients = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._accept, name='monitor-socket', daemon=True)
+        self._thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return  # 已关闭
+            with self._lock:
+                self._clients.append(conn)
+
+    def publish(self, event):
+        data = (_dumps(event) + '\n').encode('utf-8')
+        with self._lock:
+            alive = []
+            for conn in self._clients:
+                try:
+                    conn.sendall(data)
+                    alive.append(conn)
+                except OSError:
+                    conn.close()  # 客户端已断开
+            self._clients = alive
+
+    def close(self):
+        self._server.close()
+        with self._lock:
+            for conn in self._clients:
+                conn.close()
+            self._clients = []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class HttpSink:
+    """本地 HTTP 服务，保留最近 max_events 条事件供轮询"""
+
+    def __init__(self, host='127.0.0.1', port=8765, max_events=1000):
+        self.events = deque(maxlen=max_events)
+        self.latest = {}  # 事件类型 -> 最新一条
+        self.seq = 0
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/metrics':
+                    data = metrics.to_prometheus().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                if url.path == '/latest':
+                    body = sink.snapshot()
+                elif url.path == '/events':
+                    since = int(parse_qs(url.query).get('since', ['0'])[0])
+                    body = sink.since(since)
+                else:
+                    self.send_error(404)
+                    return
+                data = _dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # 不在控制台输出访问日志
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='monitor-http', daemon=True)
+        self._thread.start()
+
+    def publish(self, event):
+        with self._lock:
+            self.seq += 1
+            self.events.append(dict(event, seq=self.seq))
+            self.latest[event['type']] = self.events[-1]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.latest)
+
+    def since(self, seq):
+        with self._lock:
+            return [e for e in self.events if e['seq'] > seq]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MarketMonitor:
+    """
+    常驻监控
+    watchlist: 自选股代码；sentiment_interval / scan_interval: 交易时段内情绪刷新与信号扫描的间隔（秒）
+    fetch_timeout: 单只股票分时数据获取的超时（秒），超时的股票本轮跳过，不阻塞调度
+    """
+
+    def __init__(self, watchlist, provider=None, sinks=None, sentiment_interval=300,
+                 scan_interval=60, workers=8, clock=None, fetch_timeout=30):
+        self.provider = provider or get_default_provider()
+        self.watchlist = list(watchlist)
+        self.sinks = list(sinks or [])
+        self.sentiment_interval = sentiment_interval
+        self.scan_interval = scan_interval
+        self.clock = clock or datetime.now
+        self.workers = workers
+        self.fetch_timeout = fetch_timeout
+
+        self.analyzer = MarketSentiment(self.provider)
+        self.streams = {code: IntradayStream(code) for code in self.watchlist}
+        self.levels = {code: PriceLevels() for code in self.watchlist}  # 支撑/压力位，随新K线增量更新
+        self._last_bar = {}  # 股票代码 -> 已送入指标流的最后一根K线时间
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='monitor')
+        self._hung = {}  # 股票代码 -> 超时后仍未返回的获取任务
+        self._stop = threading.Event()
+        self._next_sentiment = None
+        self._next_scan = None
+        self._closed_session = None  # 已做过收盘刷新的交易日
+
+    # ---------- 输出 ----------
+
+    def publish(self, event):
+        event.setdefault('published_at', self.clock().strftime('%Y-%m-%d %H:%M:%S'))
+        for sink in self.sinks:
+            try:
+                sink.publish(event)
+            except Exception as e:
+                print(f"推送事件失败({type(sink).__name__}): {e}")
+
+    # ---------- 任务 ----------
+
+    def refresh_sentiment(self):
+        """刷新市场概况、板块与情绪得分并推送"""
+        market_data = self.analyzer.get_market_overview()
+        sector_data = self.analyzer.get_sector_analysis()
+        score = self.analyzer.get_market_sentiment()
+        event = {
+            'type': 'sentiment',
+            'score': score,
+            'suggestion': self.analyzer.get_investment_suggestion(score),
+            'up_count': int(market_data['up_count']),
+            'down_count': int(market_data['down_count']),
+            'total_amount': float(market_data['total_amount']),
+            'avg_change': float(market_data['avg_change']),
+            'hot_sectors': sector_data['hot_sectors']['板块名称'].head(3).tolist(),
+        }
+        breadth = self.analyzer.breadth.latest()
+        if breadth is not None:
+            event.update({k: breadth[k] for k in ('advance_ratio', 'interval_amount', 'new_highs', 'new_lows')})
+        self.publish(event)
+        return event
+
+    def scan_watchlist(self, now=None):
+        """
+        并发获取自选股分时数据，只把新增的K线送入指标流，推送新产生的信号
+        单只获取超过 fetch_timeout 秒（从开始执行算起）时本轮跳过该股票；
+        超时的网络调用无法中断，它返回之前该股票不再重复请求，被占用的线程较多时换用新的线程池
+        """
+        trading = market_calendar.is_trading_time(now or self.clock())
+        self._hung = {code: f for code, f in self._hung.items() if not f.done()}
+        codes = [code for code in self.watchlist if code not in self._hung]
+        if self._hung and len(self._hung) + len(codes) > self.workers:
+            self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='monitor')
+        started = {code: [None] for code in codes}  # 开始执行时刻（排队等待的时间不计入超时）
+        futures = {code: self._executor.submit(self._timed_fetch, code, started[code]) for code in codes}
+        emitted = []
+        for code, future in futures.items():
+            bars = self._wait_bars(code, future, started[code])
+            if bars is None or bars.empty:
+                continue
+            if trading:
+                bars = bars.iloc[:-1]  # 交易时段内最后一根K线可能尚未走完
+            emitted.extend(self._feed(code, bars))
+        return emitted
+
+    def _timed_fetch(self, code, started):
+        started[0] = time.monotonic()
+        return self._fetch_bars(code)
+
+    def _wait_bars(self, code, future, started):
+        """等待一只股票的获取结果，超时返回 None"""
+        while True:
+            begin = started[0]
+            remaining = self.fetch_timeout if begin is None else begin + self.fetch_timeout - time.monotonic()
+            done, _ = wait([future], timeout=max(remaining, 0))
+            if done:
+                return future.result()
+            if started[0] is None:
+                # 等待了一个超时周期仍未开始执行：线程都被未返回的调用占用
+                future.cancel()
+                print(f"获取 {code} 分时数据未能开始执行，本轮跳过")
+                return None
+            if time.monotonic() - started[0] >= self.fetch_timeout:
+                print(f"获取 {code} 分时数据超时（{self.fetch_timeout}秒），本轮跳过")
+                self._hung[code] = future
+                return None
+
+    def _fetch_bars(self, code):
+        try:
+            df = self.provider.stock_zh_a_minute(symbol=code, period='1', adjust="")
+            if df is None or df.empty:
+                return None
+            df = df.copy()
+            df['day'] = pd.to_datetime(df['day'])
+            return df
+        except Exception as e:
+            print(f"获取 {code} 分时数据失败: {e}")
+            return None
+
+    def _feed(self, code, bars):
+        stream = self.streams[code]
+        last = self._last_bar.get(code)
+        if last is not None:
+            bars = bars[bars['day'] > last]
+        if bars.empty:
+            return []
+        closes = pd.to_numeric(bars['close'], errors='coerce').to_numpy(dtype=float)
+        volumes = pd.to_numeric(bars['volume'], errors='coerce').to_numpy(dtype=float)
+        signals = stream.update_many(closes, volumes, list(bars['day']))
+        self.levels[code].update_frame(bars)
+        self._last_bar[code] = bars['day'].iloc[-1]
+        if last is None:
+            return []  # 首次加载只用历史K线预热指标，不推送历史信号
+
+        events = []
+        for sig in signals:
+            event = dict(sig, type='signal', symbol=code)
+            nearest = self.levels[code].nearest(sig['price'], k=2)
+            event['supports'] = [round(float(l['price']), 2) for l in nearest['supports']]
+            event['resistances'] = [round(float(l['price']), 2) for l in nearest['resistances']]
+            self.publish(event)
+            events.append(event)
+        return events
+
+    # ---------- 调度 ----------
+
+    def tick(self, now=None):
+        """
+        执行当前时刻到期的任务，返回距下一次需要醒来的秒数
+        交易时段内按间隔调度；每个交易日收盘后做一次收盘刷新，之后休眠到下一个时段切换
+        """
+        now = now or self.clock()
+        if market_calendar.is_trading_time(now):
+            if self._next_sentiment is None or now >= self._next_sentiment:
+                self.refresh_sentiment()
+                self._next_sentiment = now + pd.Timedelta(seconds=self.sentiment_interval)
+            if self._next_scan is None or now >= self._next_scan:
+                self.scan_watchlist(now)
+                self._next_scan = now + pd.Timedelta(seconds=self.scan_interval)
+            wake = min(self._next_sentiment, self._next_scan, market_calendar.next_session_change(now))
+        else:
+            # 午休与收盘后不再定时刷新；收盘后补做一次，拿到完整的收盘数据
+            date = market_calendar.market_date(now)
+            if market_calendar.market_phase(now) == 'closed' and self._closed_session != date:
+                self.refresh_sentiment()
+                self.scan_watchlist(now)
+                self._closed_session = date
+            self._next_sentiment = None
+            self._next_scan = None
+            wake = market_calendar.next_session_change(now)
+        return max((wake - now).total_seconds(), 1.0)
+
+    def run(self):
+        """阻塞运行，直到 stop() 被调用"""
+        # 调度依赖交易日历：启动时加载含节假日的日历（已设置或已保存的日历不重新获取），失败时按工作日判断
+        market_calendar.ensure_trade_calendar()
+        print(f"行情监控已启动，自选股: {', '.join(self.watchlist)}")
+        while not self._stop.is_set():
+            try:
+                wait = self.tick()
+            except Exception as e:
+                print(f"监控任务执行失败: {e}")
+                wait = self.scan_interval
+            self._stop.wait(wait)
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        self._executor.shutdown(wait=False)
+        for sink in self.sinks:
+            sink.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="常驻行情监控")
+    parser.add_argument('codes', nargs='+', help="自选股代码，如 sh600519")
+    parser.add_argument('--sentiment-interval', type=int, default=300, help="情绪刷新间隔（秒）")
+    parser.add_argument('--scan-interval', type=int, default=60, help="信号扫描间隔（秒）")
+    parser.add_argument('--fetch-timeout', type=float, default=30, help="单只股票分时数据获取超时（秒）")
+    parser.add_argument('--jsonl', help="事件输出的 JSONL 文件")
+    parser.add_argument('--socket', help="Unix 域套接字路径")
+    parser.add_argument('--http-port', type=int, help="本地 HTTP 端口")
+    args = parser.parse_args()
+
+    sinks = []
+    if args.jsonl:
+        sinks.append(JsonlSink(args.jsonl))
+    if args.socket:
+        sinks.append(UnixSocketSink(args.socket))
+    if args.http_port:
+        sinks.append(HttpSink(port=args.http_port))
+
+    monitor = MarketMonitor(args.codes, sinks=sinks, sentiment_interval=args.sentiment_interval,
+                            scan_interval=args.scan_interval, fetch_timeout=args.fetch_timeout)
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.close()
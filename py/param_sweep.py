@@ -0,0 +1,291 @@
+"""
+信号参数的网格寻优
+在同一份1分钟K线上批量评估多组规则参数（均线/MACD/动量窗口、放量缩量倍数、获利了结偏离），
+按回测表现排序输出。
+
+- 每只股票的指标中间结果按窗口缓存：窗口相同的参数组合共用同一条均线/EMA/MACD，
+  只有阈值不同的组合完全不重复计算指标
+- 规则判定直接复用 minute.signal_codes，远期收益与 T+1 成交复用 backtest 中的同一套计算
+- 任务按 (股票分块, 参数分块) 分发到进程池；参数按窗口排序后再分块，同一块内尽量共用缓存
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import backtest, minute
+    from .snapshot_store import SnapshotStore
+except ImportError:  # 直接以脚本方式运行
+    import backtest
+    import minute
+    from snapshot_store import SnapshotStore
+
+# 与 minute.add_indicators / signal_codes 中写死的取值一致
+DEFAULT_PARAMS = {
+    'ma_fast': 10,        # 短期均线窗口
+    'ma_slow': 30,        # 长期均线窗口
+    'volume_window': 10,  # 均量窗口
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'momentum': 5,        # 动量周期
+    'volume_up': 1.2,     # 放量倍数
+    'volume_down': 0.8,   # 缩量倍数
+    'deviation': 1.03,    # 获利了结的价格偏离倍数
+}
+
+WINDOW_PARAMS = ['ma_fast', 'ma_slow', 'volume_window', 'macd_fast', 'macd_slow', 'macd_signal', 'momentum']
+
+# 每个参数组合累计的统计量（跨股票直接相加）
+_FIELDS = ['signals', 'buy_signals', 'sell_signals',
+           'buy_fwd_n', 'buy_fwd_hits', 'buy_fwd_sum',
+           'sell_fwd_n', 'sell_fwd_hits',
+           'trades', 'closed_trades', 'wins', 'net_sum']
+
+
+def param_grid(**ranges):
+    """
+    生成参数组合列表，未给出的参数取默认值，例如
+        param_grid(ma_fast=[5, 10], ma_slow=[20, 30, 60], volume_up=[1.2, 1.5])
+    快线窗口不小于慢线窗口的组合会被剔除
+    """
+    unknown = set(ranges) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"未知参数: {sorted(unknown)}")
+    names = list(ranges)
+    grid = []
+    for values in itertools.product(*(ranges[n] for n in names)):
+        params = dict(DEFAULT_PARAMS, **dict(zip(names, values)))
+        if params['ma_fast'] >= params['ma_slow'] or params['macd_fast'] >= params['macd_slow']:
+            continue
+        grid.append(params)
+    return grid
+
+
+class IndicatorCache:
+    """单只股票的指标缓存，按 (指标, 窗口) 计算一次后复用"""
+
+    def __init__(self, close, volume):
+        self.close = pd.Series(close, dtype=float)
+        self.volume = pd.Series(volume, dtype=float)
+        self._memo = {}
+
+    def _get(self, key, compute):
+        value = self._memo.get(key)
+        if value is None:
+            value = self._memo[key] = compute()
+        return value
+
+    def ma(self, window):
+        return self._get(('ma', window), lambda: self.close.rolling(window=window).mean().to_numpy())
+
+    def volume_ma(self, window):
+        return self._get(('volume_ma', window), lambda: self.volume.rolling(window=window).mean().to_numpy())
+
+    def ema(self, span):
+        return self._get(('ema', span), lambda: self.close.ewm(span=span, adjust=False).mean())
+
+    def macd_hist(self, fast, slow, signal):
+        def compute():
+            macd = self.ema(fast) - self.ema(slow)
+            return (macd - macd.ewm(span=signal, adjust=False).mean()).to_numpy()
+        return self._get(('hist', fast, slow, signal), compute)
+
+    def momentum(self, period):
+        return self._get(('momentum', period), lambda: self.close.diff(periods=period).to_numpy())
+
+    def volume_change(self):
+        return self._get(('volume_change',), lambda: self.volume.pct_change().to_numpy())
+
+    def codes(self, params):
+        """按一组参数计算规则编码"""
+        return minute.signal_codes(
+            self.close.to_numpy(),
+            self.volume.to_numpy(),
+            self.ma(params['ma_fast']),
+            self.ma(params['ma_slow']),
+            self.volume_ma(params['volume_window']),
+            self.macd_hist(params['macd_fast'], params['macd_slow'], params['macd_signal']),
+            self.momentum(params['momentum']),
+            self.volume_change(),
+            start=params['ma_slow'],
+            volume_up=params['volume_up'],
+            volume_down=params['volume_down'],
+            deviation=params['deviation'],
+        )
+
+
+def _score(codes, close, times, horizon, fees):
+    """一只股票在一组参数下的统计量，顺序同 _FIELDS"""
+    idx = np.flatnonzero(codes)
+    is_buy = np.isin(codes[idx], backtest.BUY_CODES)
+    fwd = backtest.forward_returns(close, idx, horizon)
+    buy_fwd = fwd[is_buy]
+    sell_fwd = fwd[~is_buy]
+    buy_fwd = buy_fwd[~np.isnan(buy_fwd)]
+    sell_fwd = sell_fwd[~np.isnan(sell_fwd)]
+
+    buy_idx, exit_idx, has_exit = backtest.t1_exits(codes, idx, times)
+    net = backtest.net_returns(close[buy_idx], close[exit_idx], fees)
+    return [
+        len(idx), int(is_buy.sum()), int((~is_buy).sum()),
+        len(buy_fwd), int((buy_fwd > 0).sum()), float(buy_fwd.sum()),
+        len(sell_fwd), int((sell_fwd < 0).sum()),
+        len(buy_idx), int(has_exit.sum()), int((net[has_exit] > 0).sum()), float(net.sum()),
+    ]
+
+
+def _sweep_arrays(items, grid, horizon, fees):
+    """对 [(close, volume, times), ...] 评估 grid 中的每组参数，返回 (组合数, 统计量数) 的累计矩阵"""
+    totals = np.zeros((len(grid), len(_FIELDS)))
+    for close, volume, times in items:
+        if len(close) == 0:
+            continue
+        cache = IndicatorCache(close, volume)
+        for i, params in enumerate(grid):
+            totals[i] += _score(cache.codes(params), close, times, horizon, fees)
+    return totals
+
+
+def _bar_arrays(bars):
+    bars = bars.reset_index(drop=True)
+    return (
+        pd.to_numeric(bars['close'], errors='coerce').to_numpy(dtype=float),
+        pd.to_numeric(bars['volume'], errors='coerce').to_numpy(dtype=float),
+        pd.to_datetime(bars['day']).to_numpy(),
+    )
+
+
+def _sweep_stored(root, fmt, symbols, start, end, grid, horizon, fees):
+    """子进程：从快照存储读取一组股票并评估参数"""
+    store = SnapshotStore(root, fmt=fmt)
+    items = []
+    for symbol in symbols:
+        bars = store.bars(symbol, start=start, end=end)
+        if not bars.empty:
+            items.append(_bar_arrays(bars))
+    return _sweep_arrays(items, grid, horizon, fees)
+
+
+def _chunks(seq, size):
+    return [seq[i:i + size] for i in range(0, len(seq), size)] or [seq]
+
+
+def _run(task, jobs, grid, workers, combo_chunk_size):
+    """把 (数据块 × 参数块) 分发执行并合并结果；task(数据块, 参数块) 返回累计矩阵"""
+    # 窗口相同的组合排在一起，分块后同一块内共用指标缓存
+    order = sorted(range(len(grid)), key=lambda i: tuple(grid[i][k] for k in WINDOW_PARAMS))
+    grid_chunks = _chunks(order, combo_chunk_size)
+
+    totals = np.zeros((len(grid), len(_FIELDS)))
+    workers = workers or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for job in jobs:
+                for combo_idx in grid_chunks:
+                    sub_grid = [grid[i] for i in combo_idx]
+                    futures[executor.submit(task, job, sub_grid)] = combo_idx
+            for future, combo_idx in futures.items():
+                totals[combo_idx] += future.result()
+    else:
+        for job in jobs:
+            for combo_idx in grid_chunks:
+                totals[combo_idx] += task(job, [grid[i] for i in combo_idx])
+    return totals
+
+
+def _ranked(grid, totals, sort_by, min_trades):
+    """把累计统计量转换为按 sort_by 降序排列的参数表"""
+    table = pd.DataFrame(grid)
+    stats = pd.DataFrame(totals, columns=_FIELDS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['signals'] = stats['signals'].astype(int)
+        table['buy_signals'] = stats['buy_signals'].astype(int)
+        table['sell_signals'] = stats['sell_signals'].astype(int)
+        table['buy_hit_rate'] = stats['buy_fwd_hits'] / stats['buy_fwd_n']
+        table['avg_buy_fwd_return'] = stats['buy_fwd_sum'] / stats['buy_fwd_n']
+        table['sell_hit_rate'] = stats['sell_fwd_hits'] / stats['sell_fwd_n']
+        table['trades'] = stats['trades'].astype(int)
+        table['win_rate'] = stats['wins'] / stats['closed_trades']
+        table['avg_net_return'] = stats['net_sum'] / stats['trades']
+        table['total_net_return'] = stats['net_sum']
+    table = table[table['trades'] >= min_trades]
+    table = table.sort_values(sort_by, ascending=False, kind='mergesort', na_position='last', ignore_index=True)
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table
+
+
+def sweep_frames(frames, grid=None, horizon=30, fees=None, workers=None,
+                 chunk_size=50, combo_chunk_size=64, sort_by='avg_net_return', min_trades=1):
+    """
+    在内存中的 {股票代码: 1分钟K线} 上评估参数组合
+    grid 缺省为只含默认参数的一组；horizon 为统计远期收益的K线根数
+    返回按 sort_by 降序排列的参数表（rank 从 1 开始），交易笔数少于 min_trades 的组合不列出
+    """
+    grid = grid or [dict(DEFAULT_PARAMS)]
+    fees = dict(backtest.DEFAULT_FEES, **(fees or {}))
+    items = [_bar_arrays(bars) for bars in frames.values() if bars is not None and len(bars)]
+    task = _FrameTask(horizon, fees)
+    totals = _run(task, _chunks(items, chunk_size), grid, workers, combo_chunk_size)
+    return _ranked(grid, totals, sort_by, min_trades)
+
+
+def sweep_store(store, grid=None, symbols=None, start=None, end=None, horizon=30, fees=None,
+                workers=None, chunk_size=50, combo_chunk_size=64, sort_by='avg_net_return', min_trades=1):
+    """
+    在快照存储的1分钟K线上评估参数组合，参数同 sweep_frames
+    子进程各自从磁盘读取K线，不在进程间传递数据
+    """
+    grid = grid or [dict(DEFAULT_PARAMS)]
+    fees = dict(backtest.DEFAULT_FEES, **(fees or {}))
+    if symbols is None:
+        symbols = set()
+        for date in store.dates('minute'):
+            if (start is None or date >= pd.Timestamp(start).strftime('%Y%m%d')) and \
+                    (end is None or date <= pd.Timestamp(end).strftime('%Y%m%d')):
+                symbols.update(store.bar_symbols(date))
+        symbols = sorted(symbols)
+
+    task = _StoreTask(store.root, store.fmt, start, end, horizon, fees)
+    totals = _run(task, _chunks(symbols, chunk_size), grid, workers, combo_chunk_size)
+    return _ranked(grid, totals, sort_by, min_trades)
+
+
+class _FrameTask:
+    def __init__(self, horizon, fees):
+        self.horizon = horizon
+        self.fees = fees
+
+    def __call__(self, items, sub_grid):
+        return _sweep_arrays(items, sub_grid, self.horizon, self.fees)
+
+
+class _StoreTask:
+    def __init__(self, root, fmt, start, end, horizon, fees):
+        self.args = (root, fmt)
+        self.start = start
+        self.end = end
+        self.horizon = horizon
+        self.fees = fees
+
+    def __call__(self, symbols, sub_grid):
+        return _sweep_stored(*self.args, symbols, self.start, self.end, sub_grid, self.horizon, self.fees)
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = SnapshotStore(sys.argv[1] if len(sys.argv) > 1 else os.environ.get('STOCK_DATA_DIR', 'market_data'))
+    grid = param_grid(
+        ma_fast=[5, 10, 20],
+        ma_slow=[30, 60],
+        volume_up=[1.2, 1.5, 2.0],
+        volume_down=[0.6, 0.8],
+        deviation=[1.02, 1.03, 1.05],
+    )
+    table = sweep_store(store, grid, workers=os.cpu_count())
+    print(table.head(20).to_string(index=False))
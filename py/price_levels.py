@@ -0,0 +1,246 @@
+"""
+支撑/压力位
+由分时K线找出两类价位，并把相近的价位聚类合并：
+- 摆动高/低点：某根K线的最高（最低）价是前后 pivot_window 根K线中的最高（最低）
+- 成交密集区：按价格分箱、以成交量加权的成交分布（volume profile）中成交量最大的若干箱
+价位按价格有序保存，“距当前价最近的 k 个支撑/压力位”用二分查找完成；
+新K线到达时只做增量更新（确认新的摆动点、累加一个价格箱），不重新扫描整段K线
+"""
+import bisect
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .resample import new_rows_start
+except ImportError:  # 直接以脚本方式运行
+    from resample import new_rows_start
+
+
+class LevelBook:
+    """
+    按价格有序的价位表，插入时与相邻价位（相对距离不超过 tolerance）合并，
+    合并后的价格为按触及次数加权的均值
+    """
+
+    def __init__(self, tolerance=0.003):
+        self.tolerance = tolerance
+        self.prices = []
+        self.touches = []
+        self.kinds = []  # 每个价位的来源集合，如 {'high', 'low'}
+
+    def __len__(self):
+        return len(self.prices)
+
+    def add(self, price, kind, touches=1):
+        i = bisect.bisect_left(self.prices, price)
+        for j in (i - 1, i):
+            if 0 <= j < len(self.prices) and abs(self.prices[j] - price) <= self.tolerance * price:
+                total = self.touches[j] + touches
+                merged = (self.prices[j] * self.touches[j] + price * touches) / total
+                del self.prices[j]
+                t = self.touches.pop(j)
+                k = self.kinds.pop(j)
+                i = bisect.bisect_left(self.prices, merged)
+                self.prices.insert(i, merged)
+                self.touches.insert(i, t + touches)
+                self.kinds.insert(i, k | {kind})
+                return
+        self.prices.insert(i, price)
+        self.touches.insert(i, touches)
+        self.kinds.insert(i, {kind})
+
+    def below(self, price, k):
+        """低于 price 的最近 k 个价位下标（由近及远）"""
+        i = bisect.bisect_left(self.prices, price)
+        return list(range(i - 1, max(i - 1 - k, -1), -1))
+
+    def above(self, price, k):
+        """高于 price 的最近 k 个价位下标（由近及远）"""
+        i = bisect.bisect_right(self.prices, price)
+        return list(range(i, min(i + k, len(self.prices))))
+
+
+class PriceLevels:
+    """
+    单只股票的支撑/压力位引擎
+    pivot_window: 摆动点两侧比较的K线数；bin_pct: 成交分布价格箱宽度（相对首个价格）；
+    tolerance: 价位聚类的相对距离；volume_nodes: 取成交量最大的箱数
+    """
+
+    def __init__(self, pivot_window=5, bin_pct=0.002, tolerance=0.003, volume_nodes=5):
+        self.pivot_window = pivot_window
+        self.bin_pct = bin_pct
+        self.volume_nodes = volume_nodes
+        self.book = LevelBook(tolerance)
+        self.count = 0
+        self.last_time = None
+        self._window = deque(maxlen=2 * pivot_window + 1)  # (最高, 最低)
+        self._bin_width = None
+        self._profile = {}   # 价格箱 -> 累计成交量
+        self._total_volume = 0.0
+        self._nodes = None   # 成交密集区缓存 [(价格, 成交量占比)]，按价格升序
+
+    # ---------- 更新 ----------
+
+    def update(self, high, low, close, volume):
+        """接收一根K线（缺少最高/最低价时用收盘价）"""
+        if math.isnan(close):
+            return
+        high = close if math.isnan(high) else high
+        low = close if math.isnan(low) else low
+        volume = 0.0 if math.isnan(volume) else volume
+        self.count += 1
+
+        # 摆动点：窗口中心的K线在前后 pivot_window 根中最高（最低，并列取最早）时确认
+        self._window.append((high, low))
+        if len(self._window) == self._window.maxlen:
+            highs = [h for h, _ in self._window]
+            lows = [l for _, l in self._window]
+            w = self.pivot_window
+            # 与 np.argmax/argmin 相同：并列时取最早的位置
+            if highs.index(max(highs)) == w:
+                self.book.add(highs[w], 'high')
+            if lows.index(min(lows)) == w:
+                self.book.add(lows[w], 'low')
+
+        # 成交分布：以典型价格 (高+低+收)/3 计入价格箱
+        if self._bin_width is None:
+            self._bin_width = close * self.bin_pct
+        b = math.floor((high + low + close) / 3 / self._bin_width)
+        self._profile[b] = self._profile.get(b, 0.0) + volume
+        self._total_volume += volume
+        self._nodes = None
+
+    def update_frame(self, df):
+        """接收一段K线（按 day 列只处理晚于上一根的部分，没有 day 列时按行数），返回新处理的根数"""
+        if df is None or df.empty:
+            return 0
+        start = new_rows_start(df['day'], self.last_time) if 'day' in df.columns else self.count
+        if start >= len(df):
+            return 0
+        rows = df.iloc[start:]
+        close = pd.to_numeric(rows['close'], errors='coerce').to_numpy(dtype=float)
+        high = pd.to_numeric(rows['high'], errors='coerce').to_numpy(dtype=float) if 'high' in rows.columns else close
+        low = pd.to_numeric(rows['low'], errors='coerce').to_numpy(dtype=float) if 'low' in rows.columns else close
+        volume = pd.to_numeric(rows['volume'], errors='coerce').to_numpy(dtype=float)
+        for h, l, c, v in zip(high.tolist(), low.tolist(), close.tolist(), volume.tolist()):
+            self.update(h, l, c, v)
+        if 'day' in rows.columns:
+            self.last_time = pd.Timestamp(rows['day'].iloc[-1])
+        return len(rows)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """由整段K线批量构建（向量化找摆动点与成交分布），结果与逐根 update 相同"""
+        levels = cls(**kwargs)
+        if df is None or df.empty:
+            return levels
+        close = pd.to_numeric(df['close'], errors='coerce').to_numpy(dtype=float)
+        high = pd.to_numeric(df['high'], errors='coerce').to_numpy(dtype=float) if 'high' in df.columns else close.copy()
+        low = pd.to_numeric(df['low'], errors='coerce').to_numpy(dtype=float) if 'low' in df.columns else close.copy()
+        volume = pd.to_numeric(df['volume'], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(close)
+        close, high, low, volume = close[valid], high[valid], low[valid], volume[valid]
+        if not len(close):
+            return levels
+        high = np.where(np.isnan(high), close, high)
+        low = np.where(np.isnan(low), close, low)
+        volume = np.nan_to_num(volume)
+
+        w = levels.pivot_window
+        size = 2 * w + 1
+        if len(close) >= size:
+            high_windows = np.lib.stride_tricks.sliding_window_view(high, size)
+            low_windows = np.lib.stride_tricks.sliding_window_view(low, size)
+            is_high = np.argmax(high_windows, axis=1) == w
+            is_low = np.argmin(low_windows, axis=1) == w
+            # 与逐根更新相同的顺序：按确认时刻，同一根先高后低
+            for i in np.flatnonzero(is_high | is_low):
+                if is_high[i]:
+                    levels.book.add(high[i + w], 'high')
+                if is_low[i]:
+                    levels.book.add(low[i + w], 'low')
+            tail = slice(len(close) - size + 1, None)
+        else:
+            tail = slice(None)
+        levels._window.extend(zip(high[tail], low[tail]))
+
+        levels._bin_width = close[0] * levels.bin_pct
+        bins = np.floor((high + low + close) / 3 / levels._bin_width).astype(np.int64)
+        # 累加顺序与逐根更新一致，保证浮点结果相同
+        for b, v in zip(bins.tolist(), volume.tolist()):
+            levels._profile[b] = levels._profile.get(b, 0.0) + v
+        levels._total_volume = float(sum(volume.tolist()))
+        levels.count = len(close)
+        if 'day' in df.columns:
+            levels.last_time = pd.Timestamp(df['day'].iloc[-1])
+        return levels
+
+    # ---------- 查询 ----------
+
+    def volume_profile(self):
+        """成交分布：以价格箱下沿为索引的成交量 Series"""
+        if not self._profile:
+            return pd.Series(dtype=float)
+        bins = sorted(self._profile)
+        return pd.Series([self._profile[b] for b in bins], index=np.array(bins) * self._bin_width)
+
+    def nodes(self):
+        """成交密集区 [(价格, 成交量占比)]，价格为箱中点，按价格升序；只在有新K线后重新选取"""
+        if self._nodes is None:
+            if not self._profile or self._total_volume <= 0:
+                self._nodes = []
+            else:
+                bins = np.fromiter(self._profile.keys(), dtype=np.int64, count=len(self._profile))
+                vols = np.fromiter(self._profile.values(), dtype=float, count=len(self._profile))
+                k = min(self.volume_nodes, len(vols))
+                top = np.argpartition(-vols, k - 1)[:k] if k < len(vols) else np.arange(len(vols))
+                top = top[np.argsort(bins[top])]
+                self._nodes = [((bins[i] + 0.5) * self._bin_width, vols[i] / self._total_volume) for i in top]
+        return self._nodes
+
+    def nearest(self, price, k=3):
+        """
+        距 price 最近的 k 个支撑位与压力位（由近及远），
+        返回 {'supports': [...], 'resistances': [...]}，每项为 {'price', 'touches', 'volume_share', 'kinds'}
+        """
+        book = self.book
+        nodes = self.nodes()
+        node_prices = [p for p, _ in nodes]
+
+        def collect(indexes, node_range):
+            candidates = [{'price': book.prices[i], 'touches': book.touches[i], 'volume_share': 0.0,
+                           'kinds': set(book.kinds[i])} for i in indexes]
+            candidates += [{'price': nodes[j][0], 'touches': 0, 'volume_share': nodes[j][1], 'kinds': {'volume'}}
+                           for j in node_range]
+            return candidates
+
+        i = bisect.bisect_left(node_prices, price)
+        supports = collect(book.below(price, k), range(i - 1, max(i - 1 - k, -1), -1))
+        i = bisect.bisect_right(node_prices, price)
+        resistances = collect(book.above(price, k), range(i, min(i + k, len(nodes))))
+        return {
+            'supports': self._merge(supports, price, k),
+            'resistances': self._merge(resistances, price, k),
+        }
+
+    def _merge(self, candidates, price, k):
+        """摆动点与成交密集区的候选按距离排序，相近的合并为一个价位"""
+        candidates.sort(key=lambda c: abs(c['price'] - price))
+        merged = []
+        tolerance = self.book.tolerance
+        for c in candidates:
+            for m in merged:
+                if abs(m['price'] - c['price']) <= tolerance * c['price']:
+                    m['touches'] += c['touches']
+                    m['volume_share'] += c['volume_share']
+                    m['kinds'] |= c['kinds']
+                    break
+            else:
+                merged.append(c)
+        for m in merged:
+            m['kinds'] = sorted(m['kinds'])
+        return merged[:k]
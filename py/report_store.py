@@ -0,0 +1,291 @@
+"""
+分析报告存储
+每次运行的结果追加写入本地 SQLite 数据库（标准库 sqlite3，不需要额外依赖），不再按日覆盖 CSV：
+- reports：每次运行一行（分析时间、涨跌家数、成交额、情绪得分、投资建议）
+- sectors：每次运行的全部热门/潜力板块（名次、涨跌幅、变动金额）
+- signals：minute.py 产生的逐只股票交易信号（K线时间、所属行业板块、周期），同一根K线的同一信号只保存一次
+信号先在内存中缓冲，累计 batch_size 条或调用 flush() 时在一个事务内批量写入；
+按时间、板块、股票代码建索引，“近30日情绪得分”“本周某板块的强买入信号”等查询直接走索引
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time TEXT NOT NULL,
+    up_count INTEGER,
+    down_count INTEGER,
+    up_down_ratio REAL,
+    total_amount REAL,
+    avg_change REAL,
+    sentiment_score REAL,
+    suggestion TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reports_time ON reports(time);
+
+CREATE TABLE IF NOT EXISTS sectors (
+    report_id INTEGER NOT NULL REFERENCES reports(id),
+    kind TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    change_pct REAL,
+    change_amount REAL,
+    PRIMARY KEY (report_id, kind, rank)
+);
+CREATE INDEX IF NOT EXISTS idx_sectors_name ON sectors(name, report_id);
+
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    period INTEGER NOT NULL DEFAULT 1,
+    signal TEXT NOT NULL,
+    reason TEXT,
+    strength TEXT,
+    price REAL,
+    price_change REAL,
+    sector TEXT,
+    recorded_at TEXT NOT NULL,
+    UNIQUE (symbol, period, time, signal)
+);
+CREATE INDEX IF NOT EXISTS idx_signals_time ON signals(time);
+CREATE INDEX IF NOT EXISTS idx_signals_sector ON signals(sector, time);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol ON signals(symbol, time);
+"""
+
+SIGNAL_COLUMNS = ['time', 'symbol', 'period', 'signal', 'reason', 'strength', 'price', 'price_change', 'sector']
+
+
+def default_report_path():
+    """
+    环境变量 STOCK_REPORT_DB；未设置时放在 STOCK_DATA_DIR 下，
+    再没有时为用户数据目录（$XDG_DATA_HOME，缺省 ~/.local/share）下的 stock/reports.sqlite，不写到当前目录
+    """
+    if os.environ.get('STOCK_REPORT_DB'):
+        return os.environ['STOCK_REPORT_DB']
+    if os.environ.get('STOCK_DATA_DIR'):
+        return os.path.join(os.environ['STOCK_DATA_DIR'], 'reports.sqlite')
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(data_home, 'stock', 'reports.sqlite')
+
+
+def _time_str(t):
+    return pd.Timestamp(t).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _number(value):
+    """numpy 标量与 NaN 转为 sqlite 可保存的值"""
+    if value is None:
+        return None
+    value = value.item() if hasattr(value, 'item') else value
+    return None if isinstance(value, float) and value != value else value
+
+
+def signal_rows(symbol, signals, times, sector=None, period=1):
+    """
+    把 analyze_trading_signals 的信号表（与 minute.signal_times 得到的K线时间）转为待写入的行
+    times 必须是K线时间（字符串或 datetime）；分时数据没有 day 列时 signal_times 返回的是行号，不能保存
+    """
+    if signals is None or signals.empty:
+        return []
+    n = len(signals)
+    times = list(times)
+    if len(times) != n:
+        raise ValueError(f"{symbol} 的信号时间数量（{len(times)}）与信号数量（{n}）不一致")
+    if any(isinstance(t, (int, float, np.number)) for t in times):
+        raise ValueError(f"{symbol} 的信号时间不是K线时间（可能是行号），请传入分时数据 day 列中的时间")
+    # 整列转换后再组合成行（NaN 由 sqlite 保存为 NULL）
+    return list(zip(
+        pd.DatetimeIndex(pd.to_datetime(times)).strftime('%Y-%m-%d %H:%M:%S'),
+        [symbol] * n,
+        [int(period)] * n,
+        signals['signal'].tolist(),
+        signals['reason'].tolist(),
+        signals['strength'].tolist(),
+        pd.to_numeric(signals['price'], errors='coerce').tolist(),
+        pd.to_numeric(signals['price_change'], errors='coerce').tolist(),
+        [sector] * n,
+    ))
+
+
+class ReportStore:
+    """
+    path: 数据库文件路径，缺省见 default_report_path()；':memory:' 为内存数据库
+    batch_size: 信号缓冲达到该条数时自动写入
+    """
+
+    def __init__(self, path=None, batch_size=500):
+        self.path = path or default_report_path()
+        self.batch_size = batch_size
+        folder = os.path.dirname(self.path)
+        if folder and self.path != ':memory:':
+            os.makedirs(folder, exist_ok=True)
+        # 扫描在线程池中回调，连接在线程间共享，写入与查询由锁串行化
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    # ---------- 写入 ----------
+
+    def add_report(self, market_data, sector_data, sentiment_score, suggestion, time=None):
+        """追加一次分析报告（含全部热门/潜力板块），返回报告编号"""
+        row = (
+            _time_str(time or datetime.now()),
+            _number(market_data['up_count']),
+            _number(market_data['down_count']),
+            _number(market_data['up_down_ratio']),
+            _number(market_data['total_amount']),
+            _number(market_data['avg_change']),
+            _number(sentiment_score),
+            suggestion,
+        )
+        sectors = []
+        for kind, key in (('hot', 'hot_sectors'), ('potential', 'potential_sectors')):
+            df = sector_data.get(key)
+            if df is None or df.empty:
+                continue
+            for rank, (name, change, amount) in enumerate(
+                    zip(df['板块名称'], df['涨跌幅'], df['变动金额']), start=1):
+                sectors.append((kind, rank, str(name), _number(change), _number(amount)))
+
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                'INSERT INTO reports (time, up_count, down_count, up_down_ratio, total_amount, avg_change, '
+                'sentiment_score, suggestion) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', row)
+            report_id = cur.lastrowid
+            self._conn.executemany(
+                'INSERT INTO sectors (report_id, kind, rank, name, change_pct, change_amount) VALUES (?, ?, ?, ?, ?, ?)',
+                [(report_id,) + s for s in sectors])
+        return report_id
+
+    def add_signals(self, symbol, signals, times, sector=None, period=1):
+        """缓冲一只股票的交易信号，累计达到 batch_size 条时批量写入"""
+        rows = signal_rows(symbol, signals, times, sector, period)
+        with self._lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+        return len(rows)
+
+    def record_scan_result(self, result, sector=None, period=1):
+        """scanner.iter_scan 的单只结果（含 signals 与 signal_times）写入信号缓冲，可直接作为 on_result 回调"""
+        signals = result.get('signals')
+        if result.get('status') != 'ok' or signals is None or signals.empty:
+            return 0
+        return self.add_signals(result['symbol'], signals, result['signal_times'], sector, period)
+
+    def flush(self):
+        """把缓冲的信号在一个事务内写入，返回写入的行数（已存在的同一信号不重复保存）"""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return 0
+        recorded_at = _time_str(datetime.now())
+        with self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO signals (time, symbol, period, signal, reason, strength, price, price_change, '
+                'sector, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [row + (recorded_at,) for row in self._pending])
+            written = self._conn.total_changes - before
+        self._pending = []
+        return written
+
+    # ---------- 查询 ----------
+
+    def query(self, sql, params=()):
+        """执行只读查询，返回 DataFrame（先写入缓冲中的信号）"""
+        with self._lock:
+            self._flush_locked()
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def reports(self, start=None, end=None):
+        """时间范围内的全部报告（按时间升序）"""
+        clauses, params = _time_range('time', start, end)
+        return self.query(f'SELECT * FROM reports{_where(clauses)} ORDER BY time', params)
+
+    def sentiment_scores(self, days=30, daily=True, now=None):
+        """
+        近 days 天的情绪得分；daily=True 时每天只取最后一次运行
+        返回列：time、sentiment_score、suggestion、up_count、down_count
+        """
+        start = (now or datetime.now()) - timedelta(days=days)
+        clauses, params = _time_range('time', start, None)
+        if daily:
+            # 每天最后一次运行：按日期分组取最大编号
+            clauses = [f'id IN (SELECT MAX(id) FROM reports{_where(clauses)} GROUP BY substr(time, 1, 10))']
+        sql = f'SELECT time, sentiment_score, suggestion, up_count, down_count FROM reports{_where(clauses)}'
+        return self.query(sql + ' ORDER BY time', params)
+
+    def sectors(self, report_id=None, kind=None, name=None, start=None, end=None):
+        """
+        板块排名记录，带所属报告的时间；report_id 缺省时为时间范围内的全部报告
+        kind: hot/potential；name: 只看某个板块（例如查询它在哪些运行中进入前列）
+        """
+        clauses, params = _time_range('r.time', start, end)
+        for column, value in (('s.report_id', report_id), ('s.kind', kind), ('s.name', name)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        sql = ('SELECT r.time, s.* FROM sectors s JOIN reports r ON r.id = s.report_id'
+               f'{_where(clauses)} ORDER BY r.time, s.kind, s.rank')
+        return self.query(sql, params)
+
+    def signals(self, start=None, end=None, symbol=None, sector=None, signal=None, strength=None, period=None):
+        """
+        按条件查询交易信号（时间为信号所在K线的时间），例如本周某板块的强买入信号：
+        signals(start=本周一, sector='半导体', signal='买入', strength='强')
+        """
+        clauses, params = _time_range('time', start, end)
+        for column, value in (('symbol', symbol), ('sector', sector), ('signal', signal),
+                              ('strength', strength), ('period', period)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        sql = f"SELECT {', '.join(SIGNAL_COLUMNS)}, recorded_at FROM signals{_where(clauses)} ORDER BY time, symbol"
+        return self.query(sql, params)
+
+
+def _time_range(column, start, end):
+    """时间范围条件，返回 (条件列表, 参数列表)；end 只给日期时包含当天全部时间"""
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f'{column} >= ?')
+        params.append(_time_str(start))
+    if end is not None:
+        end = pd.Timestamp(end)
+        if end == end.normalize():
+            end += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        clauses.append(f'{column} <= ?')
+        params.append(_time_str(end))
+    return clauses, params
+
+
+def _where(clauses):
+    return ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+
+
+def week_start(now=None):
+    """本周一 00:00，用于“本周”的查询"""
+    today = (now or datetime.now()).date()
+    return datetime.combine(today - timedelta(days=today.weekday()), datetime.min.time())
@@ -0,0 +1,167 @@
+"""
+分时K线重采样
+由一次获取的1分钟K线生成 5/15/30/60 分钟K线，按A股交易时段对齐：
+上午 09:30-11:30、下午 13:00-15:00 各 120 分钟，周期均能整除，K线不跨越午休，
+时间标签为区间结束时刻（如5分钟K线 09:35、…、11:30、13:05、…、15:00，60分钟K线 10:30、11:30、14:00、15:00）。
+开盘前的集合竞价K线并入第一根，午休期间的K线并入下午第一根。
+- resample_bars：批量重采样，结果与 ak.stock_zh_a_minute 的列结构相同，可直接交给 minute.add_indicators
+- BarResampler：逐根接收新的1分钟K线，增量维护各周期K线
+"""
+import numpy as np
+import pandas as pd
+
+PERIODS = (1, 5, 15, 30, 60)
+SESSION_MINUTES = 120
+MORNING_OPEN = 9 * 60 + 30    # 09:30
+MORNING_CLOSE = 11 * 60 + 30  # 11:30
+AFTERNOON_OPEN = 13 * 60      # 13:00
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+def _check_period(period):
+    period = int(period)
+    if period < 1 or SESSION_MINUTES % period:
+        raise ValueError(f"不支持的K线周期：{period}（需能整除120分钟）")
+    return period
+
+
+def _bucket_end(minute_of_day, period):
+    """一天中的分钟数 -> 所属周期K线的结束分钟数（向量或标量均可）"""
+    minute_of_day = np.asarray(minute_of_day)
+    session_open = np.where(minute_of_day <= MORNING_CLOSE, MORNING_OPEN, AFTERNOON_OPEN)
+    offset = np.clip(minute_of_day - session_open, 1, SESSION_MINUTES)
+    return session_open + -(-offset // period) * period
+
+
+def resample_bars(df, period):
+    """
+    把1分钟K线（day/open/high/low/close/volume[/amount] 列，按时间升序）重采样为 period 分钟K线
+    period=1 时返回副本；返回的 DataFrame 在 attrs['period'] 中记录周期
+    """
+    period = _check_period(period)
+    if period == 1 or df is None or df.empty:
+        out = df.copy() if df is not None else None
+        if out is not None:
+            out.attrs['period'] = period
+        return out
+
+    times = pd.to_datetime(df['day'])
+    minutes = (times.dt.hour * 60 + times.dt.minute).to_numpy()
+    days = times.dt.normalize().to_numpy()
+    labels = days + (_bucket_end(minutes, period) * 60).astype('timedelta64[s]')
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+
+    out = {'day': pd.DatetimeIndex(labels[starts]).strftime('%Y-%m-%d %H:%M:%S')}
+    for col in BAR_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+        if col == 'open':
+            out[col] = values[starts]
+        elif col == 'close':
+            out[col] = values[ends]
+        elif col == 'high':
+            out[col] = np.fmax.reduceat(values, starts)
+        elif col == 'low':
+            out[col] = np.fmin.reduceat(values, starts)
+        else:  # 成交量、成交额
+            out[col] = np.add.reduceat(np.nan_to_num(values), starts)
+    result = pd.DataFrame(out)
+    result.attrs['period'] = period
+    return result
+
+
+def new_rows_start(days, last_time):
+    """
+    day 列中第一根晚于 last_time 的K线位置（从末尾向前查找，只解析新增部分的时间），
+    用于增量更新时跳过已处理的K线
+    """
+    if last_time is None:
+        return 0
+    i = len(days)
+    while i > 0 and pd.Timestamp(days.iloc[i - 1]) > last_time:
+        i -= 1
+    return i
+
+
+class BarResampler:
+    """
+    增量重采样
+    每根新的1分钟K线只更新各周期当前这根K线；到达区间结束时刻的K线立即完结该周期K线，
+    frame(period) 取得与 resample_bars 相同结构的结果（含尚未完结的最后一根）
+    """
+
+    def __init__(self, periods=PERIODS):
+        self.periods = [_check_period(p) for p in periods]
+        self._done = {p: [] for p in self.periods}     # 已完结的K线 [时间, 开, 高, 低, 收, 量, 额]
+        self._current = {p: None for p in self.periods}
+        self.last_time = None
+
+    def update(self, time, open, high, low, close, volume, amount=0.0):
+        """
+        接收一根1分钟K线，返回本次完结的K线 {周期: [时间, 开, 高, 低, 收, 量, 额]}；
+        时间不晚于上一根的K线直接忽略
+        """
+        time = pd.Timestamp(time)
+        if self.last_time is not None and time <= self.last_time:
+            return {}
+        self.last_time = time
+        volume = 0.0 if np.isnan(volume) else volume
+        amount = 0.0 if np.isnan(amount) else amount
+        minute_of_day = time.hour * 60 + time.minute
+        day = time.normalize()
+        completed = {}
+        for p in self.periods:
+            if p == 1:
+                # 1分钟周期保持原始K线（与 resample_bars(df, 1) 一致）
+                bar = [time, open, high, low, close, volume, amount]
+                self._done[p].append(bar)
+                completed[p] = bar
+                continue
+            end = int(_bucket_end(minute_of_day, p))
+            label = day + pd.Timedelta(minutes=end)
+            bar = self._current[p]
+            if bar is not None and bar[0] != label:
+                # 上一根没有收到结束时刻的K线（如数据缺失），遇到新区间时完结
+                self._done[p].append(bar)
+                completed[p] = bar
+                bar = None
+            if bar is None:
+                bar = [label, open, high, low, close, volume, amount]
+            else:
+                bar[2] = np.fmax(bar[2], high)
+                bar[3] = np.fmin(bar[3], low)
+                bar[4] = close
+                bar[5] += volume
+                bar[6] += amount
+            if minute_of_day >= end:
+                self._done[p].append(bar)
+                completed[p] = bar
+                bar = None
+            self._current[p] = bar
+        return completed
+
+    def update_frame(self, df):
+        """接收一段1分钟K线（只处理晚于上一根的部分），返回各周期本次完结的K线数"""
+        if df is None or df.empty:
+            return {p: 0 for p in self.periods}
+        before = {p: len(self._done[p]) for p in self.periods}
+        rows = df.iloc[new_rows_start(df['day'], self.last_time):]
+        times = pd.to_datetime(rows['day'])
+        columns = [pd.to_numeric(rows[col], errors='coerce').to_numpy(dtype=float) if col in rows.columns
+                   else np.zeros(len(rows)) for col in BAR_COLUMNS]
+        for i in range(len(rows)):
+            self.update(times.iloc[i], *(c[i] for c in columns))
+        return {p: len(self._done[p]) - before[p] for p in self.periods}
+
+    def frame(self, period, partial=True):
+        """某个周期的K线表；partial=False 时不含尚未完结的最后一根"""
+        period = _check_period(period)
+        rows = list(self._done[period])
+        if partial and self._current[period] is not None:
+            rows.append(self._current[period])
+        df = pd.DataFrame(rows, columns=['day'] + BAR_COLUMNS)
+        df['day'] = pd.to_datetime(df['day']).dt.strftime('%Y-%m-%d %H:%M:%S')
+        df.attrs['period'] = period
+        return df
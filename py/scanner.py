@@ -0,0 +1,213 @@
+"""
+多股票批量扫描
+用有界线程池并发获取分时数据（耗时主要在网络等待），带单只超时与指数退避重试，
+每只股票完成后立即产出结果，最终汇总为以股票代码为索引的 DataFrame
+"""
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+try:
+    from . import minute
+except ImportError:  # 直接以脚本方式运行
+    import minute
+
+
+def _scan_one(stock_code, provider=None):
+    """获取并分析单只股票；获取失败返回 None 以便重试"""
+    df = minute.get_stock_intraday_data(stock_code, provider)
+    if df is None:
+        return None
+    if df.empty:
+        return {'status': 'empty', 'signals': None, 'predictions': None}
+
+    # 一次获取、一次指标计算，信号与点位预测共用
+    df = minute.add_indicators(df)
+    signals = minute.analyze_trading_signals(stock_code, df=df)
+    return {
+        'status': 'ok',
+        'signals': signals,
+        'signal_times': minute.signal_times(signals, df),
+        'predictions': minute.predict_price_points(stock_code, df=df),
+    }
+
+
+def _timed_scan(started, stock_code, provider=None):
+    """在工作线程中记录开始时刻后执行 _scan_one，超时从真正开始执行时算起"""
+    started[0] = time.monotonic()
+    return _scan_one(stock_code, provider)
+
+
+def iter_scan(codes, workers=8, timeout=30, retries=2, backoff=1.0, provider=None):
+    """
+    并发扫描多只股票，按完成顺序逐只产出结果 dict：
+    symbol, status(ok/empty/failed/timeout), attempts, elapsed, signals, predictions
+    timeout: 单次尝试的超时秒数；retries: 失败后的重试次数；backoff: 首次重试等待秒数（之后翻倍）
+    provider: 数据源，默认为实时 akshare 数据源
+    注意：超时的网络调用无法被强行中断，只是放弃其结果，线程会在调用返回后回收；
+    被放弃的调用仍占用线程池的线程，空闲线程不足时换用新的线程池，保证新任务提交后立即开始执行
+    """
+    codes = list(dict.fromkeys(codes))  # 去重并保持顺序
+    queue = deque((code, 1) for code in codes)  # (代码, 第几次尝试)
+    delayed = []   # 等待退避的重试：(可重试时间, 代码, 第几次尝试)
+    running = {}   # future -> (代码, 第几次尝试, [开始执行时刻])
+    abandoned = []  # 超时后放弃、线程仍在执行的任务（占用当前线程池的线程）
+    first_start = {}
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while queue or delayed or running:
+            now = time.monotonic()
+
+            # 退避到期的重试重新入队
+            ready = [item for item in delayed if item[0] <= now]
+            delayed = [item for item in delayed if item[0] > now]
+            queue.extend((code, attempt) for _, code, attempt in ready)
+
+            # 有界并发：同时进行的任务不超过 workers
+            while queue and len(running) < workers:
+                abandoned = [f for f in abandoned if not f.done()]
+                if len(running) + len(abandoned) >= workers:
+                    # 空闲线程被超时任务占用：换用新的线程池，旧线程在调用返回后自行退出
+                    executor.shutdown(wait=False)
+                    executor = ThreadPoolExecutor(max_workers=workers)
+                    abandoned = []
+                code, attempt = queue.popleft()
+                first_start.setdefault(code, now)
+                started = [None]
+                running[executor.submit(_timed_scan, started, code, provider)] = (code, attempt, started)
+
+            # 等到有任务完成、超时或退避到期（尚未开始执行的任务按现在开始计）
+            deadlines = [(started[0] or now) + timeout for _, _, started in running.values()]
+            deadlines += [item[0] for item in delayed]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else 0.0
+            if running:
+                done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(wait_for)
+                done = set()
+
+            now = time.monotonic()
+            failures = []
+            for future in done:
+                code, attempt, _ = running.pop(future)
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    print(f"扫描 {code} 出错: {e}")
+                    outcome = None
+                if outcome is None:
+                    failures.append((code, attempt, 'failed'))
+                    continue
+                yield {
+                    'symbol': code,
+                    'attempts': attempt,
+                    'elapsed': now - first_start[code],
+                    **outcome,
+                }
+
+            for future, (code, attempt, started) in list(running.items()):
+                if started[0] is not None and now - started[0] >= timeout:
+                    running.pop(future)
+                    abandoned.append(future)
+                    failures.append((code, attempt, 'timeout'))
+
+            for code, attempt, status in failures:
+                if attempt <= retries:
+                    delayed.append((now + backoff * 2 ** (attempt - 1), code, attempt + 1))
+                else:
+                    yield {
+                        'symbol': code,
+                        'status': status,
+                        'attempts': attempt,
+                        'elapsed': now - first_start[code],
+                        'signals': None,
+                        'predictions': None,
+                    }
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize_result(result):
+    """将单只股票的扫描结果压缩为一行汇总"""
+    row = {
+        'status': result['status'],
+        'attempts': result.get('attempts'),
+        'elapsed': round(result.get('elapsed', 0.0), 3),
+        'current_price': None,
+        'signal_count': 0,
+        'last_signal': None,
+        'last_reason': None,
+        'last_strength': None,
+        'last_signal_time': None,
+        'best_buy_price': None,
+        'best_buy_confidence': None,
+        'best_sell_price': None,
+        'best_sell_confidence': None,
+    }
+
+    signals = result.get('signals')
+    if signals is not None and not signals.empty:
+        last = signals.iloc[-1]
+        times = result.get('signal_times')
+        row.update({
+            'signal_count': len(signals),
+            'last_signal': last['signal'],
+            'last_reason': last['reason'],
+            'last_strength': last['strength'],
+            'last_signal_time': times[-1] if times else None,  # K线时间，signals['time'] 只是行号
+        })
+
+    predictions = result.get('predictions')
+    if predictions:
+        row['current_price'] = predictions['current_price']
+        # predictions 已按置信度降序排列，各取第一个即最优
+        for pred in predictions['predictions']:
+            key = 'best_buy' if pred['type'] == '买入' else 'best_sell'
+            if row[f'{key}_price'] is None:
+                row[f'{key}_price'] = pred['price']
+                row[f'{key}_confidence'] = pred['confidence']
+
+    return row
+
+
+def scan_symbols(codes, workers=8, timeout=30, retries=2, backoff=1.0, on_result=None, provider=None,
+                 report_store=None, sectors=None):
+    """
+    并发扫描一组股票并返回以股票代码为索引的汇总表
+    on_result: 可选回调，每只股票完成时以 iter_scan 的结果 dict 调用，用于流式输出部分结果
+    report_store: 可选 report_store.ReportStore，逐只缓冲交易信号，扫描结束时批量写入；
+    sectors: 可选 {代码: 行业板块名称}，随信号一起保存
+    """
+    rows = {}
+    for result in iter_scan(codes, workers=workers, timeout=timeout, retries=retries, backoff=backoff,
+                            provider=provider):
+        rows[result['symbol']] = summarize_result(result)
+        if report_store is not None:
+            try:
+                report_store.record_scan_result(result, (sectors or {}).get(result['symbol']))
+            except ValueError as e:  # 数据没有K线时间，信号不保存，扫描继续
+                print(f"保存交易信号失败: {e}")
+        if on_result is not None:
+            on_result(result)
+    if report_store is not None:
+        report_store.flush()
+
+    # 按输入顺序排列
+    order = [code for code in dict.fromkeys(codes) if code in rows]
+    summary = pd.DataFrame.from_dict(rows, orient='index').reindex(order)
+    summary.index.name = 'symbol'
+    return summary
+
+
+if __name__ == "__main__":
+    import sys
+
+    watchlist = sys.argv[1:] or ["sh600519", "sz000001", "sh601318"]
+    report = scan_symbols(
+        watchlist,
+        on_result=lambda r: print(f"[{r['symbol']}] {r['status']} ({r['elapsed']:.2f}s)"),
+    )
+    print(report.to_string())
@@ -0,0 +1,209 @@
+"""
+全市场横截面选股
+对一份全市场快照（ak.stock_zh_a_spot）一次性计算每只股票的综合得分，全部为数组运算：
+- rel_sector：相对所属行业板块平均涨跌幅的超额涨幅（没有板块映射时相对全市场）
+- turnover：成交额相对近 N 日日均成交额（按当日已交易时间折算）的倍数，没有历史时用成交额排名
+- range：现价在当日最低价与最高价之间的位置，越接近最高价越强
+- momentum：相对 N 日前收盘价的涨幅，没有历史时用当日涨跌幅
+各分项先转换为横截面百分位排名（0~1），再按权重加总，部分选择取前 N 名，
+之后只对这 N 只股票调用 analyze_trading_signals 做深入分析（screen_and_scan）
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from . import market_calendar
+    from .instrumentation import metrics
+    from .market_frame import MarketFrame, SymbolIndex
+except ImportError:  # 直接以脚本方式运行
+    import market_calendar
+    from instrumentation import metrics
+    from market_frame import MarketFrame, SymbolIndex
+
+DEFAULT_WEIGHTS = {
+    'rel_sector': 0.3,
+    'turnover': 0.25,
+    'range': 0.2,
+    'momentum': 0.25,
+}
+
+
+class DailyHistory:
+    """
+    近 N 个交易日的日线数据（每日最后一份全市场快照），按 SymbolIndex 下标对齐：
+    avg_amount 日均成交额，first_close 窗口内第一天的收盘价（用于计算 N 日动量）
+    """
+
+    def __init__(self, index, avg_amount, first_close, dates):
+        self.index = index
+        self.avg_amount = avg_amount
+        self.first_close = first_close
+        self.dates = dates
+
+    def aligned(self, size):
+        pad = size - len(self.avg_amount)
+        if pad <= 0:
+            return self.avg_amount[:size], self.first_close[:size]
+        return (np.concatenate([self.avg_amount, np.full(pad, np.nan)]),
+                np.concatenate([self.first_close, np.full(pad, np.nan, dtype=self.first_close.dtype)]))
+
+    @classmethod
+    def from_store(cls, store, index, days=20, before=None):
+        """
+        由快照存储读取 before（默认当前行情所属交易日）之前最近 days 个交易日的收盘快照，
+        没有任何历史时返回 None
+        """
+        before = f"{(before or market_calendar.market_date()):%Y%m%d}"
+        dates = [d for d in store.dates('spot') if d < before][-days:]
+        frames = []
+        for d in dates:
+            times = store.snapshot_times('spot', d)
+            df = store.spot_at(times[-1]) if times else None
+            if df is not None and not df.empty:
+                frames.append(MarketFrame.from_spot(df, index))
+        if not frames:
+            return None
+        size = len(index)
+        amounts = np.vstack([f.aligned('amount', size) for f in frames])
+        present = np.vstack([np.pad(f.present, (0, size - len(f.present))) for f in frames])
+        counts = present.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_amount = np.where(counts > 0, np.where(present, amounts, 0).sum(axis=0) / counts, np.nan)
+        # 每只股票在窗口内第一次出现的收盘价
+        prices = np.vstack([f.aligned('price', size) for f in frames])
+        first = np.argmax(present, axis=0)
+        first_close = np.where(counts > 0, prices[first, np.arange(size)], np.nan).astype(np.float32)
+        return cls(index, avg_amount, first_close, dates)
+
+
+def _pct_rank(values, valid):
+    """valid 范围内的百分位排名（0~1，最大值为 1），其余位置为 NaN"""
+    ranks = np.full(len(values), np.nan)
+    pos = np.flatnonzero(valid & ~np.isnan(values))
+    if len(pos) == 1:
+        ranks[pos] = 0.5
+    elif len(pos) > 1:
+        order = np.argsort(values[pos], kind='stable')
+        ranks[pos[order]] = np.arange(len(pos)) / (len(pos) - 1)
+    return ranks
+
+
+def _top_n(scores, n):
+    """得分最高的 n 个位置（降序，NaN 不参与），部分选择后只排序这 n 个"""
+    pos = np.flatnonzero(~np.isnan(scores))
+    if len(pos) > n:
+        pos = pos[np.argpartition(-scores[pos], n - 1)[:n]]
+    return pos[np.lexsort((pos, -scores[pos]))]
+
+
+@metrics.timed('screener.score')
+def score_market(snapshot, membership=None, history=None, weights=None, exclude_st=True, now=None):
+    """
+    计算全市场每只股票的分项与综合得分
+    snapshot: MarketFrame 或 ak.stock_zh_a_spot 的 DataFrame；membership: sector_members.SectorMembership（已加载）；
+    history: DailyHistory（与 snapshot 共用同一个 SymbolIndex）；now: 快照时刻，用于按已交易时间折算成交额
+    返回以 SymbolIndex 下标对齐的 dict：各分项原值、排名与 score（不参与排名的股票为 NaN）
+    """
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    frame = snapshot if isinstance(snapshot, MarketFrame) else MarketFrame.from_spot(snapshot, SymbolIndex())
+    size = len(frame.present)
+    metrics.count('rows_processed', int(frame.present.sum()), stage='screener.score')
+
+    price = frame['price'].astype(np.float64)
+    change = frame['change_pct'].astype(np.float64)
+    high = frame['high'].astype(np.float64)
+    low = frame['low'].astype(np.float64)
+    amount = frame['amount']
+
+    # 可参与排名：有价格、有成交（排除停牌），可选排除 ST
+    valid = frame.present & ~np.isnan(price) & (price > 0) & (np.nan_to_num(amount) > 0)
+    if exclude_st:
+        names = frame.names(np.arange(size)).astype(str)
+        valid &= np.char.find(names, 'ST') < 0
+
+    # 相对板块超额涨幅
+    if membership is not None and len(membership):
+        board = membership.board_ids(frame.index)[:size]
+        known = valid & (board >= 0) & ~np.isnan(change)
+        n_boards = len(membership.boards)
+        sums = np.bincount(board[known], weights=change[known], minlength=n_boards)
+        counts = np.bincount(board[known], minlength=n_boards)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            board_mean = sums / counts
+        market_mean = change[valid].mean() if valid.any() else 0.0
+        baseline = np.where(board >= 0, board_mean[np.maximum(board, 0)], market_mean)
+    else:
+        baseline = np.full(size, change[valid].mean() if valid.any() else 0.0)
+    rel_sector = change - baseline
+
+    # 成交额相对历史日均（按已交易时间折算）
+    progress = market_calendar.session_progress(pd.Timestamp(now or frame.time or pd.Timestamp.now()).to_pydatetime())
+    if history is not None:
+        avg_amount, first_close = history.aligned(size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            turnover = amount / (avg_amount * max(progress, 1 / 240))
+            momentum = price / first_close - 1
+    else:
+        turnover = amount.astype(np.float64)
+        momentum = change.copy()
+
+    # 当日区间位置：0 为最低价，1 为最高价（一字板记 1）
+    span = high - low
+    with np.errstate(invalid='ignore', divide='ignore'):
+        range_pos = np.where(span > 0, (price - low) / span, 1.0)
+
+    components = {'rel_sector': rel_sector, 'turnover': turnover, 'range': range_pos, 'momentum': momentum}
+    score = np.zeros(size)
+    total = 0.0
+    result = {}
+    for name, values in components.items():
+        rank = _pct_rank(values, valid)
+        result[name] = values
+        result[f'{name}_rank'] = rank
+        w = weights.get(name, 0)
+        if w:
+            # 缺少某个分项时按中位数处理，避免因数据缺失被排除
+            score += w * np.where(np.isnan(rank), 0.5, rank)
+            total += w
+    result['score'] = np.where(valid, score / total if total else score, np.nan)
+    result['valid'] = valid
+    return result
+
+
+def screen(snapshot, membership=None, history=None, weights=None, top=50, exclude_st=True, now=None):
+    """
+    横截面选股：返回综合得分前 top 名的 DataFrame（以股票代码为索引），
+    含名称、所属板块、现价、涨跌幅、各分项原值与排名、综合得分
+    """
+    frame = snapshot if isinstance(snapshot, MarketFrame) else MarketFrame.from_spot(snapshot, SymbolIndex())
+    scored = score_market(frame, membership, history, weights, exclude_st, now)
+    pos = _top_n(scored['score'], top)
+
+    table = pd.DataFrame({
+        '名称': frame.names(pos).tolist(),
+        '板块名称': [membership.board_of(frame.index.codes[p]) for p in pos] if membership is not None else None,
+        '最新价': frame['price'][pos].astype(float).round(2),  # float32 转 float64 后去掉表示误差（A股价格为两位小数）
+        '涨跌幅': frame['change_pct'][pos].astype(float),
+        'score': scored['score'][pos],
+    }, index=pd.Index([frame.index.codes[p] for p in pos], name='symbol'))
+    for name in DEFAULT_WEIGHTS:
+        table[name] = scored[name][pos]
+        table[f'{name}_rank'] = scored[f'{name}_rank'][pos]
+    table.insert(0, 'rank', np.arange(1, len(pos) + 1))
+    return table
+
+
+def screen_and_scan(snapshot, membership=None, history=None, top=20, weights=None, **scan_kwargs):
+    """选出前 top 只股票后，用 scanner.scan_symbols 批量运行分时信号分析，结果按得分排名合并"""
+    try:
+        from . import scanner
+    except ImportError:  # 直接以脚本方式运行
+        import scanner
+
+    table = screen(snapshot, membership, history, weights, top=top)
+    if table.empty:
+        return table
+    if membership is not None:
+        scan_kwargs.setdefault('sectors', table['板块名称'].dropna().to_dict())
+    summary = scanner.scan_symbols(list(table.index), **scan_kwargs)
+    return table.join(summary, how='left')
@@ -0,0 +1,269 @@
+"""
+行业板块成分股索引
+由 ak.stock_board_industry_cons_em 汇总出“股票 -> 行业板块”映射，每个交易日获取一次
+（保存到快照存储的 industry_membership 整表，同一交易日内再次加载直接读取）。
+在此基础上：
+- sector_stats：对一份全市场快照（MarketFrame）做一次分组计算，得到各板块的涨跌家数、
+  成交额集中度与领涨/领跌股，不再逐个板块请求
+- scan_top_sectors：对热门/潜力板块的成分股批量运行分时信号分析（scanner.scan_symbols）
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import market_calendar
+    from . import snapshot_store
+    from .data_provider import get_default_provider
+    from .instrumentation import metrics
+    from .market_frame import MarketFrame, SymbolIndex
+    from .sector_rotation import clean_sectors
+except ImportError:  # 直接以脚本方式运行
+    import market_calendar
+    import snapshot_store
+    from data_provider import get_default_provider
+    from instrumentation import metrics
+    from market_frame import MarketFrame, SymbolIndex
+    from sector_rotation import clean_sectors
+
+MEMBERSHIP_TABLE = 'industry_membership'
+
+
+def plain_code(code):
+    """去掉交易所前缀：sh600519 -> 600519"""
+    code = str(code)
+    return code[-6:] if len(code) > 6 else code
+
+
+def prefixed_code(code):
+    """补上交易所前缀：600519 -> sh600519（4/8/92 开头为北交所，其余 6/9 开头为沪市，其余为深市）"""
+    code = str(code)
+    if len(code) > 6:
+        return code
+    # 北交所新代码段 92xxxx 与沪市 9 开头的B股重叠，需先判断
+    if code[0] in '48' or code.startswith('92'):
+        return 'bj' + code
+    if code[0] in '69':
+        return 'sh' + code
+    return 'sz' + code
+
+
+class SectorMembership:
+    """
+    股票 -> 行业板块映射
+    provider: 数据源；store: 保存成分股整表的 SnapshotStore，缺省为 STOCK_DATA_DIR 对应的默认存储
+    """
+
+    def __init__(self, provider=None, store=None):
+        self.provider = provider or get_default_provider()
+        self.store = store if store is not None else snapshot_store.default_store
+        self.table = None      # 代码（不带前缀）、名称、板块名称
+        self.date = None       # 成分股所属交易日
+        self.boards = []       # 板块名称，下标即板块编号
+        self._board_of = {}    # 代码（不带前缀） -> 板块编号
+        self._ids_index = None
+        self._ids = np.empty(0, dtype=np.int32)  # SymbolIndex 下标 -> 板块编号（-1 为未知）
+
+    def __len__(self):
+        return len(self._board_of)
+
+    # ---------- 加载 ----------
+
+    def load(self, refresh=False, workers=8):
+        """加载当日成分股；存储中已有当日整表时直接读取，refresh=True 时强制重新获取"""
+        today = market_calendar.market_date()
+        if not refresh and self.date == today and self.table is not None:
+            return self
+
+        table = None
+        if not refresh and self.store is not None:
+            table = self.store.read_table(MEMBERSHIP_TABLE)
+            if table is not None and (table.empty or str(table['date'].iloc[0]) != f"{today:%Y%m%d}"):
+                table = None
+        if table is None:
+            table = self._fetch_all(workers)
+            table['date'] = f"{today:%Y%m%d}"
+            if self.store is not None and not table.empty:
+                try:
+                    self.store.write_table(MEMBERSHIP_TABLE, table)
+                except Exception as e:
+                    print(f"保存板块成分股失败: {e}")
+        self._build(table)
+        self.date = today
+        return self
+
+    def _fetch_all(self, workers):
+        """获取板块列表后并发获取各板块成分股，单个板块失败时跳过"""
+        try:
+            boards = clean_sectors(self.provider.stock_board_industry_name_em())['板块名称'].astype(str).tolist()
+        except Exception as e:
+            print(f"获取行业板块列表失败: {e}")
+            return pd.DataFrame(columns=['代码', '名称', '板块名称'])
+
+        def fetch(board):
+            try:
+                df = self.provider.stock_board_industry_cons_em(symbol=board)
+            except Exception as e:
+                print(f"获取板块 {board} 成分股失败: {e}")
+                return None
+            if df is None or df.empty or '代码' not in df.columns:
+                return None
+            names = df['名称'].astype(str) if '名称' in df.columns else ''
+            return pd.DataFrame({'代码': df['代码'].astype(str).map(plain_code), '名称': names, '板块名称': board})
+
+        with metrics.stage('sector_members.fetch'):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                frames = [df for df in executor.map(fetch, boards) if df is not None]
+        if not frames:
+            return pd.DataFrame(columns=['代码', '名称', '板块名称'])
+        return pd.concat(frames, ignore_index=True)
+
+    def _build(self, table):
+        table = table.drop_duplicates('代码', keep='first').reset_index(drop=True)  # 一只股票只归入一个行业
+        self.table = table
+        self.boards = list(dict.fromkeys(table['板块名称'].astype(str)))
+        board_pos = {name: i for i, name in enumerate(self.boards)}
+        self._board_of = {code: board_pos[board] for code, board in zip(table['代码'].astype(str), table['板块名称'].astype(str))}
+        self._ids_index = None
+        self._ids = np.empty(0, dtype=np.int32)
+
+    # ---------- 查询 ----------
+
+    def board_of(self, code):
+        """股票所属的行业板块名称，未知时返回 None"""
+        b = self._board_of.get(plain_code(code))
+        return self.boards[b] if b is not None else None
+
+    def members(self, board):
+        """板块成分股代码（不带前缀）"""
+        if self.table is None:
+            return []
+        return self.table.loc[self.table['板块名称'] == board, '代码'].tolist()
+
+    def board_ids(self, index):
+        """
+        SymbolIndex 各下标对应的板块编号（-1 为未知）；
+        同一个索引只对新增的股票补算，多份快照之间复用
+        """
+        if self._ids_index is not index:
+            self._ids_index = index
+            self._ids = np.empty(0, dtype=np.int32)
+        done = len(self._ids)
+        if len(index) > done:
+            lookup = self._board_of
+            extra = np.fromiter((lookup.get(plain_code(c), -1) for c in index.codes[done:]),
+                                dtype=np.int32, count=len(index) - done)
+            self._ids = np.concatenate([self._ids, extra])
+        return self._ids
+
+    def sector_stats(self, snapshot):
+        """
+        按板块汇总一份全市场快照（MarketFrame 或 ak.stock_zh_a_spot 的 DataFrame），返回以板块名称为索引的 DataFrame：
+        count/up/down/advance_ratio/avg_change、amount（亿元）、amount_share（占全市场成交额）、
+        hhi（板块内成交额的赫芬达尔指数，越大越集中）、top_share（成交额第一的股票占比）、
+        leader/leader_change、laggard/laggard_change
+        """
+        if not self.boards:
+            return pd.DataFrame()
+        frame = snapshot if isinstance(snapshot, MarketFrame) else MarketFrame.from_spot(snapshot, SymbolIndex())
+        size = len(frame.present)
+        ids = self.board_ids(frame.index)[:size]
+        change = frame['change_pct'].astype(np.float64)
+        amount = np.nan_to_num(frame['amount'], nan=0.0)
+        valid = frame.present & (ids >= 0)
+        pos = np.flatnonzero(valid)
+        b, change, amount = ids[pos], change[pos], amount[pos]
+        n = len(self.boards)
+
+        # 计数与求和：bincount 一次完成
+        has_change = ~np.isnan(change)
+        count = np.bincount(b, minlength=n)
+        priced = np.bincount(b, weights=has_change, minlength=n)
+        up = np.bincount(b, weights=change > 0, minlength=n)
+        down = np.bincount(b, weights=change < 0, minlength=n)
+        change_sum = np.bincount(b, weights=np.where(has_change, change, 0), minlength=n)
+        amount_sum = np.bincount(b, weights=amount, minlength=n)
+        amount_sq = np.bincount(b, weights=amount * amount, minlength=n)
+        amount_max = np.zeros(n)
+        np.maximum.at(amount_max, b, amount)
+
+        # 领涨/领跌：按（板块, 涨跌幅）排序一次，每组首尾即为领跌、领涨
+        leader = np.full(n, -1)
+        laggard = np.full(n, -1)
+        ok = np.flatnonzero(has_change)
+        if len(ok):
+            order = ok[np.lexsort((change[ok], b[ok]))]
+            groups = b[order]
+            starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+            ends = np.r_[starts[1:], len(order)] - 1
+            laggard[groups[starts]] = pos[order[starts]]
+            leader[groups[ends]] = pos[order[ends]]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            df = pd.DataFrame({
+                'count': count,
+                'up': up.astype(int),
+                'down': down.astype(int),
+                'advance_ratio': up / (up + down),
+                'avg_change': change_sum / priced,
+                'amount': amount_sum / 100000000,  # 亿元
+                'amount_share': amount_sum / amount_sum.sum() if amount_sum.sum() > 0 else np.nan,
+                'hhi': amount_sq / (amount_sum * amount_sum),
+                'top_share': amount_max / amount_sum,
+            }, index=pd.Index(self.boards, name='板块名称'))
+        codes = np.asarray(frame.index.codes, dtype=object)
+        names = frame.names(np.arange(len(frame.present)))
+        all_change = frame['change_pct']
+        for col, idx in (('leader', leader), ('laggard', laggard)):
+            found = idx >= 0
+            df[col] = np.where(found, codes[np.where(found, idx, 0)], None)
+            df[f'{col}_name'] = np.where(found, names[np.where(found, idx, 0)], None)
+            df[f'{col}_change'] = np.where(found, all_change[np.where(found, idx, 0)], np.nan)
+        return df[df['count'] > 0]
+
+    def constituents(self, board, snapshot=None, limit=None):
+        """
+        板块成分股（带交易所前缀的代码，可直接用于 scanner）；
+        提供快照时只保留快照中出现的股票，并按成交额从大到小取前 limit 只
+        """
+        codes = self.members(board)
+        if snapshot is None:
+            return [prefixed_code(c) for c in codes[:limit]]
+        frame = snapshot if isinstance(snapshot, MarketFrame) else MarketFrame.from_spot(snapshot, SymbolIndex())
+        b = self.boards.index(board) if board in self.boards else -1
+        ids = self.board_ids(frame.index)[:len(frame.present)]
+        pos = np.flatnonzero(frame.present & (ids == b))
+        amount = np.nan_to_num(frame['amount'][pos], nan=0.0)
+        pos = pos[np.argsort(-amount, kind='stable')][:limit]
+        return [prefixed_code(frame.index.codes[p]) for p in pos]
+
+
+def scan_top_sectors(membership, sectors, snapshot=None, top=3, per_sector=10, **scan_kwargs):
+    """
+    批量分析热门/潜力板块的成分股
+    sectors: summarize_sectors 的返回值 {'hot_sectors', 'potential_sectors'}；
+    每类取前 top 个板块，每个板块取成交额最大的 per_sector 只股票（无快照时按成分股顺序），
+    合并去重后调用 scanner.scan_symbols，结果增加 板块名称、类别 两列
+    """
+    try:
+        from . import scanner
+    except ImportError:  # 直接以脚本方式运行
+        import scanner
+
+    picked = {}  # 代码 -> (板块名称, 类别)
+    for kind, key in (('hot', 'hot_sectors'), ('potential', 'potential_sectors')):
+        df = sectors.get(key)
+        if df is None or df.empty:
+            continue
+        for board in df['板块名称'].astype(str).head(top):
+            for code in membership.constituents(board, snapshot, limit=per_sector):
+                picked.setdefault(code, (board, kind))
+    if not picked:
+        return pd.DataFrame()
+
+    scan_kwargs.setdefault('sectors', {code: board for code, (board, _) in picked.items()})
+    summary = scanner.scan_symbols(list(picked), **scan_kwargs)
+    summary.insert(0, '板块名称', [picked[c][0] for c in summary.index])
+    summary.insert(1, '类别', [picked[c][1] for c in summary.index])
+    return summary
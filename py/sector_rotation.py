@@ -0,0 +1,234 @@
+"""
+行业板块轮动
+保存一天内连续的行业板块快照（ak.stock_board_industry_name_em），计算各板块的滚动动量与排名变化，
+每份快照用部分选择（argpartition）维护前 k 名热门/潜力板块集合，
+“最近30分钟新进入前10的板块”等问题直接由内存中的历史快照回答，无需重新获取数据
+"""
+import bisect
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .market_frame import SymbolIndex
+except ImportError:  # 直接以脚本方式运行
+    from market_frame import SymbolIndex
+
+SECTOR_COLUMNS = ['板块名称', '涨跌幅', '变动金额']
+
+COLUMN_MAPPING = {
+    '行业': '板块名称',
+    '名称': '板块名称',
+    '涨跌额': '变动金额',  # 使用涨跌额替代成交额
+    '涨跌幅': '涨跌幅',
+    '涨跌幅(%)': '涨跌幅'
+}
+
+
+def _to_number(series, strip=()):
+    """数值列直接使用；字符串列去掉 % + , 等符号后再转换"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    text = series.astype(str)
+    for ch in strip:
+        text = text.str.replace(ch, '', regex=False)
+    return pd.to_numeric(text, errors='coerce')
+
+
+def clean_sectors(df_sectors):
+    """标准化行业板块列名并把涨跌幅、变动金额转换为数值（缺失值按0处理）"""
+    df_sectors.columns = [str(col).strip() for col in df_sectors.columns]
+    df_sectors = df_sectors.rename(columns=COLUMN_MAPPING)
+
+    # 确保必要列存在
+    for col in SECTOR_COLUMNS:
+        if col not in df_sectors.columns:
+            raise ValueError(f"数据缺少必要列：{col}")
+
+    df_sectors['涨跌幅'] = _to_number(df_sectors['涨跌幅'], strip=('%', '+'))
+    df_sectors['变动金额'] = _to_number(df_sectors['变动金额'], strip=(',',))
+    df_sectors = df_sectors.fillna(0)
+    df_sectors['涨跌幅'] = df_sectors['涨跌幅'].astype(float)
+    df_sectors['变动金额'] = df_sectors['变动金额'].astype(float)
+    return df_sectors
+
+
+def potential_scores(change_pct, amount):
+    """潜力得分：资金流入量为主要考虑因素，涨幅接近0为次要考虑因素"""
+    return amount - np.abs(change_pct) * 100
+
+
+def top_k(values, k, mask=None):
+    """
+    按 values 降序取前 k 个位置（并列时位置靠前者优先），只对候选部分排序
+    mask 为 False 的位置不参与
+    """
+    values = np.asarray(values, dtype=float)
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(values))
+    candidates = candidates[~np.isnan(values[candidates])]
+    if len(candidates) > k:
+        part = np.argpartition(-values[candidates], k - 1)[:k]
+        # 与第 k 名并列的值可能落在分区之外，一并纳入后再截断
+        kth = values[candidates[part]].min()
+        candidates = candidates[values[candidates] >= kth]
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order][:k]
+
+
+class SectorRotation:
+    """
+    板块轮动跟踪器
+    k: 热门/潜力集合的大小；max_snapshots: 最多保留的快照数（None 不限制）
+    交易日变化时清空历史
+    """
+
+    def __init__(self, k=10, max_snapshots=None):
+        self.k = k
+        self.max_snapshots = max_snapshots
+        self.index = SymbolIndex()  # 板块名称 -> 固定下标
+        self.times = []
+        self._change = []     # 每份快照按板块下标对齐的涨跌幅（float32，缺失为 NaN）
+        self._amount = []
+        self._rank = []       # 涨跌幅排名（1 起，缺失为 0）
+        self._hot = []        # 热门板块下标（按名次）
+        self._potential = []  # 潜力板块下标（按名次）
+
+    def __len__(self):
+        return len(self.times)
+
+    def update(self, df_sectors, time=None):
+        """接收一份板块快照（可以是未清洗的原始数据），返回 {'hot_sectors', 'potential_sectors'}"""
+        if '变动金额' not in df_sectors.columns or not pd.api.types.is_float_dtype(df_sectors['涨跌幅']):
+            df_sectors = clean_sectors(df_sectors)
+        time = pd.Timestamp(time or df_sectors.attrs.get('snapshot_time') or datetime.now())
+        if self.times and self.times[-1].date() != time.date():
+            self.clear()
+
+        pos = self.index.positions(df_sectors['板块名称'].astype(str).tolist())
+        n = len(self.index)
+        change = np.full(n, np.nan, dtype=np.float32)
+        amount = np.full(n, np.nan, dtype=np.float32)
+        change[pos] = df_sectors['涨跌幅'].to_numpy(dtype=float)
+        amount[pos] = df_sectors['变动金额'].to_numpy(dtype=float)
+
+        # 热门/潜力集合由同一份数据的原始行序做部分选择，与整表排序取前 k 的结果一致
+        raw_change = df_sectors['涨跌幅'].to_numpy(dtype=float)
+        raw_amount = df_sectors['变动金额'].to_numpy(dtype=float)
+        hot_rows = top_k(raw_change, self.k)
+        potential_rows = top_k(potential_scores(raw_change, raw_amount), self.k, mask=raw_amount > 0)
+
+        # 全体排名用于计算排名变化（板块数量只有几百个）
+        rank = np.zeros(n, dtype=np.int16)
+        order = np.lexsort((pos, -raw_change))
+        rank[pos[order]] = np.arange(1, len(order) + 1)
+
+        self.times.append(time)
+        self._change.append(change)
+        self._amount.append(amount)
+        self._rank.append(rank)
+        self._hot.append(pos[hot_rows])
+        self._potential.append(pos[potential_rows])
+        if self.max_snapshots and len(self.times) > self.max_snapshots:
+            for series in (self.times, self._change, self._amount, self._rank, self._hot, self._potential):
+                del series[0]
+
+        return {
+            'hot_sectors': df_sectors.iloc[hot_rows].reindex(columns=SECTOR_COLUMNS),
+            'potential_sectors': df_sectors.iloc[potential_rows].reindex(columns=SECTOR_COLUMNS),
+        }
+
+    def clear(self):
+        for series in (self.times, self._change, self._amount, self._rank, self._hot, self._potential):
+            series.clear()
+
+    # ---------- 查询 ----------
+
+    def _at(self, t):
+        """t 时刻（含）之前最近一份快照的序号，没有则为 0（最早一份）"""
+        i = bisect.bisect_right(self.times, pd.Timestamp(t)) - 1
+        return max(i, 0)
+
+    def _window(self, minutes, now):
+        end = self._at(now) if now is not None else len(self.times) - 1
+        start = self._at(self.times[end] - pd.Timedelta(minutes=minutes))
+        return start, end
+
+    def _names(self, positions):
+        return [self.index.codes[p] for p in positions]
+
+    def hot(self, now=None):
+        """当前（或 now 时刻）的热门板块名称，按名次"""
+        if not self.times:
+            return []
+        return self._names(self._hot[self._at(now) if now is not None else -1])
+
+    def potential(self, now=None):
+        if not self.times:
+            return []
+        return self._names(self._potential[self._at(now) if now is not None else -1])
+
+    def entered_top(self, minutes=30, kind='hot', now=None):
+        """最近 minutes 分钟内新进入前 k 名的板块：当前在集合中、窗口起点时不在"""
+        if not self.times:
+            return []
+        sets = self._hot if kind == 'hot' else self._potential
+        start, end = self._window(minutes, now)
+        before = set(sets[start].tolist())
+        return [name for p, name in zip(sets[end], self._names(sets[end])) if p not in before]
+
+    def left_top(self, minutes=30, kind='hot', now=None):
+        """最近 minutes 分钟内跌出前 k 名的板块"""
+        if not self.times:
+            return []
+        sets = self._hot if kind == 'hot' else self._potential
+        start, end = self._window(minutes, now)
+        current = set(sets[end].tolist())
+        return [name for p, name in zip(sets[start], self._names(sets[start])) if p not in current]
+
+    def rotation(self, minutes=30, now=None):
+        """
+        各板块的滚动动量与排名变化，按当前涨跌幅降序
+        momentum: 窗口内涨跌幅的变化（百分点）；rank_change: 名次提升为正
+        """
+        if not self.times:
+            return pd.DataFrame()
+        start, end = self._window(minutes, now)
+        change, rank = self._change[end], self._rank[end]
+        n = len(change)
+        start_change = _pad(self._change[start], n, np.nan)
+        start_rank = _pad(self._rank[start], n, 0)
+        present = ~np.isnan(change)
+        hot = np.zeros(n, dtype=bool)
+        hot[self._hot[end]] = True
+        potential = np.zeros(n, dtype=bool)
+        potential[self._potential[end]] = True
+
+        df = pd.DataFrame({
+            '板块名称': self._names(range(n)),
+            '涨跌幅': change.astype(float),
+            '变动金额': _pad(self._amount[end], n, np.nan).astype(float),
+            'momentum': (change - start_change).astype(float),
+            'rank': rank,
+            'rank_change': np.where(start_rank > 0, start_rank.astype(int) - rank, 0),
+            'hot': hot,
+            'potential': potential,
+        })[present]
+        df.attrs['window'] = (self.times[start], self.times[end])
+        return df.sort_values('rank', ignore_index=True)
+
+    @classmethod
+    def from_store(cls, store, date=None, k=10):
+        """用快照存储中某日（默认最近一日）的全部行业板块快照重建"""
+        tracker = cls(k=k)
+        for t in store.snapshot_times('sector', date):
+            df = store.sectors_at(t)
+            if df is not None and not df.empty:
+                tracker.update(df, t)
+        return tracker
+
+
+def _pad(values, n, fill):
+    if len(values) >= n:
+        return values
+    return np.concatenate([values, np.full(n - len(values), fill, dtype=values.dtype)])
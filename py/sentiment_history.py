@@ -0,0 +1,176 @@
+"""
+历史市场情绪
+指数日线（ak.stock_zh_index_daily_em）只完整下载一次并保存到快照存储，之后只请求最后一个已保存交易日及以后的数据并合并；
+情绪分项（涨跌幅、成交量比、涨跌家数）对全部交易日做向量化计算，与 MarketSentiment.score_sentiment 的公式一致，
+一次调用可同时处理上证指数、深证成指、创业板指、沪深300，得到可用于回测的情绪时间序列
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from . import market_calendar
+    from . import snapshot_store
+    from .data_provider import get_default_provider
+    from .instrumentation import metrics
+    from .market_frame import MarketFrame
+except ImportError:  # 直接以脚本方式运行
+    import market_calendar
+    import snapshot_store
+    from data_provider import get_default_provider
+    from instrumentation import metrics
+    from market_frame import MarketFrame
+
+INDEX_SYMBOLS = {
+    'sh000001': '上证指数',
+    'sz399001': '深证成指',
+    'sz399006': '创业板指',
+    'sh000300': '沪深300',
+}
+
+
+def sentiment_components(df_index, advance_ratio=None):
+    """
+    按日计算情绪分项（向量化），返回以日期为索引的 DataFrame：
+    change_pct/change_score（0-40）、volume_ratio/volume_score（0-30）、advance_ratio/breadth_score（0-30）、score（0-100）
+    advance_ratio: 可选，以日期为索引的上涨家数占比（上涨/(上涨+下跌)）；缺少的日期涨跌家数得分为 0，与实时计算的失败处理一致
+    """
+    dates = pd.to_datetime(df_index['date'])
+    close = pd.to_numeric(df_index['close'], errors='coerce').to_numpy(dtype=float)
+    volume = pd.to_numeric(df_index['volume'], errors='coerce').to_numpy(dtype=float)
+    prev_close = np.r_[np.nan, close[:-1]]
+    prev_volume = np.r_[np.nan, volume[:-1]]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change_pct = (close - prev_close) / prev_close * 100
+        volume_ratio = volume / prev_volume
+    # 将涨跌幅从-10%~10%映射到0-40分，成交量比从0.5~1.5映射到0-30分
+    change_score = np.clip((change_pct + 10) * 2, 0, 40)
+    volume_score = np.clip((volume_ratio - 0.5) * 30, 0, 30)
+
+    if advance_ratio is not None:
+        ratio = pd.Series(advance_ratio, dtype=float)
+        ratio.index = pd.to_datetime(ratio.index).normalize()
+        ratio = ratio.reindex(dates.dt.normalize()).to_numpy(dtype=float)
+    else:
+        ratio = np.full(len(close), np.nan)
+    # 将涨跌比从0~1映射到0-30分
+    breadth_score = np.nan_to_num(np.clip(ratio * 30, 0, 30), nan=0.0)
+
+    return pd.DataFrame({
+        'close': close,
+        'change_pct': change_pct,
+        'change_score': change_score,
+        'volume_ratio': volume_ratio,
+        'volume_score': volume_score,
+        'advance_ratio': ratio,
+        'breadth_score': breadth_score,
+        'score': change_score + volume_score + breadth_score,
+    }, index=pd.Index(dates, name='date'))
+
+
+def breadth_history(store, dates=None):
+    """
+    由快照存储中每个交易日最后一份全市场快照计算上涨家数占比，返回以日期为索引的 Series
+    dates: 可选，只计算这些日期（YYYYMMDD）
+    """
+    values = {}
+    for d in dates or store.dates('spot'):
+        times = store.snapshot_times('spot', d)
+        df = store.spot_at(times[-1]) if times else None
+        if df is None or df.empty:
+            continue
+        up, down = MarketFrame.from_spot(df).breadth()
+        if up + down:
+            values[pd.Timestamp(times[-1]).normalize()] = up / (up + down)
+    return pd.Series(values, dtype=float, name='advance_ratio')
+
+
+class IndexHistory:
+    """
+    指数日线历史
+    store: 保存 index_daily_<代码> 整表的 SnapshotStore，缺省为 STOCK_DATA_DIR 对应的默认存储（未配置时只保存在内存）
+    """
+
+    def __init__(self, provider=None, store=None):
+        self.provider = provider or get_default_provider()
+        self.store = store if store is not None else snapshot_store.default_store
+        self._frames = {}  # 指数代码 -> 日线 DataFrame（date 列升序）
+
+    def frame(self, symbol):
+        """已保存的日线（不发起请求），没有时返回 None"""
+        df = self._frames.get(symbol)
+        if df is None and self.store is not None:
+            df = self.store.read_table(f"index_daily_{symbol}")
+            if df is not None and not df.empty:
+                self._frames[symbol] = df
+        return df
+
+    def update(self, symbol, now=None):
+        """
+        补齐日线到当前行情所属交易日：没有历史时下载全部；已有历史时从最后一个已保存交易日开始请求
+        （该日可能是盘中未收盘的数据，一并刷新）；收盘后已是最新时不发起请求
+        """
+        now = now or pd.Timestamp.now().to_pydatetime()
+        stored = self.frame(symbol)
+        if stored is not None and not stored.empty:
+            last = pd.Timestamp(stored['date'].iloc[-1]).date()
+            if last >= market_calendar.market_date(now) and not market_calendar.is_trading_time(now):
+                return stored
+            with metrics.stage('sentiment_history.append', symbol=symbol):
+                new = self.provider.stock_zh_index_daily_em(symbol=symbol, start_date=f"{last:%Y%m%d}")
+            if new is None or new.empty:
+                return stored
+            dates = pd.to_datetime(stored['date'])
+            df = pd.concat([stored[dates.dt.date < last], new], ignore_index=True)
+        else:
+            with metrics.stage('sentiment_history.full', symbol=symbol):
+                df = self.provider.stock_zh_index_daily_em(symbol=symbol)
+            if df is None or df.empty:
+                return df
+
+        df = df.copy()
+        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+        df = df.drop_duplicates('date', keep='last').sort_values('date', ignore_index=True)
+        metrics.count('rows_processed', len(df), stage='sentiment_history.update')
+        self._frames[symbol] = df
+        if self.store is not None:
+            try:
+                self.store.write_table(f"index_daily_{symbol}", df)
+            except Exception as e:
+                print(f"保存 {symbol} 指数日线失败: {e}")
+        return df
+
+    def update_all(self, symbols=INDEX_SYMBOLS, now=None):
+        """补齐多个指数，单个指数失败时跳过，返回 {指数代码: 日线}"""
+        frames = {}
+        for symbol in symbols:
+            try:
+                df = self.update(symbol, now)
+            except Exception as e:
+                print(f"更新 {symbol} 指数日线失败: {e}")
+                continue
+            if df is not None and not df.empty:
+                frames[symbol] = df
+        return frames
+
+    def sentiment(self, symbols=INDEX_SYMBOLS, advance_ratio=None, start=None, end=None, update=True):
+        """
+        多个指数的历史情绪序列，返回以 (symbol, date) 为索引的长表，另含 name 列
+        advance_ratio: 可选，按日期的上涨家数占比（如 breadth_history(store)）；update=False 时只用已保存的数据
+        """
+        if update:
+            frames = self.update_all(symbols)
+        else:
+            frames = {s: df for s, df in ((s, self.frame(s)) for s in symbols) if df is not None and not df.empty}
+        parts = []
+        for symbol, df in frames.items():
+            part = sentiment_components(df, advance_ratio)
+            if start is not None:
+                part = part[part.index >= pd.Timestamp(start)]
+            if end is not None:
+                part = part[part.index <= pd.Timestamp(end)]
+            part.insert(0, 'name', INDEX_SYMBOLS.get(symbol, symbol))
+            parts.append(part)
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, keys=list(frames), names=['symbol', 'date'])
@@ -0,0 +1,243 @@
+"""
+行情快照的列式存储
+按日期（分钟线再按股票）分区追加保存全市场快照、1分钟K线和行业板块快照，
+保留数据类型，读取时无需重新解析 CSV。
+安装了 pyarrow 时使用 Parquet（内存映射读取），否则退化为 pandas pickle
+
+目录结构：
+    root/spot/date=YYYYMMDD/HHMMSSffffff.parquet
+    root/sector/date=YYYYMMDD/HHMMSSffffff.parquet
+    root/minute/date=YYYYMMDD/symbol=sh600519.parquet
+    root/table/<name>.parquet（不分区的整表，如指数日线）
+"""
+import bisect
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+BAR_NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+class SnapshotStore:
+    def __init__(self, root='market_data', fmt=None):
+        self.root = root
+        self.fmt = fmt or ('parquet' if HAS_PYARROW else 'pickle')
+        self.ext = '.parquet' if self.fmt == 'parquet' else '.pkl'
+        # 同一进程内多个线程（扫描线程、常驻监控）可能同时追加同一只股票同一天的K线，读取-合并-写入需串行
+        self._merge_lock = threading.Lock()
+
+    # ---------- 写入 ----------
+
+    def append_spot(self, df, ts=None):
+        """追加一份全市场实时行情快照（ak.stock_zh_a_spot）"""
+        return self._append_snapshot('spot', df, ts)
+
+    def append_sectors(self, df, ts=None):
+        """追加一份行业板块快照（ak.stock_board_industry_name_em）"""
+        return self._append_snapshot('sector', df, ts)
+
+    def append_bars(self, symbol, df):
+        """
+        追加某只股票的1分钟K线（ak.stock_zh_a_minute），按交易日拆分
+        与已有数据按时间去重合并，重复获取同一天的数据不会产生重复K线
+        """
+        bars = normalize_bars(df)
+        if bars.empty:
+            return
+        for day, part in bars.groupby(bars['day'].dt.strftime('%Y%m%d'), sort=False):
+            path = self._bar_path(day, symbol)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._merge_lock:
+                if os.path.exists(path):
+                    part = pd.concat([self._read(path), part], ignore_index=True)
+                    part = part.drop_duplicates('day', keep='last').sort_values('day', ignore_index=True)
+                self._write(part.reset_index(drop=True), path)
+
+    def write_table(self, name, df):
+        """整表覆盖保存（如指数日线历史）"""
+        path = self._table_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write(df.reset_index(drop=True), path)
+
+    # ---------- 读取 ----------
+
+    def read_table(self, name):
+        """读取整表，不存在时返回 None"""
+        path = self._table_path(name)
+        return self._read(path) if os.path.exists(path) else None
+
+    def snapshot_times(self, kind='spot', date=None):
+        """某日（默认最近一个有数据的日期）的全部快照时间，升序"""
+        date = date or self._latest_date(kind)
+        if date is None:
+            return []
+        folder = os.path.join(self.root, kind, f"date={_date_str(date)}")
+        if not os.path.isdir(folder):
+            return []
+        names = sorted(n for n in os.listdir(folder) if n.endswith(self.ext))
+        return [datetime.strptime(_date_str(date) + n[:-len(self.ext)], '%Y%m%d%H%M%S%f') for n in names]
+
+    def latest_spot(self):
+        """最近一份全市场快照，快照时间记录在 df.attrs['snapshot_time']"""
+        return self._snapshot_at('spot', None)
+
+    def spot_at(self, t):
+        """时刻 t 的全市场快照（t 之前最近的一份）"""
+        return self._snapshot_at('spot', t)
+
+    def latest_sectors(self):
+        return self._snapshot_at('sector', None)
+
+    def sectors_at(self, t):
+        return self._snapshot_at('sector', t)
+
+    def bars(self, symbol, start=None, end=None):
+        """某只股票在 [start, end] 时间范围内的1分钟K线"""
+        folder = os.path.join(self.root, 'minute')
+        if not os.path.isdir(folder):
+            return pd.DataFrame(columns=['day'] + BAR_NUMERIC_COLUMNS)
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        frames = []
+        for date in sorted(_partition_dates(folder)):
+            # 先按分区日期裁剪，只读取范围内的文件
+            day = pd.Timestamp(datetime.strptime(date, '%Y%m%d'))
+            if start is not None and day < start.normalize():
+                continue
+            if end is not None and day > end.normalize():
+                continue
+            path = self._bar_path(date, symbol)
+            if os.path.exists(path):
+                frames.append(self._read(path))
+        if not frames:
+            return pd.DataFrame(columns=['day'] + BAR_NUMERIC_COLUMNS)
+
+        bars = pd.concat(frames, ignore_index=True)
+        mask = pd.Series(True, index=bars.index)
+        if start is not None:
+            mask &= bars['day'] >= start
+        if end is not None:
+            mask &= bars['day'] <= end
+        return bars[mask].reset_index(drop=True)
+
+    def bar_symbols(self, date):
+        """某交易日已保存分钟线的全部股票"""
+        folder = os.path.join(self.root, 'minute', f"date={_date_str(date)}")
+        if not os.path.isdir(folder):
+            return []
+        return sorted(n[len('symbol='):-len(self.ext)] for n in os.listdir(folder) if n.endswith(self.ext))
+
+    def dates(self, kind='spot'):
+        folder = os.path.join(self.root, kind)
+        return sorted(_partition_dates(folder)) if os.path.isdir(folder) else []
+
+    # ---------- 内部实现 ----------
+
+    def _append_snapshot(self, kind, df, ts):
+        ts = ts or datetime.now()
+        folder = os.path.join(self.root, kind, f"date={ts:%Y%m%d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{ts:%H%M%S%f}{self.ext}")
+        self._write(df.reset_index(drop=True), path)
+        return path
+
+    def _snapshot_at(self, kind, t):
+        if t is None:
+            times = self.snapshot_times(kind)
+        else:
+            t = pd.Timestamp(t).to_pydatetime()
+            times = self.snapshot_times(kind, t.date())
+            times = times[:bisect.bisect_right(times, t)]
+            if not times:
+                # 当天 t 之前没有快照，退回到更早一天的最后一份
+                earlier = [d for d in self.dates(kind) if d < t.strftime('%Y%m%d')]
+                times = self.snapshot_times(kind, earlier[-1]) if earlier else []
+        if not times:
+            return None
+        ts = times[-1]
+        path = os.path.join(self.root, kind, f"date={ts:%Y%m%d}", f"{ts:%H%M%S%f}{self.ext}")
+        df = self._read(path)
+        df.attrs['snapshot_time'] = ts
+        return df
+
+    def _latest_date(self, kind):
+        dates = self.dates(kind)
+        return dates[-1] if dates else None
+
+    def _bar_path(self, date, symbol):
+        folder = os.path.join(self.root, 'minute', f"date={_date_str(date)}")
+        return os.path.join(folder, f"symbol={symbol}{self.ext}")
+
+    def _table_path(self, name):
+        return os.path.join(self.root, 'table', f"{name}{self.ext}")
+
+    def _write(self, df, path):
+        # 每次写入使用同目录下唯一的临时文件，并发写同一目标时不会互相覆盖临时文件，替换是原子的
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix='.tmp')
+        os.close(fd)
+        try:
+            os.chmod(tmp, 0o644)  # mkstemp 创建的文件只有属主可读
+            if self.fmt == 'parquet':
+                df.to_parquet(tmp, index=False)
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _read(self, path):
+        if self.fmt == 'parquet':
+            return pd.read_parquet(path, memory_map=True)
+        return pd.read_pickle(path)
+
+
+def normalize_bars(df):
+    """把 ak.stock_zh_a_minute 返回的字符串列转换为时间与数值类型"""
+    bars = df.copy()
+    bars['day'] = pd.to_datetime(bars['day'])
+    for col in BAR_NUMERIC_COLUMNS:
+        if col in bars.columns:
+            bars[col] = pd.to_numeric(bars[col], errors='coerce')
+    return bars
+
+
+def _date_str(date):
+    if isinstance(date, str):
+        return date.replace('-', '')
+    return date.strftime('%Y%m%d')
+
+
+def _partition_dates(folder):
+    return [n[len('date='):] for n in os.listdir(folder) if n.startswith('date=')]
+
+
+# 进程内默认存储；设置环境变量 STOCK_DATA_DIR 后，每次从网络获取的新数据都会追加保存
+default_store = SnapshotStore(os.environ['STOCK_DATA_DIR']) if os.environ.get('STOCK_DATA_DIR') else None
+
+
+def record(kind, df, symbol=None):
+    """把新获取的数据追加到默认存储（未配置时不做任何事），失败不影响主流程"""
+    if default_store is None or df is None or df.empty:
+        return
+    try:
+        if kind == 'spot':
+            default_store.append_spot(df)
+        elif kind == 'sector':
+            default_store.append_sectors(df)
+        elif kind == 'minute':
+            default_store.append_bars(symbol, df)
+        elif kind == 'index_daily':
+            default_store.write_table(f"index_daily_{symbol}", df)
+    except Exception as e:
+        print(f"保存{kind}数据失败: {e}")
@@ -0,0 +1,279 @@
+"""
+命令行入口
+    python py/stock.py sentiment                     市场概况、热门/潜力板块与情绪得分
+    python py/stock.py sentiment --history           多个指数的历史情绪序列
+    python py/stock.py signals sh600519 sz000001     分时交易信号（--period 5 用5分钟K线，--last 只保留最近N条）
+    python py/stock.py predict sh600519              支撑/压力位与买卖点预测
+    python py/stock.py screen --top 20               全市场横截面选股
+    python py/stock.py reports --days 30             近30日情绪得分（--signals --sector 半导体 --signal 买入 --strength 强 查询信号）
+sentiment/signals 加 --save 时把结果追加到报告数据库（report_store.py）
+--format text/json/csv 选择输出格式（json/csv 便于脚本处理），分析过程中的提示信息输出到 stderr。
+启动时只导入标准库：pandas 与分析模块在命令执行时才导入，akshare 只在确实需要联网时才导入。
+设置 --data-dir（或环境变量 STOCK_DATA_DIR）后优先使用快照存储中足够新的数据；
+磁盘缓存目录为 --cache-dir（或 STOCK_CACHE_DIR，缺省 ~/.cache/stock），同一时段内重复查询直接命中缓存；
+--offline 只使用快照存储中的数据，不发起任何网络请求；
+交易日历保存在磁盘缓存目录中，只有确实需要联网获取数据时才会更新
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+
+FORMATS = ('text', 'json', 'csv')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='stock', description='A股分析工具')
+    parser.add_argument('--format', choices=FORMATS, default='text', help='输出格式（默认 text）')
+    parser.add_argument('--data-dir', help='快照存储目录（默认取环境变量 STOCK_DATA_DIR）')
+    parser.add_argument('--cache-dir', help='磁盘缓存目录（默认取环境变量 STOCK_CACHE_DIR，未设置时为 ~/.cache/stock）')
+    parser.add_argument('--offline', action='store_true', help='只使用快照存储中的数据，不联网')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('sentiment', help='市场情绪')
+    p.add_argument('--history', action='store_true', help='输出历史情绪序列')
+    p.add_argument('--symbols', nargs='+', help='历史情绪使用的指数代码（默认上证、深成、创业板、沪深300）')
+    p.add_argument('--start', help='历史情绪起始日期，如 2024-01-01')
+    p.add_argument('--end', help='历史情绪结束日期')
+    p.add_argument('--save', action='store_true', help='把本次报告追加到报告数据库')
+    p.set_defaults(func=cmd_sentiment)
+
+    p = sub.add_parser('signals', help='分时交易信号')
+    p.add_argument('codes', nargs='+', help='股票代码，如 sh600519')
+    p.add_argument('--period', type=int, default=1, help='K线周期（1/5/15/30/60 分钟）')
+    p.add_argument('--last', type=int, default=0, help='每只股票只保留最近N条信号（0 为全部）')
+    p.add_argument('--save', action='store_true', help='把信号追加到报告数据库')
+    p.set_defaults(func=cmd_signals)
+
+    p = sub.add_parser('predict', help='买卖点位预测')
+    p.add_argument('codes', nargs='+', help='股票代码，如 sh600519')
+    p.add_argument('--period', type=int, default=1, help='K线周期（1/5/15/30/60 分钟）')
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser('screen', help='全市场横截面选股')
+    p.add_argument('--top', type=int, default=20, help='输出前N名')
+    p.set_defaults(func=cmd_screen)
+
+    p = sub.add_parser('reports', help='查询报告数据库')
+    p.add_argument('--days', type=int, default=30, help='最近N天（默认30）')
+    p.add_argument('--all-runs', action='store_true', help='情绪得分保留每一次运行（默认每天只取最后一次）')
+    p.add_argument('--signals', action='store_true', help='查询交易信号而不是情绪得分')
+    p.add_argument('--symbol', help='只看某只股票的信号')
+    p.add_argument('--sector', help='只看某个行业板块的信号')
+    p.add_argument('--signal', choices=('买入', '卖出'), help='信号类型')
+    p.add_argument('--strength', help='信号强度，如 强')
+    p.add_argument('--week', action='store_true', help='只看本周（周一起）的信号，代替 --days')
+    p.add_argument('--db', help='报告数据库路径（默认见 report_store.default_report_path）')
+    p.set_defaults(func=cmd_reports, local=True)  # 只读报告数据库，不需要数据源
+    return parser
+
+
+def configure(args):
+    """在导入分析模块之前设置环境变量：默认快照存储与磁盘缓存在模块导入时创建"""
+    if args.data_dir:
+        os.environ['STOCK_DATA_DIR'] = args.data_dir
+    if args.cache_dir:
+        os.environ['STOCK_CACHE_DIR'] = args.cache_dir
+    os.environ.setdefault('STOCK_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'stock'))
+
+
+def make_provider(args):
+    """有快照存储时本地优先（--offline 时只回放存储），否则为默认数据源"""
+    try:
+        from .data_provider import ReplayProvider, StoreFirstProvider, get_default_provider
+        from .snapshot_store import default_store
+    except ImportError:  # 直接以脚本方式运行
+        from data_provider import ReplayProvider, StoreFirstProvider, get_default_provider
+        from snapshot_store import default_store
+
+    if default_store is None:
+        if args.offline:
+            raise SystemExit("--offline 需要快照存储：请设置 --data-dir 或 STOCK_DATA_DIR")
+        return get_default_provider()
+    if args.offline:
+        from datetime import datetime
+        return ReplayProvider(default_store, start=datetime.now(), speed=0)
+    return StoreFirstProvider(default_store)
+
+
+# ---------- 子命令：返回 dict、dict 列表或 DataFrame，没有结果时返回 None ----------
+
+def cmd_sentiment(args, provider):
+    try:
+        from .trade_sentiment import AsyncMarketSentiment, MarketSentiment
+    except ImportError:  # 直接以脚本方式运行
+        from trade_sentiment import AsyncMarketSentiment, MarketSentiment
+
+    if args.history:
+        table = MarketSentiment(provider).get_sentiment_history(args.symbols, args.start, args.end)
+        return table.reset_index() if not table.empty else None
+
+    import asyncio
+
+    # 三个数据源并发获取，命令结束时关闭线程池
+    with AsyncMarketSentiment(provider) as analyzer:
+        sources = asyncio.run(analyzer.fetch_sources())
+        market = analyzer.summarize_market(sources['market'])
+        sectors = analyzer.summarize_sectors(sources['sector'])
+        score = analyzer.score_sentiment(sources['index'])
+        suggestion = analyzer.get_investment_suggestion(score)
+        if args.save:
+            analyzer.save_report(market, sectors, score, suggestion)
+    return {
+        'time': f"{provider.now() if hasattr(provider, 'now') else _now():%Y-%m-%d %H:%M:%S}",
+        **{k: _plain(v) for k, v in market.items()},
+        'sentiment_score': round(score, 2),
+        'suggestion': suggestion,
+        'hot_sectors': '、'.join(sectors['hot_sectors']['板块名称'].astype(str)),
+        'potential_sectors': '、'.join(sectors['potential_sectors']['板块名称'].astype(str)),
+    }
+
+
+def cmd_signals(args, provider):
+    try:
+        from . import minute
+    except ImportError:  # 直接以脚本方式运行
+        import minute
+    import pandas as pd
+
+    store = _report_store(args) if args.save else None
+    frames = []
+    for code in args.codes:
+        df = minute.build_indicator_frame(code, provider, args.period)
+        signals = minute.analyze_trading_signals(code, df=df) if df is not None else None
+        if signals is None or signals.empty:
+            continue
+        if store is not None:
+            try:
+                store.add_signals(code, signals, minute.signal_times(signals, df), period=args.period)
+            except ValueError as e:  # 数据没有K线时间
+                print(f"保存交易信号失败: {e}")
+        if args.last:
+            signals = signals.tail(args.last)
+        signals = signals.reset_index(drop=True)
+        signals.insert(0, 'symbol', code)
+        # time 为指标表中的行号，补上对应的K线时间
+        signals.insert(1, 'day', minute.signal_times(signals, df))
+        frames.append(signals)
+    if store is not None:
+        store.close()
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def cmd_predict(args, provider):
+    try:
+        from . import minute
+    except ImportError:  # 直接以脚本方式运行
+        import minute
+
+    rows = []
+    for code in args.codes:
+        result = minute.predict_price_points(code, provider=provider, period=args.period)
+        if not result:
+            continue
+        for pred in result['predictions']:
+            rows.append({
+                'symbol': code,
+                'current_price': round(float(result['current_price']), 2),
+                'type': pred['type'],
+                'price': pred['price'],
+                'confidence': pred['confidence'],
+                'expected': pred.get('expected_bounce') or pred.get('expected_drop'),
+                'reasons': '，'.join(pred['reasons']),
+            })
+    return rows or None
+
+
+def cmd_screen(args, provider):
+    try:
+        from .trade_sentiment import MarketSentiment
+    except ImportError:  # 直接以脚本方式运行
+        from trade_sentiment import MarketSentiment
+
+    table = MarketSentiment(provider).screen_market(top=args.top)
+    return table.reset_index() if not table.empty else None
+
+
+def cmd_reports(args, provider):
+    try:
+        from .report_store import week_start
+    except ImportError:  # 直接以脚本方式运行
+        from report_store import week_start
+    from datetime import datetime, timedelta
+
+    with _report_store(args) as store:
+        if not args.signals:
+            table = store.sentiment_scores(days=args.days, daily=not args.all_runs)
+        else:
+            start = week_start() if args.week else datetime.now() - timedelta(days=args.days)
+            table = store.signals(start=start, symbol=args.symbol, sector=args.sector,
+                                  signal=args.signal, strength=args.strength)
+    return table if not table.empty else None
+
+
+def _report_store(args):
+    try:
+        from .report_store import ReportStore
+    except ImportError:  # 直接以脚本方式运行
+        from report_store import ReportStore
+    return ReportStore(getattr(args, 'db', None))
+
+
+# ---------- 输出 ----------
+
+def _now():
+    from datetime import datetime
+    return datetime.now()
+
+
+def _plain(value):
+    """numpy 标量转为 Python 数值，便于 JSON 序列化"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def emit(result, fmt, out=sys.stdout):
+    if hasattr(result, 'to_csv'):  # DataFrame
+        if fmt == 'json':
+            out.write(result.to_json(orient='records', force_ascii=False, date_format='iso'))
+            out.write('\n')
+        elif fmt == 'csv':
+            result.to_csv(out, index=False)
+        else:
+            out.write(result.to_string(index=False))
+            out.write('\n')
+        return
+
+    rows = [result] if isinstance(result, dict) else result
+    if fmt == 'json':
+        out.write(json.dumps(result, ensure_ascii=False, default=str))
+        out.write('\n')
+    elif fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for i, row in enumerate(rows):
+            if i:
+                out.write('\n')
+            for key, value in row.items():
+                out.write(f"{key}: {value}\n")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure(args)
+    # 分析过程中的提示与错误信息写到 stderr，stdout 只保留结果，便于管道处理
+    with contextlib.redirect_stdout(sys.stderr):
+        provider = None if getattr(args, 'local', False) else make_provider(args)
+        result = args.func(args, provider)
+    if result is None:
+        print("没有结果", file=sys.stderr)
+        return 1
+    emit(result, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
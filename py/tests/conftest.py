@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 分析模块以脚本方式互相导入（import minute），测试时把 py 目录加入搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,20 @@
+"""股票代码的交易所前缀"""
+import pytest
+
+from sector_members import plain_code, prefixed_code
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('600519', 'sh600519'),
+    ('688981', 'sh688981'),
+    ('900901', 'sh900901'),  # 沪市B股
+    ('000001', 'sz000001'),
+    ('300750', 'sz300750'),
+    ('430047', 'bj430047'),
+    ('830799', 'bj830799'),
+    ('920118', 'bj920118'),  # 北交所新代码段
+    ('sh600519', 'sh600519'),
+])
+def test_prefixed_code(code, expected):
+    assert prefixed_code(code) == expected
+    assert plain_code(prefixed_code(code)) == plain_code(code)
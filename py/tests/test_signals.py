@@ -0,0 +1,64 @@
+"""列式信号引擎与流式指标相对逐行基线实现的一致性"""
+import pandas as pd
+import pytest
+
+import benchmark
+import minute
+from intraday_stream import IntradayStream
+
+SEEDS = range(30)
+
+
+def _bars(seed, n=600):
+    # 偶数种子加入价格脉冲，覆盖强势获利卖点规则
+    return benchmark.make_minute_bars(n, seed=seed, spike_rate=0.0 if seed % 2 else 0.08)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_vectorized_matches_legacy(seed):
+    bars = _bars(seed)
+    expected = benchmark.legacy_signals(bars.copy())
+    actual = benchmark.vectorized_signals(bars.copy())
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_stream_matches_batch(seed):
+    bars = _bars(seed)
+    expected = minute.detect_signals(minute.add_indicators(bars.copy()))
+    stream = IntradayStream('test')
+    stream.update_frame(bars)
+    actual = stream.signals_frame()
+    if expected.empty:
+        assert actual.empty
+    else:
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_stream_incremental_matches_single_pass():
+    bars = _bars(3)
+    whole = IntradayStream()
+    whole.update_frame(bars)
+    chunked = IntradayStream()
+    for start in range(0, len(bars), 37):
+        chunked.update_frame(bars.iloc[start:start + 37])
+    pd.testing.assert_frame_equal(chunked.signals_frame(), whole.signals_frame())
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_stream_recovers_after_nan_bars(seed):
+    # 个别K线收盘价为 '--'、成交量缺失，或连续多根缺失，NaN 移出窗口后指标与信号应与批量计算一致
+    bars = _bars(seed)
+    bars.loc[100, 'close'] = '--'
+    bars.loc[200:203, 'close'] = None
+    bars.loc[300, 'volume'] = None
+    expected = minute.add_indicators(bars.copy())
+    stream = IntradayStream('test')
+    stream.update_frame(bars)
+    actual = stream.signals_frame()
+    expected_signals = minute.detect_signals(expected)
+    assert len(expected_signals) > 0
+    pd.testing.assert_frame_equal(actual, expected_signals, check_dtype=False)
+    latest = stream.latest
+    for key in ('ma10', 'ma30', 'std20', 'volume_ma10', 'MACD', 'SIGNAL'):
+        assert latest[key] == pytest.approx(expected[key].iloc[-1], rel=1e-9)
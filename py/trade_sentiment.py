@@ -1,168 +1,212 @@
-import akshare as ak
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
-import os
-import time
-from datetime import datetime, timedelta
+from datetime import datetime
+
+try:
+    from .data_provider import get_default_provider
+    from .instrumentation import metrics
+    from .market_breadth import BreadthTracker
+    from .market_frame import MarketFrame, SymbolIndex
+    from .screener import DailyHistory, screen, screen_and_scan
+    from .report_store import ReportStore
+    from .sector_members import SectorMembership, scan_top_sectors
+    from .sentiment_history import INDEX_SYMBOLS, IndexHistory, breadth_history, sentiment_components
+    from .snapshot_store import default_store
+    from .sector_rotation import SectorRotation, clean_sectors
+except ImportError:  # 直接以脚本方式运行
+    from data_provider import get_default_provider
+    from instrumentation import metrics
+    from market_breadth import BreadthTracker
+    from market_frame import MarketFrame, SymbolIndex
+    from screener import DailyHistory, screen, screen_and_scan
+    from report_store import ReportStore
+    from sector_members import SectorMembership, scan_top_sectors
+    from sentiment_history import INDEX_SYMBOLS, IndexHistory, breadth_history, sentiment_components
+    from snapshot_store import default_store
+    from sector_rotation import SectorRotation, clean_sectors
 
 class MarketSentiment:
-    def __init__(self):
+    def __init__(self, provider=None):
+        # 数据源，默认为实时 akshare 数据源（带缓存）；可传入 ReplayProvider 离线回放
+        self.provider = provider or get_default_provider()
         self.sentiment_score = 0
         self.hot_sectors = []
         self.potential_sectors = []
         self.market_status = ""
-        self.dfMarket = None
+        # 最新一份全市场行情（紧凑表示），股票下标在多次刷新之间保持不变
+        self.symbol_index = SymbolIndex()
+        self.market_frame = None
+        # 盘中市场宽度序列，每次获取全市场行情时增量更新（breadth.frame() 取得 DataFrame）
+        self.breadth = BreadthTracker(self.symbol_index)
+        # 行业板块快照序列，用于查询轮动（如最近30分钟新进入前10的板块）
+        self.sector_rotation = SectorRotation(k=10)
+        # 股票 -> 行业板块映射，首次使用时加载（每个交易日获取一次）
+        self.sector_membership = None
+        # 指数日线只完整下载一次，之后只补齐新交易日
+        self.index_history = IndexHistory(self.provider)
+        # 分析报告与交易信号的本地数据库，首次保存时打开
+        self.report_store = None
+
+    @property
+    def dfMarket(self):
+        """最新全市场行情的 DataFrame 视图（按需由 market_frame 还原）"""
+        return self.market_frame.to_frame() if self.market_frame is not None else None
+
+    @dfMarket.setter
+    def dfMarket(self, df):
+        self.market_frame = MarketFrame.from_spot(df, self.symbol_index) if df is not None and not df.empty else None
 
     def get_market_overview(self):
         try:
             # 获取A股市场实时行情
-            def get_market_data():
-                # 简化版：获取最近的工作日
-                def get_latest_workday():
-                    today = datetime.now()
-                    # 如果今天是工作日且在交易时间内，使用今天
-                    if today.weekday() < 5:  # 周一到周五
-                        return today.strftime("%Y%m%d")
-                    
-                    # 否则找最近的周五
-                    days_back = today.weekday() - 4  # 距离周五的天数
-                    if days_back < 0:
-                        days_back += 7
-                    workday = today - timedelta(days=days_back)
-                    return workday.strftime("%Y%m%d")
-                
-                latest_workday = get_latest_workday()
-                cache_file = "market_report_{}.csv".format(latest_workday)
-                
-                if os.path.exists(cache_file):
-                    # 检查文件修改时间，如果在1分钟内，直接使用缓存
-                    file_mtime = os.path.getmtime(cache_file)
-                    if time.time() - file_mtime < 60:  # 60秒内的缓存有效
-                        return pd.read_csv(cache_file)
-
-                # 获取新数据并缓存
-                df = ak.stock_zh_a_spot()
-                df.to_csv(cache_file, index=False)
-                self.dfMarket = df
-                return df
-
-
-            df_market = get_market_data()
+            df_market = self.provider.stock_zh_a_spot()
+        except Exception as e:
+            print(f"获取市场概况失败: {e}")
+            self.market_frame = None
+            return _empty_overview()
+        return self.summarize_market(df_market)
 
+    @metrics.timed('sentiment.market_overview')
+    def summarize_market(self, df_market):
+        """由全市场行情计算涨跌家数、成交额等概况"""
+        try:
+            self.market_frame = None
             if df_market is None or df_market.empty:
                 raise ValueError("未获取到市场数据")
+            metrics.count('rows_processed', len(df_market), stage='sentiment.market_overview')
 
-            # 计算涨跌家数
-            up_count = len(df_market[df_market['涨跌幅'] > 0])
-            down_count = len(df_market[df_market['涨跌幅'] < 0])
-            up_down_ratio = up_count / (down_count if down_count > 0 else 1)
-
-            # 计算总成交额和平均涨跌幅
-            total_amount = df_market['成交额'].sum() / 100000000  # 转化为亿元
-            avg_change = df_market['涨跌幅'].mean()
-
-            return {
-                'up_count': up_count,
-                'down_count': down_count,
-                'up_down_ratio': up_down_ratio,
-                'total_amount': total_amount,
-                'avg_change': avg_change
-            }
+            # 转为紧凑表示后直接在数组上统计涨跌家数、总成交额和平均涨跌幅
+            self.market_frame = MarketFrame.from_spot(df_market, self.symbol_index)
+            self.breadth.update(self.market_frame)
+            return self.market_frame.overview()
         except Exception as e:
             print(f"获取市场概况失败: {e}")
-            return {
-                'up_count': 0,
-                'down_count': 0,
-                'up_down_ratio': 1,
-                'total_amount': 0,
-                'avg_change': 0
-            }
+            return _empty_overview()
 
     def get_sector_analysis(self):
         """获取板块分析"""
+        # 尝试获取行业板块数据
         try:
-            df_sectors = None
-            error_msg = ""
-
-            # 尝试获取行业板块数据
-            try:
-                df_sectors = ak.stock_board_industry_name_em()
-                if not df_sectors.empty:
-                    # 标准化列名
-                    df_sectors.columns = [str(col).strip() for col in df_sectors.columns]
-                    column_mapping = {
-                        '行业': '板块名称',
-                        '名称': '板块名称',
-                        '涨跌额': '变动金额',  # 使用涨跌额替代成交额
-                        '涨跌幅': '涨跌幅',
-                        '涨跌幅(%)': '涨跌幅'
-                    }
-                    df_sectors = df_sectors.rename(columns=column_mapping)
-
-            except Exception as e:
-                error_msg = f"行业板块接口失败: {str(e)}"
-                print(error_msg)
-                return {
-                    'hot_sectors': pd.DataFrame(columns=['板块名称', '涨跌幅', '变动金额']),
-                    'potential_sectors': pd.DataFrame(columns=['板块名称', '涨跌幅', '变动金额'])
-                }
+            df_sectors = self.provider.stock_board_industry_name_em()
+        except Exception as e:
+            print(f"行业板块接口失败: {str(e)}")
+            return _empty_sectors()
+        return self.summarize_sectors(df_sectors)
 
+    @metrics.timed('sentiment.sector_clean')
+    def summarize_sectors(self, df_sectors):
+        """清洗行业板块行情，选出热门板块与潜力板块"""
+        try:
             if df_sectors is None or df_sectors.empty:
-                raise ValueError(f"获取板块数据失败: {error_msg}")
-
-            # 确保必要列存在
-            required_columns = ['板块名称', '涨跌幅', '变动金额']
-            for col in required_columns:
-                if col not in df_sectors.columns:
-                    raise ValueError(f"数据缺少必要列：{col}")
-
-            # 数据清理和转换
-            # 处理涨跌幅数据
-            df_sectors['涨跌幅'] = pd.to_numeric(
-                df_sectors['涨跌幅'].astype(str).str.replace('%', '').str.replace('+', ''), 
-                errors='coerce'
-            )
-
-            # 处理涨跌额数据
-            df_sectors['变动金额'] = pd.to_numeric(
-                df_sectors['变动金额'].astype(str).str.replace(',', ''), 
-                errors='coerce'
-            )
-
-            # 清理数据
-            df_sectors = df_sectors.fillna(0)
-            df_sectors['涨跌幅'] = df_sectors['涨跌幅'].astype(float)
-            df_sectors['变动金额'] = df_sectors['变动金额'].astype(float)
-
-            # 获取前5个涨幅最大的板块
-            hot_sectors = df_sectors.sort_values('涨跌幅', ascending=False).head(10)
-
-            # 获取资金流入且涨幅较小的潜力板块
-            # 计算综合得分：资金流入量为主要考虑因素，涨幅接近0为次要考虑因素
-            df_sectors['potential_score'] = df_sectors['变动金额'] - abs(df_sectors['涨跌幅']) * 100
-            # 只考虑资金净流入的板块
-            potential_sectors = df_sectors[df_sectors['变动金额'] > 0].sort_values(by='potential_score', ascending=False).head(10)
-
-            # 确保返回的DataFrame包含所需的所有列
-            result_columns = ['板块名称', '涨跌幅', '变动金额']
-            hot_sectors = hot_sectors.reindex(columns=result_columns)
-            potential_sectors = potential_sectors.reindex(columns=result_columns)
+                raise ValueError("获取板块数据失败")
+            metrics.count('rows_processed', len(df_sectors), stage='sentiment.sector_clean')
 
-            return {
-                'hot_sectors': hot_sectors,
-                'potential_sectors': potential_sectors
-            }
+            # 清洗后交给板块轮动跟踪器：热门/潜力板块用部分选择取前10，并记录本次快照
+            return self.sector_rotation.update(clean_sectors(df_sectors))
         except Exception as e:
             print(f"获取板块分析失败: {e}")
-            empty_df = pd.DataFrame(columns=['板块名称', '涨跌幅', '变动金额'])
-            return {
-                'hot_sectors': empty_df,
-                'potential_sectors': empty_df
-            }
+            return _empty_sectors()
+
+    def _reports(self):
+        if self.report_store is None:
+            self.report_store = ReportStore()
+        return self.report_store
+
+    def _membership(self):
+        if self.sector_membership is None:
+            self.sector_membership = SectorMembership(self.provider)
+        return self.sector_membership.load()
+
+    @metrics.timed('sentiment.sector_breakdown')
+    def get_sector_breakdown(self):
+        """用最新全市场行情按行业板块汇总涨跌家数、成交额集中度与领涨/领跌股"""
+        if self.market_frame is None:
+            self.get_market_overview()
+        try:
+            if self.market_frame is None:
+                raise ValueError("没有全市场行情")
+            return self._membership().sector_stats(self.market_frame)
+        except Exception as e:
+            print(f"板块成分股汇总失败: {e}")
+            return pd.DataFrame()
+
+    def scan_sector_constituents(self, top=3, per_sector=10, **scan_kwargs):
+        """对最近一次板块分析中前 top 个热门/潜力板块的成分股批量运行分时信号分析"""
+        if not len(self.sector_rotation):
+            self.get_sector_analysis()
+        sectors = {
+            'hot_sectors': pd.DataFrame({'板块名称': self.sector_rotation.hot()}),
+            'potential_sectors': pd.DataFrame({'板块名称': self.sector_rotation.potential()}),
+        }
+        scan_kwargs.setdefault('provider', self.provider)
+        scan_kwargs.setdefault('report_store', self._reports())
+        try:
+            return scan_top_sectors(self._membership(), sectors, self.market_frame,
+                                    top=top, per_sector=per_sector, **scan_kwargs)
+        except Exception as e:
+            print(f"板块成分股扫描失败: {e}")
+            return pd.DataFrame()
+
+    def screen_market(self, top=50, scan=False, history_days=20, **scan_kwargs):
+        """
+        横截面选股：用最新全市场行情（以及快照存储中的近 history_days 日收盘快照）一次性给全部股票打分，
+        返回前 top 名；scan=True 时再对这些股票批量运行分时信号分析
+        """
+        if self.market_frame is None:
+            self.get_market_overview()
+        if self.market_frame is None:
+            return pd.DataFrame()
+        try:
+            membership = self._membership()
+        except Exception as e:
+            print(f"板块成分股不可用，按全市场均值计算相对涨幅: {e}")
+            membership = None
+        history = None
+        if default_store is not None and history_days:
+            try:
+                history = DailyHistory.from_store(default_store, self.symbol_index, days=history_days)
+            except Exception as e:
+                print(f"读取历史快照失败: {e}")
+        try:
+            if scan:
+                scan_kwargs.setdefault('provider', self.provider)
+                scan_kwargs.setdefault('report_store', self._reports())
+                return screen_and_scan(self.market_frame, membership, history, top=top, **scan_kwargs)
+            return screen(self.market_frame, membership, history, top=top)
+        except Exception as e:
+            print(f"全市场选股失败: {e}")
+            return pd.DataFrame()
+
+    def get_sentiment_history(self, symbols=None, start=None, end=None):
+        """
+        多个指数的历史情绪序列（以 (symbol, date) 为索引），涨跌家数得分取自快照存储中每日收盘快照，
+        没有快照存储的日期该项为 0
+        """
+        try:
+            advance_ratio = breadth_history(default_store) if default_store is not None else None
+            return self.index_history.sentiment(symbols or INDEX_SYMBOLS, advance_ratio, start, end)
+        except Exception as e:
+            print(f"计算历史情绪失败: {e}")
+            return pd.DataFrame()
 
     def get_market_sentiment(self):
+        """获取上证指数日线并计算市场情绪分数"""
+        try:
+            df_index = self.index_history.update("sh000001")  # 获取上证指数（增量补齐）
+        except Exception as e:
+            print(f"[错误] 计算市场情绪失败: {e}")
+            return 50.0
+        return self.score_sentiment(df_index)
+
+    @metrics.timed('sentiment.index_score')
+    def score_sentiment(self, df_index):
         """
-        计算市场情绪分数
+        由指数日线与全市场涨跌家数（self.market_frame）计算市场情绪分数
         返回值范围：0到100，数值越大表示市场情绪越乐观
         0-20: 极度悲观
         20-40: 偏悲观
@@ -171,29 +215,17 @@ class MarketSentiment:
         80-100: 极度乐观
         """
         try:
-            # 获取大盘指数数据
-            df_index = ak.stock_zh_index_daily_em(symbol="sh000001")  # 获取上证指数
-            if df_index is None or df_index.empty:
+            if df_index is None or len(df_index) < 2:
                 raise ValueError("未获取到指数数据")
 
-            # 计算最近的涨跌幅
-            latest_day = df_index.iloc[-1]
-            prev_day = df_index.iloc[-2]
-
-            # 1. 计算涨跌幅得分 (权重40%)
-            change_pct = (latest_day['close'] - prev_day['close']) / prev_day['close'] * 100
-            # 将涨跌幅从-10%~10%映射到0-40分
-            change_score = min(max((change_pct + 10) * 2, 0), 40)
-
-            # 2. 计算成交量变化得分 (权重30%)
-            volume_ratio = latest_day['volume'] / prev_day['volume']
-            # 将成交量比从0.5~1.5映射到0-30分
-            volume_score = min(max((volume_ratio - 0.5) * 30, 0), 30)
+            # 1. 涨跌幅得分 (权重40%) 与 2. 成交量变化得分 (权重30%)，与历史情绪序列使用同一套公式
+            latest = sentiment_components(df_index.iloc[-2:]).iloc[-1]
+            change_score = latest['change_score']
+            volume_score = latest['volume_score']
 
             # 3. 计算涨跌家数比例得分 (权重30%)
             try:
-                up_count = len(self.dfMarket[self.dfMarket['涨跌幅'] > 0])
-                down_count = len(self.dfMarket[self.dfMarket['涨跌幅'] < 0])
+                up_count, down_count = self.market_frame.breadth()
                 total = up_count + down_count
                 if total > 0:
                     # 将涨跌比从0~1映射到0-30分
@@ -208,9 +240,13 @@ class MarketSentiment:
             # 综合计算最终情绪分数
             final_score = change_score + volume_score + breadth_score
 
-            # 输出调试信息
-            print(f"[市场情绪] 涨跌得分: {change_score:.1f}, 成交量得分: {volume_score:.1f}, 市场宽度得分: {breadth_score:.1f}")
-            print(f"[市场情绪] 最终得分: {final_score:.1f}/100")
+            # 记录各分项得分
+            metrics.gauge('sentiment_component', float(change_score), part='change')
+            metrics.gauge('sentiment_component', float(volume_score), part='volume')
+            metrics.gauge('sentiment_component', float(breadth_score), part='breadth')
+            metrics.gauge('sentiment_score', float(final_score))
+            metrics.event('sentiment_score', change=float(change_score), volume=float(volume_score),
+                          breadth=float(breadth_score), score=float(final_score))
 
             return float(final_score)
 
@@ -253,6 +289,7 @@ class MarketSentiment:
         else:
             return "1星 - 市场情绪低迷，建议观望"
 
+    @metrics.timed('sentiment.analyze_market')
     def analyze_market(self):
         """分析市场状况并输出结果"""
         try:
@@ -261,71 +298,176 @@ class MarketSentiment:
 
             # 1. 获取市场数据
             market_data = self.get_market_overview()
-            print("\n市场概况:")
-            print(f"上涨家数: {market_data['up_count']}")
-            print(f"下跌家数: {market_data['down_count']}")
-            print(f"涨跌比: {market_data['up_down_ratio']:.2f}")
-            print(f"总成交额: {market_data['total_amount']:.2f}亿")
-            print(f"平均涨跌幅: {market_data['avg_change']:.2f}%")
+            self._print_market(market_data)
 
             # 2. 获取板块分析
             sector_data = self.get_sector_analysis()
-            if not sector_data['hot_sectors'].empty:
-                print("\n热门板块:")
-                hot_sectors_display = sector_data['hot_sectors'][['板块名称', '涨跌幅', '变动金额']]
-                hot_sectors_display['涨跌幅'] = hot_sectors_display['涨跌幅'].apply(lambda x: f"{x:.2f}%")
-                hot_sectors_display['变动金额'] = hot_sectors_display['变动金额'].apply(lambda x: f"{x:.2f}")
-                print(hot_sectors_display.to_string(index=False))
-
-                print("\n潜力板块:")
-                potential_sectors_display = sector_data['potential_sectors'][['板块名称', '涨跌幅', '变动金额']]
-                potential_sectors_display['涨跌幅'] = potential_sectors_display['涨跌幅'].apply(lambda x: f"{x:.2f}%")
-                potential_sectors_display['变动金额'] = potential_sectors_display['变动金额'].apply(lambda x: f"{x:.2f}")
-                print(potential_sectors_display.to_string(index=False))
-
-            # 4. 计算市场情绪
-            sentiment_score = self.get_market_sentiment()
-            print(f"\n市场情绪得分: {sentiment_score:.2f}/100")
-
-            # 5. 生成投资建议
-            suggestion = self.get_investment_suggestion(sentiment_score)
-            print(f"投资建议: {suggestion}")
+            self._print_sectors(sector_data)
 
-            # 6. 保存分析报告
-            report_saved = self.save_report(market_data, sector_data, sentiment_score, suggestion)
-            print(f"\n分析报告已保存至: {report_saved}")
+            # 3. 计算市场情绪、生成投资建议并保存报告
+            sentiment_score = self.get_market_sentiment()
+            self._finish_report(market_data, sector_data, sentiment_score)
 
         except Exception as e:
             print(f"市场分析执行出现错误: {e}")
             print("请检查网络连接并重试，或查看详细错误信息")
 
+    def _print_market(self, market_data):
+        print("\n市场概况:")
+        print(f"上涨家数: {market_data['up_count']}")
+        print(f"下跌家数: {market_data['down_count']}")
+        print(f"涨跌比: {market_data['up_down_ratio']:.2f}")
+        print(f"总成交额: {market_data['total_amount']:.2f}亿")
+        print(f"平均涨跌幅: {market_data['avg_change']:.2f}%")
+
+    def _print_sectors(self, sector_data):
+        if not sector_data['hot_sectors'].empty:
+            print("\n热门板块:")
+            hot_sectors_display = sector_data['hot_sectors'][['板块名称', '涨跌幅', '变动金额']]
+            hot_sectors_display['涨跌幅'] = hot_sectors_display['涨跌幅'].apply(lambda x: f"{x:.2f}%")
+            hot_sectors_display['变动金额'] = hot_sectors_display['变动金额'].apply(lambda x: f"{x:.2f}")
+            print(hot_sectors_display.to_string(index=False))
+
+            print("\n潜力板块:")
+            potential_sectors_display = sector_data['potential_sectors'][['板块名称', '涨跌幅', '变动金额']]
+            potential_sectors_display['涨跌幅'] = potential_sectors_display['涨跌幅'].apply(lambda x: f"{x:.2f}%")
+            potential_sectors_display['变动金额'] = potential_sectors_display['变动金额'].apply(lambda x: f"{x:.2f}")
+            print(potential_sectors_display.to_string(index=False))
+
+    def _finish_report(self, market_data, sector_data, sentiment_score):
+        """输出情绪得分与投资建议并保存报告，返回投资建议"""
+        print(f"\n市场情绪得分: {sentiment_score:.2f}/100")
+
+        # 生成投资建议
+        suggestion = self.get_investment_suggestion(sentiment_score)
+        print(f"投资建议: {suggestion}")
+
+        # 保存分析报告
+        self.save_report(market_data, sector_data, sentiment_score, suggestion)
+        return suggestion
+
+    @metrics.timed('sentiment.save_report')
     def save_report(self, market_data, sector_data, sentiment_score, suggestion):
-        """保存分析报告到CSV文件"""
+        """
+        把分析报告（含全部热门/潜力板块）追加到本地报告数据库，每次运行保留一条记录，
+        返回报告编号，失败时返回 None
+        """
         try:
-            report_data = {
-            '分析时间': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-            '上涨家数': [market_data['up_count']],
-            '下跌家数': [market_data['down_count']],
-            '涨跌比': [round(market_data['up_down_ratio'], 2)],
-            '总成交额(亿)': [round(market_data['total_amount'], 2)],
-            '平均涨跌幅(%)': [round(market_data['avg_change'], 2)],
-            '市场情绪得分': [sentiment_score],
-            '投资建议': [suggestion],
-            '热门板块TOP1': [sector_data['hot_sectors'].iloc[0]['板块名称'] if not sector_data['hot_sectors'].empty else ''],
-            '热门板块TOP2': [sector_data['hot_sectors'].iloc[1]['板块名称'] if len(sector_data['hot_sectors']) > 1 else ''],
-            '热门板块TOP3': [sector_data['hot_sectors'].iloc[2]['板块名称'] if len(sector_data['hot_sectors']) > 2 else '']
-        }
-
-            df_report = pd.DataFrame(report_data)
-            filename = f"market_report_final{datetime.now().strftime('%Y%m%d')}.csv"
-            df_report.to_csv(filename, index=False, encoding='utf-8-sig')
-            print(f"\n分析报告已保存至: {filename}")
+            store = self._reports()
+            report_id = store.add_report(market_data, sector_data, sentiment_score, suggestion)
+            print(f"\n分析报告已保存至: {store.path}（报告编号 {report_id}）")
+            return report_id
 
         except Exception as e:
             print(f"保存报告时出现错误: {e}")
+            return None
+
+
+class AsyncMarketSentiment(MarketSentiment):
+    """
+    并发获取数据的市场情绪分析
+    全市场行情、行业板块、指数日线三个数据源在线程池中同时请求，报告耗时接近最慢的单个数据源；
+    每个数据源有独立超时，超时或失败只影响报告中对应的部分；
+    每个实例有自己的线程池，用完后调用 close()，或以 with 语句使用
+    """
+    # 各数据源的超时（秒）
+    DEFAULT_TIMEOUTS = {'market': 20, 'sector': 20, 'index': 20}
+
+    def __init__(self, provider=None, timeouts=None):
+        super().__init__(provider)
+        self.timeouts = dict(self.DEFAULT_TIMEOUTS, **(timeouts or {}))
+        # 独立的线程池：超时的请求在后台自行结束，asyncio.run 退出时不必等待它
+        self._executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix='sentiment')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """关闭线程池；不等待超时后仍在执行的请求，它们结束后线程自行退出"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _fetch(self, name, func, *args, **kwargs):
+        """在线程中执行阻塞的数据接口，超时或失败时返回 None"""
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+            return await asyncio.wait_for(future, timeout=self.timeouts[name])
+        except asyncio.TimeoutError:
+            print(f"获取{name}数据超时（{self.timeouts[name]}秒），该部分按缺省值处理")
+        except Exception as e:
+            print(f"获取{name}数据失败: {e}")
+        return None
+
+    async def fetch_sources(self):
+        """并发获取三个数据源，返回 {'market', 'sector', 'index'}，失败的为 None"""
+        market, sector, index = await asyncio.gather(
+            self._fetch('market', self.provider.stock_zh_a_spot),
+            self._fetch('sector', self.provider.stock_board_industry_name_em),
+            self._fetch('index', self.index_history.update, "sh000001"),
+        )
+        return {'market': market, 'sector': sector, 'index': index}
+
+    @metrics.timed('sentiment.analyze_market_async')
+    async def analyze_market_async(self):
+        """
+        并发版 analyze_market，输出同样的报告
+        返回 {'market_data', 'sector_data', 'sentiment_score', 'suggestion', 'degraded', 'elapsed'}，
+        degraded 为未取到数据的数据源
+        """
+        try:
+            print("\n=== 市场情绪分析报告 ===")
+            print(f"分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+            start = time.perf_counter()
+            sources = await self.fetch_sources()
+
+            # 涨跌家数需要先处理全市场行情，情绪得分在其之后计算
+            market_data = self.summarize_market(sources['market'])
+            self._print_market(market_data)
+            sector_data = self.summarize_sectors(sources['sector'])
+            self._print_sectors(sector_data)
+            sentiment_score = self.score_sentiment(sources['index'])
+            suggestion = self._finish_report(market_data, sector_data, sentiment_score)
+
+            return {
+                'market_data': market_data,
+                'sector_data': sector_data,
+                'sentiment_score': sentiment_score,
+                'suggestion': suggestion,
+                'degraded': [name for name, df in sources.items() if df is None or df.empty],
+                'elapsed': time.perf_counter() - start,
+            }
+        except Exception as e:
+            print(f"市场分析执行出现错误: {e}")
+            print("请检查网络连接并重试，或查看详细错误信息")
+            return None
+
+
+def _empty_overview():
+    return {
+        'up_count': 0,
+        'down_count': 0,
+        'up_down_ratio': 1,
+        'total_amount': 0,
+        'avg_change': 0
+    }
+
+
+def _empty_sectors():
+    empty_df = pd.DataFrame(columns=['板块名称', '涨跌幅', '变动金额'])
+    return {
+        'hot_sectors': empty_df,
+        'potential_sectors': empty_df
+    }
+
 
 if __name__ == "__main__":
     analyzer = MarketSentiment()
     analyzer.analyze_market()
+    # with AsyncMarketSentiment() as analyzer:
+    #     asyncio.run(analyzer.analyze_market_async())
     # analyzer.get_market_sentiment()
     # analyzer.get_sector_analysis()
\ No newline at end of file